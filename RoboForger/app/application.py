@@ -92,8 +92,11 @@ class RoboforgerApp(QApplication):
         self.main_window.process_file_request.connect(
             lambda: self._process_worker.start_processing()
         )
+        self.main_window.cancel_process_request.connect(self._process_worker.cancel_processing)
         self.main_window.save_file_request.connect(self._process_worker.save_rapid_code)
 
+        self.aboutToQuit.connect(self._process_worker.shutdown)
+
     def run(self) -> int:
         # self.aboutQt()
 
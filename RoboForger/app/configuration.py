@@ -148,6 +148,7 @@ class RightPanel(QFrame):
 
     on_load_dxf_clicked = Signal()
     on_process_clicked = Signal()
+    on_cancel_clicked = Signal()
     on_save_rapid_clicked = Signal()
 
     def __init__(self):
@@ -274,9 +275,11 @@ class RightPanel(QFrame):
         # temporal buttons since we should use custom ones with icons later
         self.load_button = QPushButton("Load DXF", self)
         self.process_button = QPushButton("Process", self)
+        self.cancel_button = QPushButton("Cancel", self)
         self.save_button = QPushButton("Save RAPID", self)
         layout.addWidget(self.load_button)
         layout.addWidget(self.process_button)
+        layout.addWidget(self.cancel_button)
         layout.addWidget(self.save_button)
 
         self.setLayout(layout)
@@ -301,12 +304,14 @@ class RightPanel(QFrame):
         
         self.load_button.clicked.connect(self.on_load_dxf_clicked)
         self.process_button.clicked.connect(self.on_process_clicked)
+        self.cancel_button.clicked.connect(self.on_cancel_clicked)
         self.save_button.clicked.connect(self.on_save_rapid_clicked)
 
 class ConfigurationPanel(QWidget):
 
     load_file_request = Signal()
     process_file_request = Signal()
+    cancel_process_request = Signal()
     save_file_request = Signal()
 
     def __init__(self, parameters: ProcessingParameters):
@@ -343,6 +348,7 @@ class ConfigurationPanel(QWidget):
     def connect_signals(self):
         self.right_panel.on_load_dxf_clicked.connect(self.load_file_request)
         self.right_panel.on_process_clicked.connect(self.process_file_request)
+        self.right_panel.on_cancel_clicked.connect(self.cancel_process_request)
         self.right_panel.on_save_rapid_clicked.connect(self.save_file_request)
         
         # parameters connection
@@ -36,6 +36,7 @@ class RoboMainWindow(QMainWindow):
 
     load_file_request = Signal()
     process_file_request = Signal()
+    cancel_process_request = Signal()
     save_file_request = Signal()
 
     def __init__(self, parameters: ProcessingParameters, global_config: GlobalConfig, parent=None):
@@ -112,6 +113,7 @@ class RoboMainWindow(QMainWindow):
     def connect_signals(self):
         self.config_panel.load_file_request.connect(self.load_file_request)
         self.config_panel.process_file_request.connect(self.process_file_request)
+        self.config_panel.cancel_process_request.connect(self.cancel_process_request)
         self.config_panel.save_file_request.connect(self.save_file_request)
 
         self.parameters.parameter_changed.connect(self.load_limits)
@@ -1,5 +1,7 @@
 from PySide6.QtCore import QObject, Signal
 
+from pathlib import Path
+
 from RoboForger.forger import ForgerParameters
 
 
@@ -10,6 +12,10 @@ class ProcessingParameters(QObject):
     def __init__(self, parent=None):
         super().__init__(parent)
         self._model = ForgerParameters()
+
+        # The preview and the processing process parse the same file, both reuse the cached figures
+        self._model.cache_dir = str(Path.home() / ".roboforger" / "cache")
+
         self._data = self._model.to_dict()
 
     def set(self, key: str, value):
@@ -0,0 +1,114 @@
+"""
+Shared memory transport of NumPy arrays between the application and the processing process.
+
+Anything put in a multiprocessing queue is pickled, written through a pipe and unpickled, which copies it twice and
+takes seconds for hundreds of MB. SharedArrays writes named arrays once into a multiprocessing.shared_memory block, and
+only its handle (block name and array layout, a few hundred bytes) goes through the queue. The other process attaches
+the block and reads the arrays in place.
+
+The process that creates a block owns it and unlinks it, except the result blocks of the worker (created with
+track=False), which the application unlinks once it read them.
+"""
+from typing import Dict, List, Tuple
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+# Offsets of the arrays in a block are aligned to cache lines
+_ALIGNMENT = 64
+
+# Block name and (array name, dtype, shape, offset) of every array in it, this is what is sent between processes
+SharedHandle = Tuple[str, List[Tuple[str, str, Tuple[int, ...], int]]]
+
+
+class SharedArrays:
+    """
+    Named arrays in a shared memory block.
+    """
+    __slots__ = ("_memory", "_layout", "_readonly")
+
+    def __init__(self, memory: SharedMemory, layout: List[Tuple[str, str, Tuple[int, ...], int]], readonly: bool = False):
+        """
+        :param readonly: If True the arrays can not be written, for blocks of other processes.
+        """
+        self._memory = memory
+        self._layout = layout
+        self._readonly = readonly
+
+    @staticmethod
+    def create(arrays: Dict[str, np.ndarray], track: bool = True) -> "SharedArrays":
+        """
+        Creates a block with a copy of the arrays.
+
+        :param track: If False the block is not deleted when this process ends, for blocks another process unlinks.
+        """
+        arrays = {name: np.asarray(array, order="C") for name, array in arrays.items()}
+        layout = []
+        size = 0
+
+        for name, array in arrays.items():
+            layout.append((name, array.dtype.str, array.shape, size))
+            size += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+        shared = SharedArrays(SharedMemory(create=True, size=max(size, 1), track=track), layout)
+
+        for name, array in arrays.items():
+            shared.array(name)[...] = array
+
+        return shared
+
+    @staticmethod
+    def attach(handle: SharedHandle) -> "SharedArrays":
+        """
+        Opens the block of a handle, of a block created by another process (which keeps it tracked).
+        """
+        name, layout = handle
+        return SharedArrays(SharedMemory(name=name, track=False), layout, readonly=True)
+
+    @property
+    def handle(self) -> SharedHandle:
+        return self._memory.name, self._layout
+
+    @property
+    def nbytes(self) -> int:
+        return self._memory.size
+
+    def array(self, name: str) -> np.ndarray:
+        """
+        The array in the block (no copy). It holds the buffer of the block, which can not be closed (unmapped) while
+        the array is referenced (np.ndarray(buffer=...) would only keep the memory object and crash once it is closed).
+        """
+        for array_name, dtype, shape, offset in self._layout:
+            if array_name == name:
+                count = int(np.prod(shape, dtype=np.int64))
+                array = np.frombuffer(self._memory.buf, dtype=np.dtype(dtype), count=count, offset=offset).reshape(shape)
+                array.flags.writeable = not self._readonly
+                return array
+
+        raise KeyError(f"No shared array named {name}")
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """
+        All the arrays in the block (no copy), see array.
+        """
+        return {name: self.array(name) for name, _, _, _ in self._layout}
+
+    def close(self):
+        """
+        Closes the block in this process. If arrays read from it are still referenced the block stays mapped until
+        they are released.
+        """
+        try:
+            self._memory.close()
+        except BufferError:
+            pass
+
+    def unlink(self):
+        """
+        Deletes the block, the processes that have it open can still use it until they close it.
+        """
+        try:
+            self._memory.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,252 @@
+"""
+Long lived processing process of the application.
+
+Spawning a process per run pays the interpreter start up and the imports of the pipeline (ezdxf, NumPy, RoboForger)
+before any work. The WarmWorker process is started once with the application, imports the pipeline while the user is
+still loading a file and then waits for jobs on a queue.
+
+The application already parsed and converted the figures of the file to preview them, the jobs carry those figures as
+NumPy arrays (Forger.get_figure_arrays) so the worker only traces them and generates the code. It also keeps the last
+document in memory, so processing it again with other parameters only redoes the steps they change.
+
+The figures and the generated code are exchanged in shared memory blocks (see app.shared_arrays), the queues only carry
+their handles.
+
+The worker is not a daemon process so it can start the process pool of the spline conversion (conversion_workers), it
+is ended explicitly with stop (called at exit too).
+
+This module does not import Qt, so the worker process does not pay for it either.
+"""
+from typing import Any, Callable, Dict, Hashable
+from RoboForger.forger import Forger, ForgerParameters
+from RoboForger.app.shared_arrays import SharedArrays, SharedHandle
+
+import atexit
+import copy
+import itertools
+import logging
+import multiprocessing
+import threading
+
+import numpy as np
+
+
+def _serve(jobs: multiprocessing.Queue, results: multiprocessing.Queue):
+    """
+    Main loop of the worker process, processes the jobs (job id, document key, figures handle, parameters) until it
+    gets None and puts their results (job id, result block handle or exception).
+
+    The forger of the last document stays in memory, it is used again for the jobs with the same document key. Its
+    figures are read in place from the shared block of the application, which stays open as long as the forger.
+    """
+    forger: Forger | None = None
+    document: Hashable | None = None
+    shared: SharedArrays | None = None
+
+    try:
+        while (job := jobs.get()) is not None:
+            job_id, document_key, figures, params = job
+
+            try:
+                if forger is not None and document_key == document:
+                    logging.info("Processing the document in memory again.")
+                    forger.set_parameters(params)
+                else:
+                    # The old document is dropped first, a failed load must not leave it as the warm one
+                    forger, document = None, None
+
+                    if shared is not None:
+                        shared.close()
+                    shared = SharedArrays.attach(figures)
+
+                    forger = Forger(parameters=params)
+                    forger.load_figure_arrays(shared.arrays())
+                    document = document_key
+
+                forger.generate_rapid_code()
+
+                # Unlinked by the application when it reads it (a worker killed right here leaves it behind)
+                code = np.frombuffer(forger.get_rapid_code().encode(), dtype=np.uint8)
+                result = SharedArrays.create({"rapid_code": code}, track=False)
+                results.put((job_id, result.handle))
+                result.close()
+            except Exception as e:
+                # The failed document is not kept, neither is its block
+                forger, document = None, None
+                if shared is not None:
+                    shared.close()
+                    shared = None
+
+                # Send the exception object so the monitor can report it
+                results.put((job_id, e))
+    finally:
+        forger = None
+        if shared is not None:
+            shared.close()
+
+
+class WarmWorker:
+    """
+    Runs the processing jobs one at a time in a long lived process (see the module description).
+
+    Results are given to on_result(job id, result) from a monitor thread, the result is the dict of the job outputs or
+    the exception it raised.
+    """
+    def __init__(self, on_result: Callable[[int, Any], None]):
+        self._on_result = on_result
+
+        self._process: multiprocessing.Process | None = None
+        self._jobs: multiprocessing.Queue | None = None
+        self._results: multiprocessing.Queue | None = None
+        self._monitor: threading.Thread | None = None
+
+        self._job_ids = itertools.count(1)
+        self._current_job: int | None = None
+        self._lock = threading.Lock()
+
+        # A process that is not a daemon keeps the application alive until it ends
+        atexit.register(self.stop)
+
+    @property
+    def busy(self) -> bool:
+        return self._current_job is not None
+
+    def start(self):
+        """
+        Starts the worker process if it is not running, it imports the pipeline in the background.
+        """
+        if self._process is not None and self._process.is_alive():
+            return
+
+        self._jobs = multiprocessing.Queue()
+        self._results = multiprocessing.Queue()
+
+        self._process = multiprocessing.Process(
+            target=_serve,
+            name="DxfProcessingWorker",
+            args=(self._jobs, self._results),
+            daemon=False,  # daemon processes can not start the conversion process pool
+        )
+        self._process.start()
+
+        self._monitor = threading.Thread(target=self._monitor_results, args=(self._results,), daemon=True)
+        self._monitor.start()
+
+        logging.info("Processing worker started.")
+
+    def submit(self, document_key: Hashable, figures: SharedHandle, params: ForgerParameters) -> int:
+        """
+        Sends a job to the worker (started if needed), returns the job id given back with its result.
+
+        :param document_key: Identifies the loaded document, the worker uses the figures it has in memory if the key is
+        the one of the last job.
+        :param figures: Handle of the shared block of the document figures (from Forger.get_figure_arrays), it must stay
+        open until the job ends.
+        """
+        with self._lock:
+            if self._current_job is not None:
+                raise RuntimeError("The worker is already processing a job.")
+
+            self.start()
+
+            job_id = next(self._job_ids)
+            self._current_job = job_id
+            # The queue pickles the job later in a thread, the parameters are copied so changes made meanwhile do not apply
+            self._jobs.put((job_id, document_key, figures, copy.deepcopy(params)))
+
+        return job_id
+
+    def cancel(self) -> bool:
+        """
+        Cancels the job being processed: the worker process is killed (the pipeline steps can not be interrupted) and a
+        new one is started, so it warms up again while the user changes the parameters.
+
+        Returns False if there was no job to cancel.
+        """
+        with self._lock:
+            if self._current_job is None:
+                return False
+
+            self._current_job = None
+            self._kill()
+
+        logging.info("Processing cancelled.")
+        self.start()
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Ends the worker process, the job being processed is cancelled. An idle worker gets the end job and is killed if
+        it did not end after timeout seconds.
+        """
+        with self._lock:
+            if self._process is None:
+                return
+
+            if self._current_job is not None:
+                self._current_job = None
+                self._kill()
+                return
+
+            if self._process.is_alive():
+                self._jobs.put(None)
+                self._process.join(timeout)
+
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join()
+
+            self._results.put(None)  # stops the monitor
+            self._process = None
+
+    def _kill(self):
+        if self._process is None:
+            return
+
+        self._process.terminate()
+        self._process.join()
+
+        # The killed process can leave the queues broken, the next process gets new ones
+        self._results.put(None)  # stops the monitor
+        self._process = None
+
+    def _monitor_results(self, results: multiprocessing.Queue):
+        while True:
+            try:
+                result = results.get()
+            except Exception:
+                return  # queue broken by a killed process
+
+            if result is None:
+                return
+
+            job_id, value = result
+
+            # Read even for cancelled jobs, so the block is deleted
+            if not isinstance(value, Exception):
+                try:
+                    value = _read_result(value)
+                except Exception as e:
+                    value = e
+
+            with self._lock:
+                # Results of cancelled jobs are dropped
+                if job_id != self._current_job:
+                    continue
+                self._current_job = None
+
+            self._on_result(job_id, value)
+
+
+def _read_result(handle: SharedHandle) -> Dict[str, Any]:
+    """
+    Outputs of a job from its result block, which is deleted.
+    """
+    block = SharedArrays.attach(handle)
+
+    try:
+        # Decoded straight from the block, without a bytes copy
+        return {"rapid_code": str(block.array("rapid_code").data, "utf-8")}
+    finally:
+        block.close()
+        block.unlink()
@@ -9,40 +9,15 @@ from PySide6.QtCore import (
 
 from RoboForger.forger import Forger, ForgerParameters
 from RoboForger.app.preview.drawing.parameters import ProcessingParameters
+from RoboForger.app.warm_worker import WarmWorker
+from RoboForger.app.shared_arrays import SharedArrays
 
-import multiprocessing
-import threading
+import itertools
 import logging
+import threading
 from math import isnan
 
 
-def _processing_function(file_path: str, result_queue: multiprocessing.Queue, params: ForgerParameters):
-    """
-    Run the full pipeline inside a separate process using Forger and return the RAPID code.
-    Any exception is put back into the queue to be handled in the UI thread.
-
-    Also remember that the arguments should be picklable, so we need to make sure ForgerParameters is always picklable
-
-    TODO: Add stdout and stderr capturing to send back logs to the main process.
-    """
-    try:
-        forger = Forger(
-            parameters=params,
-        )
-
-        # Full pipeline
-        forger.parse_figures(file_path)
-        forger.convert_figures()
-        forger.generate_rapid_code()
-
-        result_queue.put({
-            "rapid_code": forger.get_rapid_code(),
-        })
-    except Exception as e:
-        # Send the exception object so the monitor can emit processingError
-        result_queue.put(e)
-
-
 class ProcessWorker(QObject):
     """
     Orchestrator class manage the application logic and interactions between components.
@@ -55,6 +30,7 @@ class ProcessWorker(QObject):
     processStart = Signal()
     processFinish = Signal()
     processError = Signal(str)
+    processCancel = Signal()
 
     fileLoaded = Signal()
 
@@ -65,13 +41,19 @@ class ProcessWorker(QObject):
         self._parameters = parameters
         self._forger = Forger(parameters.backend_parameters())
         
-        # process/threading
-        self._process: multiprocessing.Process | None = None
-        self._result_queue: multiprocessing.Queue | None = None
-        self._is_running: bool = False
+        # processing process, started now so it is warm by the time a file is processed
+        self._worker = WarmWorker(on_result=self._on_result)
+        self._worker.start()
 
         # current file path
         self._selected_file_path: str | None = None
+
+        # figures of the loaded file shared with the processing process, and the key of the load they come from
+        self._figures: SharedArrays | None = None
+        self._document_key: tuple | None = None
+        self._retired_figures: list[SharedArrays] = [] # figures of previous loads a job may still be reading
+        self._retired_lock = threading.Lock() # the retired figures are also released from the worker monitor thread
+        self._loads = itertools.count(1)
         self._save_path: str | None = None
 
         self._rapid_code: str = ""
@@ -100,8 +82,13 @@ class ProcessWorker(QObject):
             return
 
         try:
+            self._share_figures(None)
             self._forger.parse_figures(self._selected_file_path)
             self._forger.convert_figures()
+
+            # Packed now, the conversion parameters recorded are the ones the figures were converted with
+            self._share_figures(SharedArrays.create(self._forger.get_figure_arrays()))
+            self._document_key = (self._selected_file_path, next(self._loads))
         except Exception as e:
             self.processError.emit(f"Failed loading file: {e}")
             return
@@ -114,10 +101,10 @@ class ProcessWorker(QObject):
         Starts the processing in a separate process.
         """
         try:
-            if self._is_running:
+            if self._worker.busy:
                 print("Processing is already running.")
                 return
-            if not self._selected_file_path:
+            if not self._selected_file_path or self._figures is None:
                 # print("No file selected. Please load a DXF file before starting processing.")
                 # print("No file selected. Please load a CAD file(DXF, DWG) before starting processing.")
                 self.processError.emit("No file selected. Please load a CAD file(DXF, DWG) before starting processing.")
@@ -126,28 +113,58 @@ class ProcessWorker(QObject):
             #     print("Invalid parameters. Please check your settings.")
             #     return
 
-            self._is_running = True
             self.processStart.emit()
             logging.log(level=logging.INFO, msg="Starting processing...")
 
-            self._result_queue = multiprocessing.Queue()
-
             print(f"Starting process with parameters: {self._parameters.backend_parameters()}")
 
-            self._process = multiprocessing.Process(
-                target=_processing_function,
-                name="DxfProcessingWorker",
-                args=(self._selected_file_path, self._result_queue, self._parameters.backend_parameters()),
-            )
-            self._process.start()
-
-            # Monitor results from a lightweight thread
-            threading.Thread(target=self._monitor_process, daemon=True).start()
+            self._worker.submit(self._document_key, self._figures.handle, self._parameters.backend_parameters())
 
         except Exception as e:
-            self._is_running = False
             self.processError.emit(f"Exception starting processing: {str(e)}")
 
+    @Slot()
+    def cancel_processing(self):
+        """
+        Cancels the processing in progress, if any.
+        """
+        if self._worker.cancel():
+            self._release_retired_figures()
+            self.processCancel.emit()
+
+    @Slot()
+    def shutdown(self):
+        """
+        Ends the processing process, to be called when the application quits.
+        """
+        self._worker.stop()
+        self._share_figures(None)
+        self._release_retired_figures()
+
+    def _share_figures(self, figures: SharedArrays | None):
+        """
+        Replaces the shared figures of the loaded file, the previous ones are deleted once no job can be reading them.
+        """
+        if self._figures is not None:
+            with self._retired_lock:
+                self._retired_figures.append(self._figures)
+
+        self._figures = figures
+
+        if not self._worker.busy:
+            self._release_retired_figures()
+
+    def _release_retired_figures(self):
+        """
+        Deletes the retired figures, called from the GUI thread and from the worker monitor thread.
+        """
+        with self._retired_lock:
+            retired, self._retired_figures = self._retired_figures, []
+
+        for figures in retired:
+            figures.close()
+            figures.unlink()
+
     @Slot()
     def save_rapid_code(self):
         """
@@ -179,28 +196,16 @@ class ProcessWorker(QObject):
         except Exception as e:
             self.processError.emit(f"Failed saving RAPID code: {e}")
 
-    def _monitor_process(self):
-        try:
-            if not self._result_queue:
-                raise RuntimeError("Result queue is not initialized.")
-            
-            result = self._result_queue.get()
-            if isinstance(result, Exception):
-                self._rapid_code = ""
-                self.processError.emit(f"Exception during processing: {str(result)}")
-            else:
-                self._rapid_code = result.get("rapid_code", "")
-                logging.log(level=logging.INFO, msg="Processing finished successfully.")
-                self.processFinish.emit()
-        except Exception as e:
-            self._rapid_code = ""
-            self.processError.emit(f"Exception during monitoring: {str(e)}")
-        finally:
-            try:
-                if self._process:
-                    self._process.join()
-            finally:
-                self._is_running = False
-
-
+    def _on_result(self, job_id: int, result):
+        """
+        Called from the worker monitor thread with the result of a job.
+        """
+        self._release_retired_figures()
 
+        if isinstance(result, Exception):
+            self._rapid_code = ""
+            self.processError.emit(f"Exception during processing: {str(result)}")
+        else:
+            self._rapid_code = result.get("rapid_code", "")
+            logging.log(level=logging.INFO, msg="Processing finished successfully.")
+            self.processFinish.emit()
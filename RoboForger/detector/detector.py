@@ -6,22 +6,57 @@ continuous is drawn in one go, without lifting the tool.
 from typing import List, Dict, Any, Tuple
 from RoboForger.drawing.figures import Figure
 from RoboForger.detector.tracer import Tracer
+from RoboForger.detector.enums import TraceMode
+from RoboForger.detector.travel import TravelOptimizer
+from RoboForger.detector.simplify import TraceSimplifier, ArcMerger
+from RoboForger.fig_types import Point3D
 
 import logging
 
 
 class Detector:
-    def __init__(self, figures: List[Figure]):
+    def __init__(self, figures: List[Figure], trace_mode: TraceMode = TraceMode.EULERIAN, optimize_travel: bool = True,
+                 start_point: Point3D | None = None, travel_time_budget: float = 1.0, snap_tolerance: float = 0.0,
+                 simplify_tolerance: float = 0.0, arc_merge_tolerance: float = 0.0, circle_velocity: int | None = None):
         """
         Initializes the Detector with a list of figures.
 
         :param figures: List of Figure objects to be processed.
+        :param trace_mode: Strategy used by the tracer to build the traces.
+        :param optimize_travel: If True the traces are reordered to reduce the pen-up travel between them.
+        :param start_point: Position of the tool before the first trace and after the last one (the program returns to
+        it), used by the travel optimizer.
+        :param travel_time_budget: Seconds the travel optimizer can spend improving the order.
+        :param snap_tolerance: End points closer than this distance are merged into the same vertex before tracing.
+        :param simplify_tolerance: Consecutive polylines of a trace are merged and their points within this distance of
+        the simplified polyline are dropped (see TraceSimplifier). 0 keeps every figure and point.
+        :param arc_merge_tolerance: Consecutive arcs of a trace whose centers and radii match within this distance are
+        merged into one arc (see ArcMerger). 0 keeps every arc.
+        :param circle_velocity: Velocity of the circles the arc merger closes, None keeps the arcs velocity.
         """
         self.figures = figures
+        self.optimize_travel = optimize_travel
+        self.start_point = start_point
+        self.travel_time_budget = travel_time_budget
+        self.simplify_tolerance = simplify_tolerance
+        self.arc_merge_tolerance = arc_merge_tolerance
+        self.circle_velocity = circle_velocity
 
-        tracer = Tracer(self.figures)
+        # Pen-up travel report of the last detect_and_simplify call (None if the order was not optimized)
+        self.travel_before: float | None = None
+        self.travel_after: float | None = None
 
-        self.traces = tracer.figure_traces
+        tracer = Tracer(self.figures, mode=trace_mode, snap_tolerance=snap_tolerance)
+
+        self.merged_endpoints = tracer.merged_endpoints
+
+        # The figures of the traces already follow their direction, they must not be reversed from their end points
+        self.oriented_traces = tracer.oriented
+
+        # Figures the tracer could not place in a trace, they are still drawn on their own after the traces
+        self.uncovered_figures = tracer.uncovered_figures
+
+        self.traces = tracer.figure_traces + [[figure] for figure in self.uncovered_figures]
 
     @staticmethod
     def __print_traces(traces: List[List[Figure]]):
@@ -49,9 +84,29 @@ class Detector:
         ensured_traces: List[List[Figure]] = []
 
         for i in range(len(detected_traces)):
-            trace = self.ensure_continuity(detected_traces[i])
+            trace = detected_traces[i] if self.oriented_traces else self.ensure_continuity(detected_traces[i])
             ensured_traces.append(trace)
 
+        if self.optimize_travel:
+            optimizer = TravelOptimizer(ensured_traces, start_point=self.start_point, time_budget=self.travel_time_budget,
+                                        end_point=self.start_point)
+            ensured_traces = optimizer.optimize()
+            self.travel_before = optimizer.initial_travel
+            self.travel_after = optimizer.final_travel
+
+        if self.arc_merge_tolerance > 0:
+            merger = ArcMerger(self.arc_merge_tolerance, self.circle_velocity)
+            ensured_traces = [merger.merge(trace) for trace in ensured_traces]
+            logging.info(f"Merged {merger.merged_arcs} co-circular arcs.")
+
+        if self.simplify_tolerance > 0:
+            simplifier = TraceSimplifier(self.simplify_tolerance)
+            ensured_traces = [simplifier.simplify(trace) for trace in ensured_traces]
+            logging.info(f"Simplified polylines from {simplifier.points_before} to {simplifier.points_after} points.")
+
+        # The tool stays down along a trace, a trace with a gap is drawn as separate traces instead
+        ensured_traces = [part for trace in ensured_traces for part in self.split_discontinuities(trace)]
+
         for trace in ensured_traces:
             if not trace:
                 continue
@@ -112,3 +167,18 @@ class Detector:
 
 
         return continuous_trace
+
+    @staticmethod
+    def split_discontinuities(trace: List[Figure]) -> List[List[Figure]]:
+        """
+        Splits the trace wherever a figure does not start at the end point of the previous one.
+        """
+        parts: List[List[Figure]] = [trace[:1]]
+
+        for previous, figure in zip(trace, trace[1:]):
+            if previous.end_point != figure.start_point:
+                logging.warning(f"Trace is not continuous between {previous.name} and {figure.name}, it is split.")
+                parts.append([])
+            parts[-1].append(figure)
+
+        return parts
@@ -6,4 +6,15 @@ class ConnectionType(Enum):
     START2END = "start2end"
     START2START = "start2start"
     END2END = "end2end"
-    DISCONNECTED = "disconnected"
\ No newline at end of file
+    DISCONNECTED = "disconnected"
+
+
+class TraceMode(Enum):
+    """
+    Strategy used by the Tracer to build the vertex traces.
+
+    - LONGEST_PATH: exhaustive DFS that greedily picks the longest simple path each round (legacy, exponential on dense graphs)
+    - EULERIAN: pairs odd degree vertices with pen-up connectors and walks the graph with Hierholzer's algorithm (near linear)
+    """
+    LONGEST_PATH = "longest_path"
+    EULERIAN = "eulerian"
@@ -0,0 +1,204 @@
+"""
+Trace simplifier merges the consecutive polylines of a trace into a single polyline and drops the points that do not
+change its shape, so straight edges split into many LINE entities are drawn with one move.
+
+The points are simplified with Ramer-Douglas-Peucker: the first and last points are kept and the point farthest from the
+segment joining them is kept if it is farther than the tolerance, then both halves are simplified the same way. Every
+dropped point is within the tolerance of the simplified polyline.
+
+Arc merger does the same for arcs: consecutive arcs of a trace on the same circle (circles split at the quadrants by the
+CAD tool) become a single arc, drawn with one MoveC or two when the sweep reaches half a turn. A run that closes a whole
+turn becomes a circle starting where the run starts, drawn with two MoveC.
+"""
+from typing import List
+from RoboForger.drawing.figures import Figure, PolyLine, Arc, Circle
+from math import dist, degrees, pi
+
+import numpy as np
+
+
+class TraceSimplifier:
+    def __init__(self, tolerance: float):
+        """
+        :param tolerance: Maximum distance between a dropped point and the simplified polyline.
+        """
+        self.tolerance = tolerance
+
+        # Down points of the polylines before and after simplifying, for the report
+        self.points_before = 0
+        self.points_after = 0
+
+    @staticmethod
+    def simplify_points(points: np.ndarray, tolerance: float) -> np.ndarray:
+        """
+        Ramer-Douglas-Peucker over points (N, 3), returns the mask of the points kept. Iterative (a stack of ranges) so
+        long polylines do not hit the recursion limit.
+        """
+        keep = np.zeros(len(points), dtype=bool)
+        if len(points) == 0:
+            return keep
+
+        keep[0] = keep[-1] = True
+        stack = [(0, len(points) - 1)]
+
+        while stack:
+            first, last = stack.pop()
+            if last - first < 2:
+                continue
+
+            start, end = points[first], points[last]
+            inner = points[first + 1:last]
+            direction = end - start
+            length2 = direction @ direction
+
+            # Distance of the inner points to the segment (to the start point if the segment is a point, closed runs)
+            along = np.clip((inner - start) @ direction / length2, 0.0, 1.0) if length2 > 0 else np.zeros(len(inner))
+            distances = np.linalg.norm(inner - (start + along[:, None] * direction), axis=1)
+
+            farthest = int(np.argmax(distances))
+            if distances[farthest] > tolerance:
+                index = first + 1 + farthest
+                keep[index] = True
+                stack.append((first, index))
+                stack.append((index, last))
+
+        return keep
+
+    def simplify(self, trace: List[Figure]) -> List[Figure]:
+        """
+        Replaces every run of consecutive polylines of a continuous trace (see Detector.ensure_continuity) by one
+        simplified polyline. Other figures are kept as they are.
+        """
+        simplified: List[Figure] = []
+        run: List[PolyLine] = []
+
+        for figure in trace + [None]:
+            if isinstance(figure, PolyLine):
+                run.append(figure)
+                continue
+
+            if run:
+                simplified.append(self._merge(run))
+                run = []
+
+            if figure is not None:
+                simplified.append(figure)
+
+        return simplified
+
+    def _merge(self, run: List[PolyLine]) -> PolyLine:
+        # Down points of every polyline, the first point of a polyline is the last point of the previous one
+        points: List[tuple] = list(run[0].get_points()[1:-1])
+        for polyline in run[1:]:
+            down_points = polyline.get_points()[1:-1]
+            points.extend(down_points[1:] if down_points[0] == points[-1] else down_points)
+
+        keep = TraceSimplifier.simplify_points(np.array(points, dtype=float), self.tolerance)
+        kept_points = [point for point, kept in zip(points, keep) if kept]
+
+        self.points_before += len(points)
+        self.points_after += len(kept_points)
+
+        if len(run) == 1 and len(kept_points) == len(points):
+            return run[0]
+
+        first = run[0]
+        name = first.name if len(run) == 1 else f"{first.name}_{run[-1].name}"
+
+        return PolyLine(name, kept_points, first.lifting, first.velocity, first.float_precision)
+
+
+class ArcMerger:
+    def __init__(self, tolerance: float, circle_velocity: int | None = None):
+        """
+        :param tolerance: Maximum distance between the centers and between the radii of arcs considered on the same circle.
+        :param circle_velocity: Velocity of the circles closed by a whole turn of arcs, None keeps the arcs velocity.
+        """
+        self.tolerance = tolerance
+        self.circle_velocity = circle_velocity
+
+        # Arcs replaced by merged arcs, for the report
+        self.merged_arcs = 0
+
+    @staticmethod
+    def _is_reversed(arc: Arc) -> bool:
+        """
+        True if the trace draws the arc from its end angle to its start angle (see Detector.ensure_continuity).
+        """
+        return arc.get_points()[1] != Figure.round_point(tuple(arc.start), arc.float_precision)
+
+    def _can_extend(self, run: List[Arc], arc: Arc) -> bool:
+        first = run[0]
+
+        if arc.clockwise or ArcMerger._is_reversed(arc) != ArcMerger._is_reversed(first):
+            return False
+
+        if dist(arc.center, first.center) > self.tolerance or abs(arc.radius - first.radius) > self.tolerance:
+            return False
+
+        # The arc must continue the previous one (traces can also join figures with pen-up connectors)
+        if dist(run[-1].get_points()[-2], arc.get_points()[1]) > self.tolerance:
+            return False
+
+        # Up to a whole turn, which closes the run (see _merge)
+        return ArcMerger._sweep(run + [arc]) <= 2 * pi + 1e-9
+
+    @staticmethod
+    def _sweep(run: List[Arc]) -> float:
+        return sum(Arc.arc_angle(arc.start_angle, arc.end_angle, arc.clockwise) for arc in run)
+
+    def merge(self, trace: List[Figure]) -> List[Figure]:
+        """
+        Replaces every run of consecutive counter-clockwise arcs of a continuous trace that share center and radius by
+        one arc. The arcs of a run are all drawn in the same direction, so the merged arc goes from the first arc start
+        angle to the last arc end angle (or is reversed when the trace draws them backwards).
+        """
+        merged: List[Figure] = []
+        run: List[Arc] = []
+
+        for figure in trace + [None]:
+            if isinstance(figure, Arc) and not figure.clockwise:
+                if not run or self._can_extend(run, figure):
+                    run.append(figure)
+                    continue
+
+            if run:
+                merged.append(self._merge(run))
+                run = []
+
+            if isinstance(figure, Arc) and not figure.clockwise:
+                run.append(figure)
+            elif figure is not None:
+                merged.append(figure)
+
+        return merged
+
+    def _merge(self, run: List[Arc]) -> Figure:
+        if len(run) == 1:
+            return run[0]
+
+        reversed_run = ArcMerger._is_reversed(run[0])
+        first = run[0]
+        name = f"{first.name}_{run[-1].name}"
+
+        # A whole turn can not be described by an arc (start and end angles would be the same), it is drawn as a circle
+        # from the point the trace reaches it at, in the direction of the trace
+        if ArcMerger._sweep(run) >= 2 * pi - 1e-9:
+            self.merged_arcs += len(run)
+            return Circle(name, first.center, first.radius, first.lifting,
+                          self.circle_velocity if self.circle_velocity is not None else first.velocity,
+                          first.float_precision, start_angle=degrees(first.end_angle if reversed_run else first.start_angle),
+                          clockwise=reversed_run)
+
+        # Counter-clockwise order of the arcs on the circle
+        ordered = run[::-1] if reversed_run else run
+
+        arc = Arc(name, center=ordered[0].center, radius=ordered[0].radius,
+                  start_angle=degrees(ordered[0].start_angle), end_angle=degrees(ordered[-1].end_angle), clockwise=False,
+                  lifting=first.lifting, velocity=first.velocity, float_precision=first.float_precision)
+
+        if reversed_run:
+            arc.reverse_points()
+
+        self.merged_arcs += len(run)
+        return arc
@@ -0,0 +1,158 @@
+"""
+Spatial index used by the detector to answer proximity queries (nearest trace end, endpoints inside a tolerance)
+without comparing every point against every other point.
+
+The drawings are planar so the grid buckets the points by their XY coordinates, distances are still measured in 3D.
+"""
+from typing import Dict, List, Tuple, Iterable
+from RoboForger.fig_types import Point3D
+from math import dist, floor, sqrt, inf
+
+
+class SpatialGrid:
+    """
+    Uniform grid (spatial hash) over the XY plane. Every point is stored under an integer key chosen by the caller so
+    it can be removed later on.
+    """
+    def __init__(self, cell_size: float):
+        if cell_size <= 0:
+            raise ValueError("Cell size must be a positive number.")
+
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], Dict[int, Point3D]] = {}
+        self._count = 0
+
+        # Occupied cell index bounds, they only grow so ring searches know when to stop
+        self._min_cell = (0, 0)
+        self._max_cell = (0, 0)
+
+    @staticmethod
+    def cell_size_for(points: Iterable[Point3D], count: int) -> float:
+        """
+        Cell size that leaves roughly one point per cell for the bounding box of the given points.
+        """
+        points = list(points)
+        if not points or count <= 0:
+            return 1.0
+
+        width = max(p[0] for p in points) - min(p[0] for p in points)
+        height = max(p[1] for p in points) - min(p[1] for p in points)
+
+        size = sqrt(width * height / count) if width * height > 0 else max(width, height) / count
+        return size if size > 0 else 1.0
+
+    def _cell(self, point: Point3D) -> Tuple[int, int]:
+        return floor(point[0] / self.cell_size), floor(point[1] / self.cell_size)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def insert(self, key: int, point: Point3D):
+        cell = self._cell(point)
+
+        if not self._count:
+            self._min_cell = self._max_cell = cell
+        else:
+            self._min_cell = (min(self._min_cell[0], cell[0]), min(self._min_cell[1], cell[1]))
+            self._max_cell = (max(self._max_cell[0], cell[0]), max(self._max_cell[1], cell[1]))
+
+        bucket = self._cells.setdefault(cell, {})
+        if key not in bucket:
+            self._count += 1
+        bucket[key] = point
+
+    def remove(self, key: int, point: Point3D):
+        cell = self._cell(point)
+        bucket = self._cells.get(cell)
+
+        if bucket is None or key not in bucket:
+            raise KeyError(f"Key {key} is not stored at {point}.")
+
+        del bucket[key]
+        self._count -= 1
+
+        # Drop empty cells so the brute force fallback only visits occupied ones
+        if not bucket:
+            del self._cells[cell]
+
+    def _ring(self, center: Tuple[int, int], radius: int) -> Iterable[Tuple[int, int]]:
+        """
+        Cells whose Chebyshev distance to the center cell is exactly radius.
+        """
+        cx, cy = center
+        if radius == 0:
+            yield center
+            return
+
+        for x in range(cx - radius, cx + radius + 1):
+            yield x, cy - radius
+            yield x, cy + radius
+
+        for y in range(cy - radius + 1, cy + radius):
+            yield cx - radius, y
+            yield cx + radius, y
+
+    def nearest(self, point: Point3D, max_distance: float = inf) -> Tuple[int, float] | None:
+        """
+        Returns the (key, distance) of the closest stored point, or None if there is no point within max_distance.
+        """
+        if not self._count:
+            return None
+
+        center = self._cell(point)
+        max_radius = max(center[0] - self._min_cell[0], self._max_cell[0] - center[0],
+                         center[1] - self._min_cell[1], self._max_cell[1] - center[1])
+
+        best_key, best_distance = -1, max_distance
+        visited_cells = 0
+
+        for radius in range(max_radius + 1):
+            # Any point on this ring is at least (radius - 1) cells away
+            if (radius - 1) * self.cell_size > best_distance:
+                break
+
+            # Once the rings cover more cells than the occupied ones it is cheaper to scan the occupied cells
+            visited_cells += 8 * radius if radius else 1
+            if visited_cells > len(self._cells):
+                return self._nearest_brute_force(point, max_distance)
+
+            for cell in self._ring(center, radius):
+                for key, other in self._cells.get(cell, {}).items():
+                    distance = dist(point, other)
+                    if distance < best_distance or (distance == best_distance and best_key == -1):
+                        best_key, best_distance = key, distance
+
+        if best_key == -1:
+            return None
+
+        return best_key, best_distance
+
+    def _nearest_brute_force(self, point: Point3D, max_distance: float) -> Tuple[int, float] | None:
+        best_key, best_distance = -1, max_distance
+
+        for bucket in self._cells.values():
+            for key, other in bucket.items():
+                distance = dist(point, other)
+                if distance < best_distance or (distance == best_distance and best_key == -1):
+                    best_key, best_distance = key, distance
+
+        if best_key == -1:
+            return None
+
+        return best_key, best_distance
+
+    def within(self, point: Point3D, radius: float) -> List[Tuple[int, Point3D]]:
+        """
+        Returns every (key, point) stored at a distance <= radius of the given point.
+        """
+        reach = max(1, int(radius // self.cell_size) + 1)
+        cx, cy = self._cell(point)
+
+        found: List[Tuple[int, Point3D]] = []
+        for x in range(cx - reach, cx + reach + 1):
+            for y in range(cy - reach, cy + reach + 1):
+                for key, other in self._cells.get((x, y), {}).items():
+                    if dist(point, other) <= radius:
+                        found.append((key, other))
+
+        return found
@@ -1,6 +1,8 @@
 from RoboForger.drawing.figures import Figure
 from typing import Dict, List, Tuple, Any, Set
 from RoboForger.fig_types import Point3D
+from RoboForger.detector.enums import TraceMode
+from RoboForger.detector.spatial import SpatialGrid
 
 import time
 import logging
@@ -10,27 +12,82 @@ class Tracer:
     """
     Tracer builds traces
     """
-    def __init__(self, figures: List[Figure]):
+    def __init__(self, figures: List[Figure], mode: TraceMode = TraceMode.EULERIAN, snap_tolerance: float = 0.0):
         self.figures = figures
+        self.mode = mode
+        self.snap_tolerance = snap_tolerance
 
         logging.info(f"{len(figures)} figures inputted")
 
+        # Join the end points that only differ by float noise before keying the graph on exact points
+        self.merged_endpoints = self.snap_figures(figures, snap_tolerance)
+        logging.info(f"Snapped {self.merged_endpoints} figure end points within a tolerance of {snap_tolerance}")
+
         self.graph = self.create_graph_from_figures(figures)
         # print(f"Graph adjacency list: {self.graph}")
 
         # Benchmark printing
         logging.info(f"Initial time saved:")
         init_time = time.time()
-        self.vtx_traces = self.find_traces(self.graph)
+        if self.mode == TraceMode.EULERIAN:
+            self.vtx_traces = self.find_eulerian_traces(figures)
+        else:
+            self.vtx_traces = self.find_traces(self.graph)
         end_time = time.time()
-        logging.info(f"Found {len(self.vtx_traces)} traces for {len(figures)} figures in {(end_time - init_time) * 1000} milliseconds")
+        logging.info(f"Found {len(self.vtx_traces)} traces ({self.mode.value}) for {len(figures)} figures in {(end_time - init_time) * 1000} milliseconds")
 
         amount_figures = 0
         for vtx_trace in self.vtx_traces:
             amount_figures += len(vtx_trace) - 1
         # print(f"In vtx traces detected draw of {amount_figures} figures")
 
-        self.figure_traces = self.vtx_traces2fig_traces(self.vtx_traces, self.figures)
+        # The Eulerian trails can pass several times through a vertex or use parallel edges, so the direction of every
+        # figure is taken from the trail instead of being guessed from the end points shared with its neighbours
+        self.oriented = self.mode == TraceMode.EULERIAN
+        self.figure_traces, self.uncovered_figures = self.vtx_traces2fig_traces(self.vtx_traces, self.figures,
+                                                                                orient=self.oriented)
+
+        if self.uncovered_figures:
+            logging.warning(f"{len(self.uncovered_figures)} figures were not covered by any trace: "
+                            f"{[fig.name for fig in self.uncovered_figures]}")
+
+    @staticmethod
+    def snap_figures(figures: List[Figure], tolerance: float) -> int:
+        """
+        Moves every figure end point that is within tolerance of an already seen end point onto that point, so they
+        become the same vertex of the graph. The seen points are kept in a spatial grid with cells of the tolerance
+        size, so each lookup only visits the neighbour cells and the whole pass is O(n).
+
+        Returns the number of end points that were moved.
+        """
+        if tolerance <= 0:
+            return 0
+
+        grid = SpatialGrid(tolerance)
+        vertices: List[Point3D] = []
+        merged = 0
+
+        for figure in figures:
+            snapped: List[Point3D] = []
+
+            for point in (figure.start_point, figure.end_point):
+                found = grid.nearest(point, max_distance=tolerance)
+
+                if found is None:
+                    grid.insert(len(vertices), point)
+                    vertices.append(point)
+                    snapped.append(point)
+                    continue
+
+                vertex = vertices[found[0]]
+                if vertex != point:
+                    merged += 1
+                snapped.append(vertex)
+
+            if snapped[0] != figure.start_point or snapped[1] != figure.end_point:
+                figure.move_end_points(snapped[0], snapped[1])
+
+        return merged
 
     @staticmethod
     def create_graph_from_figures(figures: List[Figure]):
@@ -113,57 +170,206 @@ class Tracer:
         return traces
 
     @staticmethod
-    def vtx_traces2fig_traces(vtx_traces: List[List[Point3D]], figures: List[Figure]) -> List[List[Figure]]:
+    def find_eulerian_traces(figures: List[Figure]) -> List[List[Point3D]]:
         """
-        Convert vertex traces to figure traces based on the original figures.
+        Cover every figure with the fewest traces possible. A connected component with 2k odd degree vertices can not
+        be drawn with less than k traces, so we pair its odd vertices with k - 1 virtual pen-up connectors, walk the
+        augmented multigraph with Hierholzer's algorithm and split the resulting trail at the connectors.
+
+        Runs in O(V + E) besides sorting the odd vertices of each component.
         """
-        figure_traces: List[List[Figure]] = []
+        # Edge i joins edge_ends[i], the edges after the figures are the pen-up connectors
+        edge_ends: List[Tuple[Point3D, Point3D]] = [(figure.start_point, figure.end_point) for figure in figures]
+        figures_count = len(edge_ends)
+
+        # Self loops (circles) are appended twice so they count 2 for the degree
+        incidence: Dict[Point3D, List[int]] = {}
+        for edge_id, (start, end) in enumerate(edge_ends):
+            incidence.setdefault(start, []).append(edge_id)
+            incidence.setdefault(end, []).append(edge_id)
+
+        traces: List[List[Point3D]] = []
+        used: List[bool] = [False] * figures_count
+        seen: Set[Point3D] = set()
+
+        for root in list(incidence.keys()):
+            if root in seen:
+                continue
+
+            component = Tracer._collect_component(root, incidence, edge_ends, seen)
+
+            # Keep the first two odd vertices as the ends of the trail and connect the rest in pairs
+            odd_vertices = sorted(vtx for vtx in component if len(incidence[vtx]) % 2 == 1)
+            for start, end in zip(odd_vertices[2::2], odd_vertices[3::2]):
+                incidence[start].append(len(edge_ends))
+                incidence[end].append(len(edge_ends))
+                edge_ends.append((start, end))
+                used.append(False)
+
+            trail = Tracer._hierholzer(odd_vertices[0] if odd_vertices else root, incidence, edge_ends, used)
+
+            # Split the trail wherever the robot has to travel through a connector
+            trace: List[Point3D] = [trail[0][0]]
+            for vtx, edge_id in trail[1:]:
+                if edge_id >= figures_count:
+                    traces.append(trace)
+                    trace = [vtx]
+                else:
+                    trace.append(vtx)
+            traces.append(trace)
+
+        return traces
+
+    @staticmethod
+    def _collect_component(root: Point3D, incidence: Dict[Point3D, List[int]], edge_ends: List[Tuple[Point3D, Point3D]], seen: Set[Point3D]) -> List[Point3D]:
+        """
+        Collect the vertices connected to root with an iterative DFS, marking them as seen.
+        """
+        component: List[Point3D] = []
+        stack: List[Point3D] = [root]
+        seen.add(root)
+
+        while stack:
+            vtx = stack.pop()
+            component.append(vtx)
+
+            for edge_id in incidence[vtx]:
+                start, end = edge_ends[edge_id]
+                adj = end if start == vtx else start
+                if adj not in seen:
+                    seen.add(adj)
+                    stack.append(adj)
+
+        return component
 
-        # Hash vtx to fig, for each fig hash their vtx to the fig
-        vtx_fig_hash: Dict[Tuple[Point3D, Point3D], List[Figure]] = {}
+    @staticmethod
+    def _hierholzer(start: Point3D, incidence: Dict[Point3D, List[int]], edge_ends: List[Tuple[Point3D, Point3D]], used: List[bool]) -> List[Tuple[Point3D, int]]:
+        """
+        Iterative Hierholzer's algorithm. Returns the trail as (vertex, edge used to reach the vertex) pairs, the first
+        vertex is reached by edge -1. Every edge is visited once thanks to the per vertex pointer over its incidence list.
+        """
+        pointer: Dict[Point3D, int] = {}
+        stack: List[Tuple[Point3D, int]] = [(start, -1)]
+        trail: List[Tuple[Point3D, int]] = []
+
+        while stack:
+            vtx = stack[-1][0]
+            edges = incidence[vtx]
+
+            i = pointer.get(vtx, 0)
+            while i < len(edges) and used[edges[i]]:
+                i += 1
+            pointer[vtx] = i
+
+            if i == len(edges):
+                trail.append(stack.pop())
+                continue
+
+            edge_id = edges[i]
+            used[edge_id] = True
+            edge_start, edge_end = edge_ends[edge_id]
+            stack.append((edge_end if edge_start == vtx else edge_start, edge_id))
+
+        trail.reverse()
+        return trail
+
+    @staticmethod
+    def build_edge_index(figures: List[Figure]) -> Dict[Tuple[Point3D, Point3D], List[Figure]]:
+        """
+        Multimap from the direction independent key of an edge to the figures joining its two vertices, in input order.
+        The index is never modified while converting traces, so it can be reused for several conversions.
+        """
+        edge_index: Dict[Tuple[Point3D, Point3D], List[Figure]] = {}
         for fig in figures:
-            if not vtx_fig_hash.get((fig.start_point, fig.end_point)):
-                vtx_fig_hash[(fig.start_point, fig.end_point)] = []
+            edge_index.setdefault(Tracer._edge_key(fig.start_point, fig.end_point), []).append(fig)
+
+        return edge_index
+
+    @staticmethod
+    def vtx_traces2fig_traces(vtx_traces: List[List[Point3D]], figures: List[Figure],
+                              edge_index: Dict[Tuple[Point3D, Point3D], List[Figure]] | None = None,
+                              orient: bool = False) -> Tuple[List[List[Figure]], List[Figure]]:
+        """
+        Convert vertex traces to figure traces based on the original figures.
 
-            if not vtx_fig_hash.get((fig.end_point, fig.start_point)):
-                vtx_fig_hash[(fig.end_point, fig.start_point)] = []
+        Every step of a vertex trace takes a not yet covered figure of that edge, coverage is tracked by figure id so the
+        whole conversion is linear in the number of figures plus the length of the traces.
+        Returns the figure traces and the figures that no trace covered (empty when tracing was complete).
 
-            vtx_fig_hash[(fig.start_point, fig.end_point)].append(fig)
-            vtx_fig_hash[(fig.end_point, fig.start_point)].append(fig)
+        :param orient: If True every figure is reversed when it does not start at the vertex the trace walks it from, so
+        the figure traces are continuous as they are.
+        """
+        if edge_index is None:
+            edge_index = Tracer.build_edge_index(figures)
+
+        covered: Set[int] = set()
+        # Position of the next candidate in each edge list, figures are taken from the end of the list
+        cursors: Dict[Tuple[Point3D, Point3D], int] = {}
+
+        def take(vtx_a: Point3D, vtx_b: Point3D) -> Figure | None:
+            fig = find(vtx_a, vtx_b)
+
+            if fig is not None and orient and fig.start_point != vtx_a:
+                fig.reverse_points()
+
+            return fig
+
+        def find(vtx_a: Point3D, vtx_b: Point3D) -> Figure | None:
+            key = Tracer._edge_key(vtx_a, vtx_b)
+            candidates = edge_index.get(key)
+            if not candidates:
+                return None
+
+            position = cursors.get(key, len(candidates) - 1)
+            while position >= 0 and id(candidates[position]) in covered:
+                position -= 1
+            cursors[key] = position - 1
+
+            if position < 0:
+                return None
+
+            fig = candidates[position]
+            covered.add(id(fig))
+            return fig
+
+        figure_traces: List[List[Figure]] = []
+        # Last figure trace of each vertex trace, that is the one a closing edge is appended to
+        closing_traces: List[Tuple[List[Point3D], List[Figure]]] = []
 
         for vtx_trace in vtx_traces:
 
             fig_trace: List[Figure] = []
 
             for i in range(len(vtx_trace) - 1):
+                fig = take(vtx_trace[i], vtx_trace[i + 1])
 
-                # Find the fig and pop it from the list so when access again will be another figure
-                fig = vtx_fig_hash.get((vtx_trace[i], vtx_trace[i + 1])).pop()
+                # An edge without figures left breaks the trace, the rest is drawn as another trace
+                if fig is None:
+                    if fig_trace:
+                        figure_traces.append(fig_trace)
+                    fig_trace = []
+                    continue
 
                 fig_trace.append(fig)
 
-            last_fig_list = vtx_fig_hash.get((vtx_trace[-1], vtx_trace[0]))
+            figure_traces.append(fig_trace)
+            closing_traces.append((vtx_trace, fig_trace))
 
-            if last_fig_list:
-                last_fig = last_fig_list.pop()
-                if last_fig and last_fig not in fig_trace:
-                    fig_trace.append(last_fig)
+        # Closing edges are only taken once every trace got its own figures, otherwise a trace could steal them
+        for vtx_trace, fig_trace in closing_traces:
+            last_fig = take(vtx_trace[-1], vtx_trace[0])
+            if last_fig:
+                fig_trace.append(last_fig)
 
-            if fig_trace:
-                figure_traces.append(fig_trace)
+        figure_traces = [fig_trace for fig_trace in figure_traces if fig_trace]
 
-        # JUST IN CASE IT OMITTED FIGURES APPEND IT AT THE FINAL
-        for fig in figures:
-            in_trace = False
-            for fig_trace in figure_traces:
-                if fig in fig_trace:
-                    in_trace = True
-                    break
-
-            if not in_trace:
-                figure_traces.append([fig])
-                # print(f"Figure {fig.name} not in traces, appending it as a single figure trace.")
-
-        # print(f"Vertex traces: {vtx_traces}")
-        # print(f"Figure traces: {figure_traces}")
-        return figure_traces
+        uncovered = [fig for fig in figures if id(fig) not in covered]
+
+        return figure_traces, uncovered
+
+    @staticmethod
+    def _edge_key(vtx_a: Point3D, vtx_b: Point3D) -> Tuple[Point3D, Point3D]:
+        """
+        Direction independent key of the edge between two vertices.
+        """
+        return (vtx_a, vtx_b) if vtx_a <= vtx_b else (vtx_b, vtx_a)
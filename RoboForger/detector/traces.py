@@ -8,52 +8,91 @@ The logic is that:
 from typing import List, Dict, Tuple, Set
 
 from RoboForger.drawing.figures import Figure
+from RoboForger.fig_types import Point3D
 from .enums import ConnectionType
+from .spatial import SpatialGrid
+from math import dist
 
 import logging
 
 
-def is_figure_connected(start_figure: Figure, end_figure: Figure) -> ConnectionType:
+def is_same_point(point_a: Point3D, point_b: Point3D, tolerance: float = 0.0) -> bool:
+    """
+    Exact comparison when tolerance is 0, otherwise the points are the same if they are closer than tolerance.
+    """
+    if tolerance <= 0:
+        return point_a == point_b
+
+    return dist(point_a, point_b) <= tolerance
+
+def is_figure_connected(start_figure: Figure, end_figure: Figure, tolerance: float = 0.0) -> ConnectionType:
 
-    if start_figure.end_point == end_figure.start_point:
+    if is_same_point(start_figure.end_point, end_figure.start_point, tolerance):
         return ConnectionType.END2START
 
-    if start_figure.start_point == end_figure.end_point:
+    if is_same_point(start_figure.start_point, end_figure.end_point, tolerance):
         return ConnectionType.START2END
 
-    if start_figure.start_point == end_figure.start_point:
+    if is_same_point(start_figure.start_point, end_figure.start_point, tolerance):
         return ConnectionType.START2START
 
-    if start_figure.end_point == end_figure.end_point:
+    if is_same_point(start_figure.end_point, end_figure.end_point, tolerance):
         return ConnectionType.END2END
 
     # print(f"Figure {start_figure.name} with points: {start_figure.start_point}|{start_figure.end_point} is not connected "
     #       f"to figure {end_figure.name} with points: {end_figure.start_point}|{end_figure.end_point}.")
     return ConnectionType.DISCONNECTED
 
-def create_graph_from_figures(figures: List[Figure]) -> Dict[Figure, List[Figure]]:
+def _endpoint_keys(figures: List[Figure], tolerance: float = 0.0) -> List[Tuple[Point3D, Point3D]]:
     """
-    Given a list of figures, create a graph represented as an adjacency list.
+    Returns the (start, end) key of every figure. Without tolerance the keys are the points themselves, otherwise each
+    point is replaced by the first seen point within tolerance (looked up in a spatial grid so it stays O(n)).
     """
-    graph: Dict[Figure, List[Figure]] = {}
+    if tolerance <= 0:
+        return [(figure.start_point, figure.end_point) for figure in figures]
 
-    for figure in figures:
-        graph[figure] = []
+    grid = SpatialGrid(tolerance)
+    vertices: List[Point3D] = []
+
+    def key_of(point: Point3D) -> Point3D:
+        found = grid.nearest(point, max_distance=tolerance)
+        if found is not None:
+            return vertices[found[0]]
 
-        for other_figure in figures:
+        grid.insert(len(vertices), point)
+        vertices.append(point)
+        return point
 
-            if figure == other_figure:
-                continue
+    return [(key_of(figure.start_point), key_of(figure.end_point)) for figure in figures]
 
-            connection_type = is_figure_connected(figure, other_figure)
+def create_graph_from_figures(figures: List[Figure], tolerance: float = 0.0) -> Dict[Figure, List[Figure]]:
+    """
+    Given a list of figures, create a graph represented as an adjacency list.
+    End points closer than tolerance are considered connected.
+
+    We only care if the next figure is connected at the end or at the start of the current figure (END2START and
+    START2END), so the figures are indexed by their start and end points and each figure looks its neighbours up
+    in those indexes instead of being compared against every other figure.
+    """
+    keys = _endpoint_keys(figures, tolerance)
+
+    # Figure indexes (in input order) keyed by the point where they start/end
+    starts: Dict[Point3D, List[int]] = {}
+    ends: Dict[Point3D, List[int]] = {}
+    for i, (start, end) in enumerate(keys):
+        starts.setdefault(start, []).append(i)
+        ends.setdefault(end, []).append(i)
+
+    graph: Dict[Figure, List[Figure]] = {}
 
-            # In reality we just care if the next figure is connected at the end or at the start of the current figure
-            # if connection_type != ConnectionType.DISCONNECTED:
-            #     graph[figure].append(other_figure)
+    for i, figure in enumerate(figures):
+        start, end = keys[i]
 
-            if connection_type == ConnectionType.START2END or connection_type == ConnectionType.END2START:
-                graph[figure].append(other_figure)
+        neighbours = set(starts.get(end, ()))
+        neighbours.update(ends.get(start, ()))
+        neighbours.discard(i)
 
+        graph[figure] = [figures[j] for j in sorted(neighbours)]
 
         # print(f"Figure {figure.name} has {len(graph[figure])} connections.")
 
@@ -86,6 +125,8 @@ def trace_for_figure(
 
     # Path is a list of tuples that contains a figure and its possible next figuresm (adjacency)
     path: List[Tuple[Figure, List[Figure]]] = [(figure, [n for n in graph[figure] if n not in globally_visited])]
+    # Figures currently in path, kept alongside the stack so membership checks are O(1)
+    in_path: Set[Figure] = {figure}
 
     while path:
         # Check if the current path is longer than the longest trace found so far
@@ -93,16 +134,17 @@ def trace_for_figure(
             longest_trace = [p[0] for p in path]
 
         if not path[-1][1]:
-            path.pop()
+            in_path.discard(path.pop()[0])
             continue
 
         # If everything is right just add the next step in path
         next_node = path[-1][1].pop()
-        next_adj = [adj for adj in graph[next_node] if adj not in globally_visited and adj not in [p[0] for p in path]]
+        next_adj = [adj for adj in graph[next_node] if adj not in globally_visited and adj not in in_path]
 
         next_step = (next_node, next_adj)
 
         path.append(next_step)
+        in_path.add(next_node)
 
     return longest_trace
 
@@ -0,0 +1,215 @@
+"""
+Travel optimizer orders the detected traces so the robot spends as little time as possible moving with the tool lifted.
+
+Every trace can be drawn from any of its two ends, so the optimizer decides which trace comes next and from which end
+it is entered. It starts with a nearest neighbour tour (answered by a spatial grid) and then improves it with 2-opt
+(reversing a run of traces) and Or-opt (moving up to three consecutive traces somewhere else) until no move improves
+the tour or the time budget runs out. The tour cost includes the way back to the end point (the program returns to its
+origin after the last trace).
+"""
+from typing import List, Tuple
+from RoboForger.drawing.figures import Figure
+from RoboForger.fig_types import Point3D
+from RoboForger.detector.spatial import SpatialGrid
+from math import dist
+
+import time
+import logging
+
+
+class TravelOptimizer:
+    def __init__(self, traces: List[List[Figure]], start_point: Point3D | None = None, time_budget: float = 1.0,
+                 end_point: Point3D | None = None):
+        """
+        :param traces: Continuous traces (see Detector.ensure_continuity), each one is drawn from its first figure start
+        point to its last figure end point.
+        :param start_point: Where the tool is before drawing the first trace, None if it does not matter.
+        :param time_budget: Seconds the 2-opt/Or-opt improvement is allowed to run.
+        :param end_point: Where the tool goes after the last trace, None if it does not matter.
+        """
+        self.traces = [trace for trace in traces if trace]
+        self.start_point = start_point
+        self.end_point = end_point
+        self.time_budget = time_budget
+
+        self._entries: List[Point3D] = [trace[0].start_point for trace in self.traces]
+        self._exits: List[Point3D] = [trace[-1].end_point for trace in self.traces]
+        self._flipped: List[bool] = [False] * len(self.traces)
+
+        self.initial_travel = self._tour_travel(list(range(len(self.traces))))
+        self.final_travel = self.initial_travel
+
+    def _entry(self, trace: int) -> Point3D:
+        return self._exits[trace] if self._flipped[trace] else self._entries[trace]
+
+    def _exit(self, trace: int) -> Point3D:
+        return self._entries[trace] if self._flipped[trace] else self._exits[trace]
+
+    @staticmethod
+    def _travel(point_a: Point3D | None, point_b: Point3D | None) -> float:
+        """
+        Pen-up distance between two points, a missing point (tour start or end without start or end point) costs nothing.
+        """
+        if point_a is None or point_b is None:
+            return 0.0
+        return dist(point_a, point_b)
+
+    def _tour_travel(self, tour: List[int]) -> float:
+        travel = 0.0
+        position = self.start_point
+
+        for trace in tour:
+            travel += self._travel(position, self._entry(trace))
+            position = self._exit(trace)
+
+        return travel + self._travel(position, self.end_point)
+
+    def optimize(self) -> List[List[Figure]]:
+        """
+        Returns the traces in the optimized order, the figures of the traces entered from their end are reversed.
+        """
+        if len(self.traces) < 2 and self.start_point is None and self.end_point is None:
+            return self.traces
+
+        tour = self._nearest_neighbour_tour()
+        nearest_travel = self._tour_travel(tour)
+
+        deadline = time.perf_counter() + self.time_budget
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = self._two_opt_pass(tour, deadline)
+            improved = self._or_opt_pass(tour, deadline) or improved
+
+        self.final_travel = self._tour_travel(tour)
+
+        logging.info(f"Pen-up travel: {self.initial_travel:.2f} initially, {nearest_travel:.2f} after nearest neighbour, "
+                     f"{self.final_travel:.2f} after 2-opt/Or-opt for {len(tour)} traces")
+
+        ordered: List[List[Figure]] = []
+        for trace in tour:
+            figures = self.traces[trace]
+
+            if self._flipped[trace]:
+                figures.reverse()
+                for figure in figures:
+                    figure.reverse_points()
+
+            ordered.append(figures)
+
+        return ordered
+
+    def _nearest_neighbour_tour(self) -> List[int]:
+        """
+        Greedy tour, from the current position go to the closest free trace end. Key 2 * i is the entry of trace i and
+        key 2 * i + 1 its exit, entering by the exit means the trace gets flipped.
+        """
+        ends = self._entries + self._exits
+        grid = SpatialGrid(SpatialGrid.cell_size_for(ends, len(ends)))
+
+        for trace in range(len(self.traces)):
+            grid.insert(2 * trace, self._entries[trace])
+            grid.insert(2 * trace + 1, self._exits[trace])
+
+        tour: List[int] = []
+        position = self.start_point if self.start_point is not None else self._entries[0]
+
+        while len(grid):
+            key, _ = grid.nearest(position)
+            trace = key // 2
+
+            grid.remove(2 * trace, self._entries[trace])
+            grid.remove(2 * trace + 1, self._exits[trace])
+
+            self._flipped[trace] = key % 2 == 1
+            tour.append(trace)
+            position = self._exit(trace)
+
+        return tour
+
+    def _flip_segment(self, tour: List[int], first: int, last: int):
+        """
+        Reverse the traces between first and last (inclusive), each one is then drawn in the other direction.
+        """
+        tour[first:last + 1] = tour[first:last + 1][::-1]
+        for trace in tour[first:last + 1]:
+            self._flipped[trace] = not self._flipped[trace]
+
+    def _two_opt_pass(self, tour: List[int], deadline: float) -> bool:
+        improved = False
+
+        for i in range(len(tour)):
+            if time.perf_counter() > deadline:
+                break
+
+            previous = self.start_point if i == 0 else self._exit(tour[i - 1])
+
+            for j in range(i, len(tour)):
+                entry_i = self._entry(tour[i])
+                exit_j = self._exit(tour[j])
+                following = self._entry(tour[j + 1]) if j + 1 < len(tour) else self.end_point
+
+                current = self._travel(previous, entry_i) + self._travel(exit_j, following)
+                reversed_ = self._travel(previous, exit_j) + self._travel(entry_i, following)
+
+                if reversed_ < current - 1e-9:
+                    self._flip_segment(tour, i, j)
+                    improved = True
+
+        return improved
+
+    def _or_opt_pass(self, tour: List[int], deadline: float) -> bool:
+        improved = False
+
+        for length in (1, 2, 3):
+            i = 0
+            while i + length <= len(tour):
+                if time.perf_counter() > deadline:
+                    return improved
+
+                if self._relocate_segment(tour, i, length):
+                    improved = True
+                i += 1
+
+        return improved
+
+    def _relocate_segment(self, tour: List[int], first: int, length: int) -> bool:
+        """
+        Try to move tour[first:first + length] (optionally reversed) to the best other position of the tour.
+        """
+        segment = tour[first:first + length]
+        rest = tour[:first] + tour[first + length:]
+
+        previous = self.start_point if first == 0 else self._exit(tour[first - 1])
+        following = self._entry(tour[first + length]) if first + length < len(tour) else self.end_point
+        segment_entry = self._entry(segment[0])
+        segment_exit = self._exit(segment[-1])
+
+        removal_gain = (self._travel(previous, segment_entry) + self._travel(segment_exit, following)
+                        - self._travel(previous, following))
+
+        best_cost, best_position, best_reversed = removal_gain - 1e-9, -1, False
+
+        for position in range(len(rest) + 1):
+            if position == first:
+                continue
+
+            before = self.start_point if position == 0 else self._exit(rest[position - 1])
+            after = self._entry(rest[position]) if position < len(rest) else self.end_point
+            gap = self._travel(before, after)
+
+            forward = self._travel(before, segment_entry) + self._travel(segment_exit, after) - gap
+            backward = self._travel(before, segment_exit) + self._travel(segment_entry, after) - gap
+
+            if forward < best_cost:
+                best_cost, best_position, best_reversed = forward, position, False
+            if backward < best_cost:
+                best_cost, best_position, best_reversed = backward, position, True
+
+        if best_position == -1:
+            return False
+
+        tour[:] = rest[:best_position] + segment + rest[best_position:]
+        if best_reversed:
+            self._flip_segment(tour, best_position, best_position + length - 1)
+
+        return True
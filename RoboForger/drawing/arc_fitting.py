@@ -0,0 +1,196 @@
+"""
+Arc fitting turns a chain of sampled points (a spline already sampled by BSpline) into a short sequence of circular arcs
+and lines, so the robot gets a few MoveC instead of one MoveL per sample.
+
+The arcs are fitted greedily and mostly tangent continuous: every arc starts tangent to where the previous segment ended,
+so the arc is fixed by its end point alone (a circle tangent to a direction at a point and passing through another point).
+That tangent drifts from the samples (a line ends along its chord), so the tangent of the samples at the start is tried
+as well and the one reaching farther wins, the small tangent break it may leave is blended by the zones.
+From each start the end point is pushed forward (doubling, then binary search) while every sample in between stays
+within the tolerance of the arc, or of the chord when a line fits. Arcs are kept under half a turn (MoveC circle point
+must be unambiguous), and the drawings are planar so the fitting is done on XY.
+"""
+from enum import Enum
+from typing import List, Sequence, Tuple
+from RoboForger.fig_types import Point3D
+
+import numpy as np
+
+
+class SegmentKind(Enum):
+    LINE = "line"
+    ARC = "arc"
+
+
+class FittedSegment:
+    """
+    A fitted line (end) or arc (circle point mid and end). Segments are chained, each one starts at the end of the
+    previous one.
+    """
+    __slots__ = ("kind", "mid", "end")
+
+    def __init__(self, kind: SegmentKind, end: Point3D, mid: Point3D | None = None):
+        self.kind = kind
+        self.end = end
+        self.mid = mid
+
+    def __repr__(self):
+        return f"FittedSegment<kind={self.kind.value} mid={self.mid} end={self.end}>"
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def _initial_tangent(points: np.ndarray) -> np.ndarray:
+    """
+    Tangent at the first point of the circle through the first three points, the first chord if they are collinear.
+    """
+    chord = _unit(points[1] - points[0])
+    if len(points) < 3:
+        return chord
+
+    a, b = points[1] - points[0], points[2] - points[0]
+    cross = a[0] * b[1] - a[1] * b[0]
+    if abs(cross) < 1e-12:
+        return chord
+
+    # Circumcenter relative to the first point
+    a2, b2 = a @ a, b @ b
+    center = np.array([b[1] * a2 - a[1] * b2, a[0] * b2 - b[0] * a2]) / (2 * cross)
+
+    # Perpendicular to the radius, oriented towards the second point
+    tangent = _unit(np.array([center[1], -center[0]]))
+    return tangent if tangent @ chord >= 0 else -tangent
+
+
+def _fit(points: np.ndarray, first: int, last: int, tangent: np.ndarray, tolerance: float) -> Tuple[SegmentKind, np.ndarray | None, np.ndarray] | None:
+    """
+    Tries to cover points[first..last] with one segment starting at points[first] with the given tangent. Returns
+    (kind, circle point, end tangent) or None if no segment stays within the tolerance.
+    """
+    start, end = points[first], points[last]
+    inner = points[first + 1:last]
+    chord = end - start
+    length2 = chord @ chord
+
+    if length2 == 0:
+        return None
+
+    direction = chord / np.sqrt(length2)
+
+    # Line: every inner point close to the chord
+    if not len(inner):
+        line_fits = True
+    else:
+        along = np.clip((inner - start) @ direction, 0.0, np.sqrt(length2))
+        line_fits = np.max(np.linalg.norm(inner - (start + along[:, None] * direction), axis=1)) <= tolerance
+
+    if line_fits:
+        return SegmentKind.LINE, None, direction
+
+    # Arc tangent to the start tangent, it turns twice the angle between tangent and chord so it must stay under 90°
+    dot = tangent @ chord
+    cross = tangent[0] * chord[1] - tangent[1] * chord[0]
+    if dot <= 0 or abs(cross) < 1e-12:
+        return None
+
+    curvature = 2 * cross / length2
+    radius = 1 / abs(curvature)
+    center = start + np.array([-tangent[1], tangent[0]]) / curvature
+
+    # Under half a turn the arc projects inside the chord, points projecting outside are measured to the closest end
+    along = (inner - start) @ direction
+    deviation = np.where((along >= 0) & (along <= np.sqrt(length2)),
+                         np.abs(np.linalg.norm(inner - center, axis=1) - radius),
+                         np.minimum(np.linalg.norm(inner - start, axis=1), np.linalg.norm(inner - end, axis=1)))
+
+    if np.max(deviation) > tolerance:
+        return None
+
+    mid = center + radius * _unit((start + end) / 2 - center)
+    end_tangent = 2 * (direction @ tangent) * direction - tangent
+
+    return SegmentKind.ARC, mid, end_tangent
+
+
+def _reach(points: np.ndarray, first: int, tangent: np.ndarray, tolerance: float) -> Tuple[int, Tuple[SegmentKind, np.ndarray | None, np.ndarray]]:
+    """
+    Farthest point a segment starting at points[first] with the given tangent covers within tolerance, and its fit.
+    """
+    last_index = len(points) - 1
+
+    # The next point alone always fits (a line with no inner points)
+    best_last, best_fit = first + 1, _fit(points, first, first + 1, tangent, tolerance)
+    if best_fit is None:
+        best_fit = (SegmentKind.LINE, None, _unit(points[first + 1] - points[first]))
+
+    # Double the reach while it fits, then binary search between the last fit and the first failure
+    step, failed = 2, None
+    while best_last < last_index:
+        candidate = min(first + step, last_index)
+        fit = _fit(points, first, candidate, tangent, tolerance)
+        if fit is None:
+            failed = candidate
+            break
+        best_last, best_fit = candidate, fit
+        step *= 2
+
+    if failed is not None:
+        low, high = best_last, failed
+        while high - low > 1:
+            middle = (low + high) // 2
+            fit = _fit(points, first, middle, tangent, tolerance)
+            if fit is None:
+                high = middle
+            else:
+                low, best_fit = middle, fit
+        best_last = low
+
+    return best_last, best_fit
+
+
+def fit_arcs(points: Sequence[Point3D], tolerance: float) -> List[FittedSegment]:
+    """
+    Fits lines and arcs to the points within tolerance (maximum distance of a point to its segment), the segments
+    start at points[0]. Points that are not on a plane of constant Z (or a tolerance <= 0) give one line per point.
+    """
+    points_array = np.asarray(points, dtype=float).reshape(-1, 3)
+
+    if len(points_array) < 2:
+        return []
+
+    if tolerance <= 0 or len(points_array) < 3 or np.ptp(points_array[:, 2]) > tolerance:
+        return [FittedSegment(SegmentKind.LINE, tuple(point)) for point in points_array[1:].tolist()]
+
+    # Drop repeated points, they have no direction
+    keep = np.concatenate([[True], np.any(np.diff(points_array[:, :2], axis=0) != 0, axis=1)])
+    points_array = points_array[keep]
+    xy = points_array[:, :2]
+    z = points_array[0, 2]
+
+    segments: List[FittedSegment] = []
+    tangent = _initial_tangent(xy)
+    first = 0
+    last_index = len(xy) - 1
+
+    while first < last_index:
+        # The tangent where the previous segment ended drifts from the samples (a line ends along its chord, an arc
+        # along its own circle), the tangent of the samples at the start is tried too and the longest reach is kept
+        best_last, best_fit = _reach(xy, first, tangent, tolerance)
+        if first > 0:
+            local_last, local_fit = _reach(xy, first, _initial_tangent(xy[first:first + 3]), tolerance)
+            if local_last > best_last:
+                best_last, best_fit = local_last, local_fit
+
+        kind, mid, tangent = best_fit
+        end = tuple(points_array[best_last].tolist())
+        if kind == SegmentKind.ARC:
+            segments.append(FittedSegment(kind, end, (float(mid[0]), float(mid[1]), float(z))))
+        else:
+            segments.append(FittedSegment(kind, end))
+
+        first = best_last
+
+    return segments
@@ -4,25 +4,65 @@ This module provides the Draw class that is used to generate Rapid Code for robo
 parameters such as tool name, velocity, workspace limits, origin, and zero point.
 Draw 'draws' the figures one after another, if detector is enabled it will unify figures that are close to each other
 """
-from typing import Any, List, Tuple
-from RoboForger.fig_types import Point3D
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, TextIO, Tuple
+from RoboForger.fig_types import Point3D, LimitViolation
 from .figures.figure import Figure
+from .moves import Move, ProgramItem, CycleTimeEstimator, blend_zones, format_move, format_items_offset
+from .rob_targets import RobTargetTable
 from RoboForger.detector.detector import Detector
+from RoboForger.detector.enums import TraceMode
+
+from itertools import chain
+
+import logging
+import numpy as np
 
 
 class Draw:
     def __init__(self, tool_name: str = "tool0", velocity: int = 1000,
                  workspace_limits: Tuple[Point3D, Point3D] = ((-810.0, -810.0, -450.0), (810, 810, 450.0)),
-                 origin: Point3D = (450.0, 0.0, 450.0), zero: Point3D = (0.0, 0.0, 0.0), use_detector: bool = True):
+                 origin: Point3D = (450.0, 0.0, 450.0), zero: Point3D = (0.0, 0.0, 0.0), use_detector: bool = True,
+                 trace_mode: TraceMode = TraceMode.EULERIAN, optimize_travel: bool = True, travel_time_budget: float = 1.0,
+                 snap_tolerance: float = 0.0, zone_tolerance: float = 0.0, sharp_corner_angle: float = 45.0,
+                 simplify_tolerance: float = 0.0, arc_merge_tolerance: float = 0.0, procedure_budget: int = 0,
+                 share_rob_targets: bool = False, circle_velocity: int | None = None):
+        """
+        :param zone_tolerance: Maximum distance (mm) the corner paths may cut from the drawn corners, the moves get the
+        biggest zone data within it. 0 stops at every point (fine).
+        :param sharp_corner_angle: Turns sharper than this (degrees) stop at the corner (fine) whatever the tolerance.
+        :param simplify_tolerance: The detector merges the consecutive polylines of a trace and drops the points within
+        this distance of the simplified polyline. 0 keeps every point.
+        :param arc_merge_tolerance: The detector merges the consecutive arcs of a trace whose centers and radii match
+        within this distance. 0 keeps every arc.
+        :param procedure_budget: Maximum move instructions per procedure, bigger programs are split in procedures (or
+        modules, see write_rapid_modules) called in order by main. 0 keeps the whole program in main.
+        :param share_rob_targets: In absolute mode every coordinate (rounded to 4 decimals) is declared as a single rob
+        target shared by all the figures of the module (see RobTargetTable), instead of one per figure point.
+        :param circle_velocity: Velocity of the circles the detector closes from a whole turn of arcs, None keeps the
+        arcs velocity.
+        """
         self.figures: List[Figure] = []
         self.tool_name = tool_name
         self.velocity = velocity
-        self.rob_targets = []
-        self.instructions = []
         self.workspace_limits = workspace_limits if workspace_limits else None  # (xmin, ymin, zmin), (xmax, ymax, zmax)
         self.origin = origin
         self.zero = zero  # zero point for the robot
         self.use_detector = use_detector
+        self.trace_mode = trace_mode
+        self.optimize_travel = optimize_travel
+        self.travel_time_budget = travel_time_budget
+        self.snap_tolerance = snap_tolerance
+        self.zone_tolerance = zone_tolerance
+        self.sharp_corner_angle = sharp_corner_angle
+        self.simplify_tolerance = simplify_tolerance
+        self.arc_merge_tolerance = arc_merge_tolerance
+        self.procedure_budget = procedure_budget
+        self.share_rob_targets = share_rob_targets
+        self.circle_velocity = circle_velocity
+        self.cycle_time_report: Dict[str, float] = {}
+
+        # Figures in drawing order found by the detector, set beforehand (e.g. from a cache) the detector is not run
+        self.detected_figures: List[Figure] | None = None
 
     def _is_within_limits(self, point: Point3D) -> bool:
         if not self.workspace_limits:
@@ -31,98 +71,192 @@ class Draw:
         x, y, z = point
         return xmin <= x <= xmax and ymin <= y <= ymax and zmin <= z <= zmax
 
-    def _generate_targets_and_moves(self):
+    def _detected_figures(self) -> List[Figure]:
+        if not self.use_detector:
+            return self.figures
 
-        figures = []
+        if self.detected_figures is None:
+            detector = Detector(self.figures, trace_mode=self.trace_mode, optimize_travel=self.optimize_travel,
+                                start_point=self.origin, travel_time_budget=self.travel_time_budget,
+                                snap_tolerance=self.snap_tolerance, simplify_tolerance=self.simplify_tolerance,
+                                arc_merge_tolerance=self.arc_merge_tolerance, circle_velocity=self.circle_velocity)
+            self.detected_figures = detector.detect_and_simplify()
 
-        if self.use_detector:
-            detector = Detector(self.figures)
-            figures = detector.detect_and_simplify()
-        else:
-            figures = self.figures
+        return self.detected_figures
 
-        self.instructions.clear()
-        self.rob_targets.clear()
+    def _checked_figures(self, use_offset: bool) -> List[Figure]:
+        figures = self._detected_figures()
 
         # Move to ZERO before starting the drawing
-        if not self._is_within_limits(self.zero):
+        if not use_offset and not self._is_within_limits(self.zero):
             raise ValueError(f"Zero point {self.zero} is outside the robot's workspace limits.")
 
         if not figures:
             raise ValueError("No figures to draw. Please add at least one figure.")
-        
-        # First move to zero
-        self.instructions.append(f"        ! Move to ZERO before starting the drawing\n")
-        self.instructions.append(f"        MoveAbsJ ZERO\\NoEOffs, v{self.velocity}, fine, {self.tool_name};\n\n")
 
-        # We are using references to rob targets (abs coordinates) so we need to add the rob target when iterating on each figure
-        self.rob_targets = []
+        return figures
 
-        for fig in figures:
+    def _blended_program(self, figures: List[Figure], use_offset: bool) -> Iterator[Figure | ProgramItem]:
+        """
+        Moves of the figures with the figures themselves as markers of where their moves start. The zones are assigned
+        over the whole program so the corners between chained figures are blended too.
+        """
+        # In offset mode the first figure moves with the global velocity, the others with their own velocity
+        def velocity(index: int, fig: Figure) -> int:
+            if use_offset and index > 0 and fig.velocity:
+                return fig.velocity
+            return self.velocity
+
+        def program() -> Iterator[Figure | ProgramItem]:
+            for i, fig in enumerate(figures):
+                yield fig
+                yield from fig.moves(global_velocity=velocity(i, fig))
 
-            # Add rob targets formatted
-            self.rob_targets.extend(fig.get_rob_targets_formatted())
+        return blend_zones(program(), self.origin, self.zone_tolerance, self.sharp_corner_angle)
 
-            self.instructions.append(f"        ! Move to {fig.name}\n")
+    def _program_chunks(self, figures: List[Figure], use_offset: bool) -> Iterator[Iterable[Figure | ProgramItem]]:
+        """
+        Splits the program in chunks of at most procedure_budget moves (the whole program in one chunk if the budget is
+        0). A chunk is cut at the last trace start it holds (the pen is up there), else at the last figure start, else
+        right at the budget, and its last move always stops (fine) since the next chunk is another procedure.
+        """
+        items = self._blended_program(figures, use_offset)
 
-            self.instructions.extend(fig.move_instructions(tool_name=self.tool_name,
-                                                           global_velocity=self.velocity))
+        if self.procedure_budget <= 0:
+            yield items
+            return
 
-        # Move to zero position after finishing the drawing
-        self.instructions.append(f"        MoveAbsJ ZERO\\NoEOffs, v{self.velocity}, fine, {self.tool_name};")
+        chunk: List[Figure | ProgramItem] = []
+        moves = 0
 
-    def _generate_targets_and_moves_offset(self) -> List[str]:
+        for item in items:
+            if isinstance(item, Move):
+                if moves == self.procedure_budget:
+                    cut = Draw._chunk_cut(chunk)
+                    head, chunk = chunk[:cut], chunk[cut:]
 
-        figures = self.figures
+                    Draw._stop_at_end(head)
+                    yield head
 
-        if self.use_detector:
-            detector = Detector(self.figures)
-            figures = detector.detect_and_simplify()
+                    moves = sum(1 for other in chunk if isinstance(other, Move))
 
-        # print(f"Checking type {type(figures)}")
+                moves += 1
 
-        self.instructions.clear()
-        self.rob_targets.clear()
+            chunk.append(item)
 
-        if not figures:
-            raise ValueError("No figures to draw. Please add at least one figure.")
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _chunk_cut(chunk: List[Figure | ProgramItem]) -> int:
+        figure_cut = 0
 
+        for i in range(len(chunk) - 1, 0, -1):
+            if isinstance(chunk[i], Figure):
+                if not chunk[i].skip_pre_down:
+                    return i
+                figure_cut = figure_cut or i
+
+        return figure_cut or len(chunk)
+
+    @staticmethod
+    def _stop_at_end(chunk: List[Figure | ProgramItem]):
+        for item in reversed(chunk):
+            if isinstance(item, Move):
+                item.zone = "fine"
+                return
+
+    def _prologue(self, use_offset: bool) -> List[str]:
         # First move to zero
-        self.instructions.append(f"        ! Move to ZERO before starting the drawing\n")
-        self.instructions.append(f"        MoveAbsJ ZERO\\NoEOffs, v{self.velocity}, fine, {self.tool_name};\n\n")
+        lines = [f"        ! Move to ZERO before starting the drawing\n",
+                 f"        MoveAbsJ ZERO\\NoEOffs, v{self.velocity}, fine, {self.tool_name};\n\n"]
+
+        if use_offset:
+            lines.append(f"        ! Move to origin point\n")
+            lines.append(f"        MoveJ {"origin"}, v{self.velocity}, fine, {self.tool_name};\n\n")
 
-        # Since we are using offsets the first rob target will be the origin point
-        self.rob_targets = [f"    {Figure.rob_target_format("origin", self.origin)}\n"]
+        return lines
 
-        self.instructions.append(f"        ! Move to origin point\n")
-        self.instructions.append(f"        MoveJ {"origin"}, v{self.velocity}, fine, {self.tool_name};\n\n")
+    def _epilogue(self, use_offset: bool) -> List[str]:
+        lines = []
 
-        # First figure will be the origin point, so we need to move to it first with robtarget, so the first instruction of the
-        # first figure will be the MoveJ to the origin point (no offset)
-        self.instructions.append(f"        ! Figure: {figures[0].name}\n")
-        first_fig_instructions = figures[0].move_instructions_offset(origin_robtarget_name="origin",
-                                                                            origin=self.origin,
-                                                                            tool_name=self.tool_name,
-                                                                            global_velocity=self.velocity)
+        if use_offset:
+            # Move to origin
+            lines.append(f"\n        ! Move to origin point after finishing the drawing\n")
+            lines.append(f"        MoveJ {"origin"}, v{self.velocity}, fine, {self.tool_name};\n")
+
+        # Move to zero position after finishing the drawing
+        lines.append(f"        MoveAbsJ ZERO\\NoEOffs, v{self.velocity}, fine, {self.tool_name};")
+
+        return lines
+
+    def _target_table(self, use_offset: bool) -> RobTargetTable | None:
+        return RobTargetTable() if self.share_rob_targets and not use_offset else None
+
+    def _rob_targets(self, figures: Iterable[Figure], use_offset: bool, local: bool = False,
+                     table: RobTargetTable | None = None) -> Iterator[str]:
+        """
+        Rob target declarations: the origin in offset mode, the targets of the figures in absolute mode (only the ones
+        not in the table yet when a table is given). Modules loaded on their own declare them LOCAL so every module can
+        declare the targets it uses.
+        """
+        if use_offset:
+            yield f"    {"LOCAL " if local else ""}{Figure.rob_target_format("origin", self.origin)}\n"
+            return
+
+        for fig in figures:
+            for target in table.add(fig) if table else fig.get_rob_targets_formatted():
+                yield f"    LOCAL {target}" if local else target
 
-        self.instructions.extend(first_fig_instructions)
+        if table:
+            logging.info(f"Rob targets: {table.declared} declared, {table.reused} figure targets share one of them.")
 
-        # For each figure append its instructions to the instructions list
-        for fig in figures[1:]:
+    def _log_cycle_time(self, formatter: "_ProgramFormatter"):
+        self.cycle_time_report = formatter.estimator.report()
+        logging.info(f"Zone blending: {self.cycle_time_report['blended_points']} of {self.cycle_time_report['moves']} points blended, "
+                     f"estimated cycle time {self.cycle_time_report['time_with_blending']:.1f} s "
+                     f"({self.cycle_time_report['time_without_blending']:.1f} s with fine points).")
 
-            self.instructions.append(f"\n        ! Figure: {fig.name}\n")
+    def _single_module(self, figures: List[Figure], use_offset: bool) -> Iterator[str]:
+        """
+        MainModule with the rob targets, the procedure main and, when the program does not fit in one procedure, the
+        Draw1..DrawN procedures main calls in order (written before main, which is only known at the end).
+        """
+        table = self._target_table(use_offset)
+        formatter = _ProgramFormatter(figures, use_offset, self.tool_name, self.origin, table)
+        chunks = self._program_chunks(figures, use_offset)
+
+        yield "MODULE MainModule\n"
+        yield "    CONST jointtarget ZERO:=[[0,0,0,0,0,0],[9E+9,9E+9,9E+9,9E+9,9E+9,9E+9]];\n"
 
-            self.instructions.extend(fig.move_instructions_offset(origin_robtarget_name="origin",
-                                                                    origin=self.origin,
-                                                                    tool_name=self.tool_name,
-                                                                    global_velocity=fig.velocity if fig.velocity else self.velocity))
+        # We are using references to rob targets (abs coordinates), all of them are declared before the procedures
+        yield from self._rob_targets(figures, use_offset, table=table)
+
+        first = next(chunks)
+        second = next(chunks, None)
+
+        if second is None:
+            yield "\n\n    PROC main()\n"
+            yield from self._prologue(use_offset)
+            yield from formatter.lines(first)
+        else:
+            procedures: List[str] = []
 
-        # Move to origin
-        self.instructions.append(f"\n        ! Move to origin point after finishing the drawing\n")
-        self.instructions.append(f"        MoveJ {"origin"}, v{self.velocity}, fine, {self.tool_name};\n")
+            for chunk in chain([first, second], chunks):
+                procedures.append(f"Draw{len(procedures) + 1}")
 
-        # Remember to move to the zero position after finishing the drawing
-        self.instructions.append(f"        MoveAbsJ ZERO\\NoEOffs, v{self.velocity}, fine, {self.tool_name};")
+                yield f"\n\n    PROC {procedures[-1]}()\n"
+                yield from formatter.lines(chunk)
+                yield "    ENDPROC"
+
+            yield "\n\n    PROC main()\n"
+            yield from self._prologue(use_offset)
+            yield from (f"        {procedure};\n" for procedure in procedures)
+
+        yield from self._epilogue(use_offset)
+        yield "\n    ENDPROC\nENDMODULE\n"
+
+        self._log_cycle_time(formatter)
 
     def add_figure(self, figure: Figure):
         """
@@ -141,27 +275,205 @@ class Draw:
 
         self.figures.append(figure)
 
-    def add_figures(self, figures: List[Figure]):
+    @staticmethod
+    def figure_bounds(figures: List[Figure]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per figure (N, 3) minimum and maximum of the figure points, for figures that do not come with their bounds.
+        """
+        if not figures:
+            return np.empty((0, 3)), np.empty((0, 3))
+
+        points = [np.asarray(figure.get_points(), dtype=np.float64) for figure in figures]
+
+        return np.stack([p.min(axis=0) for p in points]), np.stack([p.max(axis=0) for p in points])
+
+    def find_limit_violations(self, names: List[str], minimum: np.ndarray, maximum: np.ndarray) -> List[LimitViolation]:
+        """
+        Checks the per figure bounds against the workspace limits with a single comparison and returns every violation,
+        ordered by figure and axis.
+        :param names: Name of the figure of every bounds row.
+        :param minimum: (N, 3) minimum coordinates of the figures.
+        :param maximum: (N, 3) maximum coordinates of the figures.
+        """
+        if not self.workspace_limits or not len(names):
+            return []
+
+        lower, upper = np.asarray(self.workspace_limits[0], dtype=np.float64), np.asarray(self.workspace_limits[1], dtype=np.float64)
+        below = minimum < lower
+        above = maximum > upper
+
+        violations: List[LimitViolation] = []
+
+        for i, axis in zip(*np.nonzero(below | above)):
+            if below[i, axis]:
+                violations.append({'figure': names[i], 'axis': "xyz"[axis], 'bound': "min",
+                                   'value': float(minimum[i, axis]), 'limit': float(lower[axis])})
+            if above[i, axis]:
+                violations.append({'figure': names[i], 'axis': "xyz"[axis], 'bound': "max",
+                                   'value': float(maximum[i, axis]), 'limit': float(upper[axis])})
+
+        return violations
+
+    def add_figures(self, figures: List[Figure], bounds: Tuple[np.ndarray, np.ndarray] | None = None):
+        """
+        Validates all the figures together and adds them to the drawing. If any figure leaves the workspace limits
+        nothing is added and the ValueError lists every violation.
+        :param bounds: (minimum, maximum) per figure bounds in the order of the figures (see FigureTable.bounds), taken
+        from the figure points when not given.
+        """
         if not isinstance(figures, list):
             raise TypeError("Expected a list of Figure instances.")
-        
+
         for figure in figures:
-            self.add_figure(figure)
+            if not isinstance(figure, Figure):
+                raise TypeError("Expected a Figure instance.")
+
+        if self.workspace_limits:
+            minimum, maximum = bounds if bounds is not None else self.figure_bounds(figures)
+            if len(minimum) != len(figures) or len(maximum) != len(figures):
+                raise ValueError(f"Expected the bounds of {len(figures)} figures, got {len(minimum)}.")
+
+            violations = self.find_limit_violations([figure.name for figure in figures], minimum, maximum)
+
+            if violations:
+                report = "\n".join(f"  {v['figure']}: {v['axis']} {v['bound']} {v['value']} exceeds limit {v['limit']}" for v in violations)
+                raise ValueError(f"{len({v['figure'] for v in violations})} figures are out of drawing limits:\n{report}")
+
+        self.figures.extend(figures)
+
+    def iter_rapid_code(self, use_offset: bool) -> Iterator[str]:
+        """
+        Yields the RAPID module in pieces (module header, rob targets, procedure lines), the moves of a figure are only
+        built when the code reaches it, so the memory used does not grow with the size of the program (beyond one
+        procedure when the program is split, see procedure_budget).
+        """
+        return self._single_module(self._checked_figures(use_offset), use_offset)
+
+    @staticmethod
+    def _write_lines(stream: TextIO, lines: Iterable[str], buffer_lines: int = 4096):
+        buffer: List[str] = []
+
+        for line in lines:
+            buffer.append(line)
+
+            if len(buffer) >= buffer_lines:
+                stream.write("".join(buffer))
+                buffer.clear()
+
+        stream.write("".join(buffer))
+
+    def write_rapid_code(self, stream: TextIO, use_offset: bool, buffer_lines: int = 4096):
+        """
+        Writes the RAPID module to a text stream (file, socket, StringIO...) as it is generated, buffer_lines pieces
+        are joined per write.
+        """
+        Draw._write_lines(stream, self.iter_rapid_code(use_offset), buffer_lines)
+
+    def write_rapid_modules(self, open_stream: Callable[[str], ContextManager[TextIO]], use_offset: bool) -> List[str]:
+        """
+        Writes the program as separate modules that can be loaded on their own: DrawModule1..DrawModuleN with a
+        procedure Draw1..DrawN each (at most procedure_budget moves, see _program_chunks) and their own LOCAL rob
+        targets, then MainModule whose main moves to the start, calls the procedures in order and moves back.
+
+        :param open_stream: Called with every module name, returns the (context managed) text stream of that module.
+        :return: Names of the modules written, MainModule last.
+        """
+        figures = self._checked_figures(use_offset)
+        formatter = _ProgramFormatter(figures, use_offset, self.tool_name, self.origin)
+
+        procedures: List[str] = []
+
+        for chunk in self._program_chunks(figures, use_offset):
+            chunk = list(chunk)
+            procedures.append(f"Draw{len(procedures) + 1}")
+
+            # Figures with moves in the chunk, a figure split by the previous chunk continues here
+            chunk_figures = ([formatter.figure] if formatter.figure and not isinstance(chunk[0], Figure) else []) + \
+                            [item for item in chunk if isinstance(item, Figure)]
+
+            # Every module declares the targets it uses
+            formatter.targets = self._target_table(use_offset)
+            if formatter.targets and formatter.figure:
+                formatter.target_name = formatter.targets.target_namer()
+
+            with open_stream(f"DrawModule{len(procedures)}") as stream:
+                Draw._write_lines(stream, chain(
+                    [f"MODULE DrawModule{len(procedures)}\n"],
+                    self._rob_targets(chunk_figures, use_offset, local=True, table=formatter.targets),
+                    [f"\n\n    PROC {procedures[-1]}()\n"],
+                    formatter.lines(chunk),
+                    ["    ENDPROC\nENDMODULE\n"],
+                ))
+
+        with open_stream("MainModule") as stream:
+            Draw._write_lines(stream, chain(
+                ["MODULE MainModule\n",
+                 "    CONST jointtarget ZERO:=[[0,0,0,0,0,0],[9E+9,9E+9,9E+9,9E+9,9E+9,9E+9]];\n"],
+                self._rob_targets([], use_offset, local=True),
+                ["\n\n    PROC main()\n"],
+                self._prologue(use_offset),
+                [f"        {procedure};\n" for procedure in procedures],
+                self._epilogue(use_offset),
+                ["\n    ENDPROC\nENDMODULE\n"],
+            ))
+
+        self._log_cycle_time(formatter)
+
+        return [f"DrawModule{i + 1}" for i in range(len(procedures))] + ["MainModule"]
 
     def generate_rapid_code(self, use_offset: bool) -> str:
-        self.rob_targets.clear()
-        self.instructions.clear()
+        return "".join(self.iter_rapid_code(use_offset))
+
+
+class _ProgramFormatter:
+    """
+    Formats the program items of Draw (figure markers and moves) as RAPID lines, keeping the state between chunks: the
+    figure being drawn (its rob target names in absolute mode, or the names of the shared target table) and the cycle
+    time estimation. Items are formatted in batches, a batch is a single text in offset mode (see
+    moves.format_items_offset).
+    """
+    __slots__ = ("first_figure", "use_offset", "tool_name", "origin", "targets", "figure", "target_name", "estimator", "batch_size")
+
+    def __init__(self, figures: List[Figure], use_offset: bool, tool_name: str, origin: Point3D,
+                 targets: RobTargetTable | None = None, batch_size: int = 4096):
+        self.first_figure = figures[0]
+        self.use_offset = use_offset
+        self.tool_name = tool_name
+        self.origin = origin
+        self.targets = targets
+        self.figure: Figure | None = None
+        self.target_name: Callable[[Point3D], str] | None = None
+        self.estimator = CycleTimeEstimator(origin)
+        self.batch_size = batch_size
 
-        if use_offset:
-            self._generate_targets_and_moves_offset()
-        else:
-            self._generate_targets_and_moves()
+    def lines(self, items: Iterable[Figure | ProgramItem]) -> Iterator[str]:
+        batch: List[ProgramItem] = []
+
+        for item in items:
+            if isinstance(item, Figure):
+                self.figure = item
+
+                if self.use_offset:
+                    batch.append(f"        ! Figure: {item.name}\n" if item is self.first_figure else f"\n        ! Figure: {item.name}\n")
+                else:
+                    # The rob target names change with the figure, the moves before are formatted with the previous names
+                    yield from self._format(batch)
+                    batch = [f"        ! Move to {item.name}\n"]
+                    self.target_name = self.targets.target_namer() if self.targets else item.target_namer()
+                continue
+
+            batch.append(item)
+
+            if len(batch) >= self.batch_size:
+                yield from self._format(batch)
+                batch = []
+
+        yield from self._format(batch)
+
+    def _format(self, batch: List[ProgramItem]) -> List[str]:
+        self.estimator.add_batch([item for item in batch if isinstance(item, Move)])
 
-        code = "MODULE MainModule\n"
-        code += "    CONST jointtarget ZERO:=[[0,0,0,0,0,0],[9E+9,9E+9,9E+9,9E+9,9E+9,9E+9]];\n"
-        code += "".join(self.rob_targets)
-        code += "\n\n    PROC main()\n"
-        code += "".join(self.instructions)
-        code += "\n    ENDPROC\nENDMODULE\n"
-        return code
+        if self.use_offset:
+            return [format_items_offset(batch, "origin", self.origin, self.tool_name)]
 
+        return [format_move(item, self.target_name, self.tool_name) for item in batch]
@@ -2,4 +2,5 @@ from .arc import Arc
 from .circle import Circle
 from .figure import Figure
 from .poly import PolyLine
-from .bspline import BSpline
\ No newline at end of file
+from .bspline import BSpline
+from .table import FigureTable, FigureKind
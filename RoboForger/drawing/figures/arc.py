@@ -1,6 +1,7 @@
 from .figure import Figure
 from typing import List, Tuple, Union, Optional
 from RoboForger.fig_types import Point3D
+from RoboForger.drawing.moves import Move, MoveKind, ProgramItem
 from math import sqrt, atan2, pi, cos, sin, radians
 from RoboForger.utils import round_tuple, normalize_angle, normalize_angle_deg, vector_norm, distance_vectors
 
@@ -124,92 +125,39 @@ class Arc(Figure):
         z = center[2]  # Assuming z-coordinate remains the same
         return x, y, z
 
-    def move_instructions(self, tool_name: str = "tool0", global_velocity: int = 1000) -> List[
-        str]:
-        """
-        Generate robot move instructions, splitting the arc into smaller MoveC segments if necessary.
-
-        Args:
-            tool_name (str): The robot tool to use.
-            global_velocity (int): Global velocity for MoveJ/MoveL.
-
-        Returns:
-            List[str]: List of move instruction strings.
-        """
-        instructions = []
-
-        # Move to start position
-        rob_target_names = self.get_rob_target_names()
-
-        if not rob_target_names:
-            raise ValueError("No robot targets generated for the arc.")
-
-        # Pre down point
-        if not self.skip_pre_down:
-            instructions.append(f"        !init_lifted\n")
-            instructions.append(f"        MoveJ {rob_target_names[0]}, v{global_velocity}, fine, {tool_name};\n")
-
-        # Move to start point (down)
-        instructions.append(f"        MoveL {rob_target_names[1]}, v{global_velocity}, fine, {tool_name};\n")
-        # Move first arc segment
-        instructions.append(f"        MoveC {rob_target_names[2]}, {rob_target_names[3]}, v{self.velocity}, fine, {tool_name};\n")
-
-        # If sweep is greater than 180 (pi radians) we need to draw a second segment
-        if Arc.arc_angle(self.start_angle, self.end_angle, self.clockwise) >= pi:
-            instructions.append(f"        MoveC {rob_target_names[4]}, {rob_target_names[5]}, v{self.velocity}, fine, {tool_name};\n")
-
-        if not self.skip_end_lifting:
-            # Final lifted point
-            instructions.append(f"        MoveL {rob_target_names[-1]}, v{global_velocity}, fine, {tool_name};\n")
-            instructions.append(f"        !end_lifted\n")
-
-        return instructions
-
-    def move_instructions_offset(self, origin_robtarget_name: str, origin: Point3D = (450.0, 0, 450.0), tool_name: str = "tool0", global_velocity: int = 1000) -> List[str]:
-        instructions = []
-
-        robtargets = self.get_rob_target_names()
+    def moves(self, global_velocity: int = 1000) -> List[ProgramItem]:
+        items: List[ProgramItem] = []
 
         points = self.get_points()
 
-        # print(f"Arc: {self.name} is skipping pre-down: {self.skip_pre_down}, end lifting: {self.skip_end_lifting}")
-
         # Pre down point
         if not self.skip_pre_down:
-            instructions.append(f"        !init_lifted\n")
-            instructions.append(f"        MoveJ Offs {Figure.offset_coord(origin_robtarget_name, origin, points[0])}, v{global_velocity}, fine, {tool_name};\n")
+            items.append(f"        !init_lifted\n")
+            items.append(Move(MoveKind.JOINT, points[0], global_velocity, pen_down=False))
 
         # Move to start point (down)
-        instructions.append(f"        MoveL Offs {Figure.offset_coord(origin_robtarget_name, origin, points[1])}, v{global_velocity}, fine, {tool_name};\n")
+        items.append(Move(MoveKind.LINEAR, points[1], global_velocity, pen_down=self.skip_pre_down))
 
-        # if arcpoints are too close then do a MoveL instead of a MoveC
-        if distance_vectors(points[2], points[3]) < 0.1:
-            instructions.append(f"        MoveL Offs {Figure.offset_coord(origin_robtarget_name, origin, points[2])}, v{self.velocity}, fine, {tool_name};\n")
-            instructions.append(f"        MoveL Offs {Figure.offset_coord(origin_robtarget_name, origin, points[3])}, v{self.velocity}, fine, {tool_name};\n")
-
-        else:
-            # Move first arc segment
-            instructions.append(f"        MoveC Offs {Figure.offset_coord(origin_robtarget_name, origin, points[2])}, Offs {Figure.offset_coord(origin_robtarget_name, origin, points[3])}, v{self.velocity}, fine, {tool_name};\n")
+        # Move first arc segment
+        items.extend(self._arc_segment(points[2], points[3]))
 
         # If sweep is greater than 180 (pi radians) we need to draw a second segment
         if Arc.arc_angle(self.start_angle, self.end_angle, self.clockwise) >= pi:
-
-            # if arcpoints are too close then do a MoveL instead of a MoveC
-            if distance_vectors(points[4], points[5]) < 0.1:
-                instructions.append(
-                    f"        MoveL Offs {Figure.offset_coord(origin_robtarget_name, origin, points[4])}, v{self.velocity}, fine, {tool_name};\n")
-                instructions.append(
-                    f"        MoveL Offs {Figure.offset_coord(origin_robtarget_name, origin, points[5])}, v{self.velocity}, fine, {tool_name};\n")
-            else:
-                instructions.append(f"        MoveC Offs {Figure.offset_coord(origin_robtarget_name, origin, points[4])}, Offs {Figure.offset_coord(origin_robtarget_name, origin, points[5])}, v{self.velocity}, fine, {tool_name};\n")
+            items.extend(self._arc_segment(points[4], points[5]))
 
         # Final lifted point
         if not self.skip_end_lifting:
-            instructions.append(f"        MoveL Offs {Figure.offset_coord(origin_robtarget_name, origin, points[-1])}, v{global_velocity}, fine, {tool_name};\n")
-            instructions.append(f"        !end_lifted\n")
+            items.append(Move(MoveKind.LINEAR, points[-1], global_velocity, pen_down=False))
+            items.append(f"        !end_lifted\n")
+
+        return items
 
+    def _arc_segment(self, via: Point3D, target: Point3D) -> List[Move]:
+        # if arcpoints are too close then do a MoveL instead of a MoveC
+        if distance_vectors(via, target) < 0.1:
+            return [Move(MoveKind.LINEAR, via, self.velocity, pen_down=True), Move(MoveKind.LINEAR, target, self.velocity, pen_down=True)]
 
-        return instructions
+        return [Move(MoveKind.CIRCULAR, target, self.velocity, pen_down=True, via=via)]
 
     def __str__(self):
         return f"Arc<name={self.name} center={self.center} radius={self.radius} start_angle={self.start_angle} end_angle={self.end_angle}>"
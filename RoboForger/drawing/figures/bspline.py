@@ -1,20 +1,43 @@
 from .figure import Figure
 from typing import List, Tuple
 from RoboForger.fig_types import Point3D
+from RoboForger.drawing.arc_fitting import fit_arcs, FittedSegment, SegmentKind
+from RoboForger.drawing.moves import Move, MoveKind, ProgramItem
+from RoboForger.utils import distance_vectors
+from functools import lru_cache
 
 import numpy as np
 
 class BSpline(Figure):
-    def __init__(self, name: str, degree: int, closed: bool, knots: List[float], weights: List[float], control_points: List[Point3D], fit_points: List[Point3D], interpolation_precision: float = 10, lifting: float = 100, velocity: int = 1000, float_precision: int = 6):
+    # Fractions of an interval where adaptive_parameters measures the deviation from its chord (the middle one splits it)
+    PROBE_FRACTIONS = (0.125, 0.25, 0.375, 0.5, 0.625, 0.75, 0.875)
+
+    def __init__(self, name: str, degree: int, closed: bool, knots: List[float], weights: List[float], control_points: List[Point3D], fit_points: List[Point3D], interpolation_precision: float = 10, lifting: float = 100, velocity: int = 1000, float_precision: int = 6, chord_error: float = 0.0, arc_tolerance: float = 0.0, points: List[Point3D] | None = None):
+        """
+        :param interpolation_precision: Density of the uniform sampling (used when chord_error is 0).
+        :param chord_error: Maximum distance allowed between the spline and the segments approximating it, the parameter
+        range is subdivided until every segment is under it. 0 uses the uniform sampling.
+        :param arc_tolerance: Maximum distance between the sampled points and the arcs/lines fitted to them for the move
+        instructions (see drawing.arc_fitting), zone blending included. 0 moves through every sampled point with MoveL.
+        :param points: Points already sampled from this spline (see Converter parallel conversion), the spline is not
+        evaluated again.
+        """
         self.degree = degree
         self.closed = closed
         self.knots = np.array(knots, dtype=float)
         self.weights = np.array(weights, dtype=float) if weights else None
         self.control_points = np.array(control_points, dtype=float)
         self.fit_points = fit_points
-        self.num_points = self.get_num_points(interpolation_precision)
+        self.chord_error = chord_error
+        self.arc_tolerance = arc_tolerance
+        if points is None:
+            self.num_points = self.get_num_points(interpolation_precision) if chord_error <= 0 else 0
+            points = self.get_all_points()
 
-        points = self.get_all_points()
+        self.num_points = len(points)
+
+        # Segments fitted to the points (see _fitted_moves), fitted on the first moves call and kept until the points change
+        self._fitted_segments: List[FittedSegment] | None = None
 
         super().__init__(name, points, lifting, velocity, float_precision)
 
@@ -33,86 +56,220 @@ class BSpline(Figure):
         return num_points
 
     def get_all_points(self) -> List[Point3D]:
-        # Domain of the spline (usually [knots[degree], knots[-degree-1]])
+        if self.chord_error > 0:
+            return self._evaluate_spline(self.adaptive_parameters(self.chord_error)).tolist()
+
+        # Uniform samples over the spline domain, their basis functions only depend on the knots so they are cached
+        spans, basis = BSpline.uniform_basis(tuple(self.knots.tolist()), self.degree, len(self.control_points), self.num_points)
+
+        return self._combine(spans, basis).tolist()
+
+    def adaptive_parameters(self, chord_error: float, max_depth: int = 12) -> np.ndarray:
+        """
+        Parameters whose points approximate the spline within chord_error (same chord error idea as the preview, see
+        docs/curvature.md). The knot spans are the starting intervals, then each interval whose curve deviates more than
+        chord_error from its chord (probed at every eighth of the interval, see PROBE_FRACTIONS) is bisected, all
+        intervals of a level at once, up to max_depth levels. Flat stretches keep few points and tight bends get as many
+        as they need.
+        """
         start_t = self.knots[self.degree]
         end_t = self.knots[-self.degree - 1]
-        
-        # Create evaluation parameters (t)
-        t_values = np.linspace(start_t, end_t, self.num_points)
 
-        # Evaluate using pure numpy
-        points = self._evaluate_spline(t_values)
+        breaks = np.unique(self.knots[(self.knots >= start_t) & (self.knots <= end_t)])
+        if len(breaks) < 2:
+            breaks = np.array([start_t, end_t])
 
-        return points.tolist()
+        initial = breaks
+        parameters = [initial]
 
-    def _evaluate_spline(self, t_values: np.ndarray) -> np.ndarray:
+        initial_points = self._evaluate_spline(initial)
+        low, high = initial[:-1], initial[1:]
+        low_points, high_points = initial_points[:-1], initial_points[1:]
+
+        for _ in range(max_depth):
+            if not len(low):
+                break
+
+            width = high - low
+            probes = np.concatenate([low + fraction * width for fraction in BSpline.PROBE_FRACTIONS])
+            probe_points = self._evaluate_spline(probes).reshape(len(BSpline.PROBE_FRACTIONS), len(low), -1)
+
+            error = np.max([BSpline._segment_distance(points, low_points, high_points) for points in probe_points], axis=0)
+            split = error > chord_error
+
+            # The middle probe splits the interval
+            middle_index = len(BSpline.PROBE_FRACTIONS) // 2
+            middle = probes[middle_index * len(low):(middle_index + 1) * len(low)][split]
+            middle_points = probe_points[middle_index][split]
+            parameters.append(middle)
+
+            low, high = np.concatenate([low[split], middle]), np.concatenate([middle, high[split]])
+            low_points = np.concatenate([low_points[split], middle_points])
+            high_points = np.concatenate([middle_points, high_points[split]])
+
+        return np.sort(np.concatenate(parameters))
+
+    @staticmethod
+    def _segment_distance(points: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
         """
-        Evaluates the B-Spline (or NURBS) at given t parameters using De Boor's algorithm.
-        Supports Weights (NURBS) if self.weights is present.
+        Distance of every point to the segment (start, end) of its row.
+        """
+        direction = ends - starts
+        length = np.einsum('ij,ij->i', direction, direction)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            along = np.where(length > 0, np.einsum('ij,ij->i', points - starts, direction) / length, 0.0)
+
+        closest = starts + np.clip(along, 0.0, 1.0)[:, None] * direction
+        return np.linalg.norm(points - closest, axis=1)
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def uniform_basis(knots: Tuple[float, ...], degree: int, control_count: int, num_points: int) -> Tuple[np.ndarray, np.ndarray]:
         """
-        n = len(self.control_points) - 1
-        p = self.degree
-        knots = self.knots
-        
+        Basis functions of num_points parameters evenly spaced over the spline domain (usually [knots[degree],
+        knots[-degree-1]]). Cached, splines sharing the knot vector, degree and sample count reuse the same (read only)
+        arrays.
+        """
+        knots_array = np.array(knots, dtype=float)
+
+        t_values = np.linspace(knots_array[degree], knots_array[-degree - 1], num_points)
+        spans, basis = BSpline.basis_functions(knots_array, degree, control_count, t_values)
+
+        spans.flags.writeable = False
+        basis.flags.writeable = False
+
+        return spans, basis
+
+    @staticmethod
+    def basis_functions(knots: np.ndarray, degree: int, control_count: int, t_values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cox-de Boor recursion for all parameters at once. Returns the knot span of every parameter (S,) and the degree + 1
+        non zero basis functions of that span (S, degree + 1), the function r of a span k weights control point k - degree + r.
+        """
+        p = degree
+        t_values = np.asarray(t_values, dtype=float)
+
+        # Knot span index k such that knots[k] <= t < knots[k + 1], clipped so the end of the domain uses the last span
+        spans = np.clip(np.searchsorted(knots, t_values, side='right') - 1, p, control_count - 1)
+
+        basis = np.zeros((len(t_values), p + 1))
+        basis[:, 0] = 1.0
+
+        left = np.empty((len(t_values), p + 1))
+        right = np.empty((len(t_values), p + 1))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for j in range(1, p + 1):
+                left[:, j] = t_values - knots[spans + 1 - j]
+                right[:, j] = knots[spans + j] - t_values
+                saved = np.zeros(len(t_values))
+
+                for r in range(j):
+                    denom = right[:, r + 1] + left[:, j - r]
+                    temp = np.where(denom != 0, basis[:, r] / denom, 0.0)
+                    basis[:, r] = saved + right[:, r + 1] * temp
+                    saved = left[:, j - r] * temp
+
+                basis[:, j] = saved
+
+        return spans, basis
+
+    def _homogeneous_control_points(self) -> np.ndarray:
         # If we have weights, convert to Homogeneous coordinates (x*w, y*w, z*w, w)
         if self.weights is not None and len(self.weights) == len(self.control_points):
             # Shape (N, 4) -> [wx, wy, wz, w]
-            ctrl_h = np.column_stack((self.control_points * self.weights[:, None], self.weights))
-        else:
-            # Shape (N, 3)
-            ctrl_h = self.control_points
-
-        result_points = []
-
-        for t in t_values:
-            # Find the knot span index 'k' such that knots[k] <= t < knots[k+1]
-            # We clip to ensure we don't go out of bounds at the very end
-            k = np.searchsorted(knots, t, side='right') - 1
-            k = np.clip(k, p, n)
-
-            # De Boor's Algorithm
-            # Copy the relevant control points for this span
-            d = ctrl_h[k - p : k + 1].copy()
-
-            for r in range(1, p + 1):
-                for j in range(p, r - 1, -1):
-                    denom = knots[j + k - r + 1] - knots[j + k - p]
-                    alpha = (t - knots[j + k - p]) / denom if denom != 0 else 0.0
-                    d[j] = (1.0 - alpha) * d[j - 1] + alpha * d[j]
-
-            # The result is the last point in the array
-            final_val = d[p]
-
-            # Convert back from Homogeneous if needed (NURBS projection)
-            if self.weights is not None:
-                # Divide x,y,z by w
-                point_3d = final_val[:3] / final_val[3]
-                result_points.append(point_3d)
-            else:
-                result_points.append(final_val)
+            return np.column_stack((self.control_points * self.weights[:, None], self.weights))
+
+        # Shape (N, 3)
+        return self.control_points
+
+    def _combine(self, spans: np.ndarray, basis: np.ndarray) -> np.ndarray:
+        """
+        Weighted sum of the control points of every span, projected back from homogeneous coordinates for NURBS.
+        """
+        ctrl_h = self._homogeneous_control_points()
 
-        return np.array(result_points)
+        points = np.zeros((len(spans), ctrl_h.shape[1]))
+        for r in range(self.degree + 1):
+            points += basis[:, r, None] * ctrl_h[spans - self.degree + r]
 
-    def move_instructions_offset(self, origin_robtarget_name: str, origin: Point3D = (450.0, 0.0, 450.0), tool_name: str = "tool0", global_velocity: int = 1000) -> List[str]:
-        instructions = []
+        if ctrl_h.shape[1] == 4:
+            # Divide x,y,z by w
+            return points[:, :3] / points[:, 3, None]
 
-        robtargets = self.get_rob_target_names()
+        return points
+
+    def _evaluate_spline(self, t_values: np.ndarray) -> np.ndarray:
+        """
+        Evaluates the B-Spline (or NURBS) at given t parameters, all parameters at once (see basis_functions).
+        Supports Weights (NURBS) if self.weights is present.
+        """
+        spans, basis = BSpline.basis_functions(self.knots, self.degree, len(self.control_points), t_values)
+        return self._combine(spans, basis)
+
+    def moves(self, global_velocity: int = 1000) -> List[ProgramItem]:
+        items: List[ProgramItem] = []
 
         points = self.get_points()
 
         if not self.skip_pre_down:
-            instructions.append(f"        !init_lifted\n")
-            instructions.append(f"        MoveJ Offs {Figure.offset_coord(origin_robtarget_name, origin, points[0])}, v{global_velocity}, fine, {tool_name};\n")
+            items.append(f"        !init_lifted\n")
+            items.append(Move(MoveKind.JOINT, points[0], global_velocity, pen_down=False))
+
+        if self.arc_tolerance > 0:
+            items.extend(self._fitted_moves())
+        else:
+            # Now MoveL approximations of the spline, the first one is the descent
+            for i, point in enumerate(points[1:-1]):
+                items.append(Move(MoveKind.LINEAR, point, self.velocity, pen_down=i > 0 or self.skip_pre_down, comment=f"Spline Point {i}"))
 
-        # Now MoveL approximations of the spline
-        for i, point in enumerate(points[1:-1]):
-            instructions.append(f"        MoveL Offs {Figure.offset_coord(origin_robtarget_name, origin, point)}, v{self.velocity}, fine, {tool_name}; !Spline Point {i}\n")
-    
         if not self.skip_end_lifting:
-            instructions.append(f"        MoveJ Offs {Figure.offset_coord(origin_robtarget_name, origin, points[-1])}, v{global_velocity}, fine, {tool_name};\n")
-            instructions.append(f"        !end_lifted\n")
-    
-        return instructions
+            items.append(Move(MoveKind.JOINT, points[-1], global_velocity, pen_down=False))
+            items.append(f"        !end_lifted\n")
+
+        return items
+
+    def _fitted_moves(self) -> List[Move]:
+        """
+        MoveL to the first down point, then a MoveC per fitted arc and a MoveL per fitted line.
+
+        The arc tolerance is shared between the fit and the zones blending the fitted moves: the arcs are fitted within
+        half of it and the moves carry the other half as the tolerance of their corner paths.
+        """
+        points = self.get_points()
+        tolerance = self.arc_tolerance / 2
+
+        moves = [Move(MoveKind.LINEAR, points[1], self.velocity, pen_down=self.skip_pre_down, comment="Spline Start")]
+
+        if self._fitted_segments is None:
+            self._fitted_segments = fit_arcs(points[1:-1], tolerance)
+
+        for i, segment in enumerate(self._fitted_segments):
+            end = Figure.round_point(segment.end, self.float_precision)
+            comment = f"Spline Segment {i}"
+
+            if segment.kind == SegmentKind.ARC:
+                mid = Figure.round_point(segment.mid, self.float_precision)
+
+                # if arcpoints are too close then do a MoveL instead of a MoveC
+                if distance_vectors(mid, end) < 0.1:
+                    moves.append(Move(MoveKind.LINEAR, mid, self.velocity, pen_down=True, comment=comment, tolerance=tolerance))
+                    moves.append(Move(MoveKind.LINEAR, end, self.velocity, pen_down=True, comment=comment, tolerance=tolerance))
+                else:
+                    moves.append(Move(MoveKind.CIRCULAR, end, self.velocity, pen_down=True, via=mid, comment=comment, tolerance=tolerance))
+            else:
+                moves.append(Move(MoveKind.LINEAR, end, self.velocity, pen_down=True, comment=comment, tolerance=tolerance))
+
+        return moves
+
+    def move_end_points(self, start_point: Point3D, end_point: Point3D):
+        super().move_end_points(start_point, end_point)
+        self._fitted_segments = None
+
+    def reverse_points(self):
+        super().reverse_points()
+        self._fitted_segments = None
 
     def __str__(self) -> str:
         return f"Spline(Name: {self.name}, Degree: {self.degree}, Closed: {self.closed}, Control Points: {len(self.control_points)}, Fit Points: {len(self.fit_points)}, Knots: {self.knots}, Weights: {self.weights}, Number of Points: {self.num_points}, Total Points: {len(self._points)})"
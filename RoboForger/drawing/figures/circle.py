@@ -1,6 +1,8 @@
 from .figure import Figure
 from RoboForger.fig_types import Point3D
+from RoboForger.drawing.moves import Move, MoveKind, ProgramItem
 from typing import List
+from math import cos, sin, pi, radians
 from RoboForger.utils import distance_vectors
 
 
@@ -9,89 +11,60 @@ class Circle(Figure):
     A circle is a fusion of two arcs, one for the upper half and one for the lower half.
     """
 
-    def __init__(self, name: str, center: Point3D, radius, lifting: float, velocity: int = 100, float_precision: int = 2):
+    def __init__(self, name: str, center: Point3D, radius, lifting: float, velocity: int = 100, float_precision: int = 2,
+                 start_angle: float | None = None, clockwise: bool = True):
+        """
+        :param start_angle: Angle (degrees) of the point the circle starts and ends at, None starts at the left point.
+        :param clockwise: Drawing direction from the start point, used with start_angle.
+        """
         self.center = center
         self.radius = radius
         # Round the center point to 4 decimal places
         center = tuple(round(coord, 4) for coord in center)
-        super().__init__(name, [
-            (center[0] - radius, center[1], center[2]),  # Start point
-            (center[0], center[1] + radius, center[2]),  # Midpoint (top)
-            (center[0] + radius, center[1], center[2]),  # Right point
-            (center[0], center[1] - radius, center[2]),  # Midpoint (bottom)
-            (center[0] - radius, center[1], center[2])  # End point (back to start)
-        ], lifting, velocity, float_precision)
 
-    def move_instructions(self, tool_name: str = "tool0", global_velocity: int = 1000) -> List[str]:
-        instructions = []
-
-        rob_target_names = self.get_rob_target_names()
-
-        if not rob_target_names:
-            raise ValueError("No robot targets generated for the circle.")
-
-        if not self.skip_pre_down:
-            instructions.append(f"        !init_lifted\n")
-            # Move to the pre-down point
-            instructions.append(
-                f"        MoveJ {rob_target_names[0]}, v{global_velocity}, fine, {tool_name};\n"
-            )
-
-        # Move to start point (down)
-        instructions.append(
-            f"        MoveL {rob_target_names[1]}, v{global_velocity}, fine, {tool_name};\n"
-        )
-
-        # Create the upper half arc movement
-        instructions.append(
-            f"        MoveC {rob_target_names[2]}, {rob_target_names[3]}, v{self.velocity}, fine, {tool_name};\n"
-        )
-        # Create the lower half arc movement
-        instructions.append(
-            f"        MoveC {rob_target_names[4]}, {rob_target_names[5]}, v{self.velocity}, fine, {tool_name};\n"
-        )
-
-        if not self.skip_end_lifting:
-            # Move to end point (lifted position)
-            instructions.append(
-                f"        MoveL {rob_target_names[-1]}, v{global_velocity}, fine, {tool_name};\n"
-            )
-            instructions.append(f"        !end_lifted\n")
+        if start_angle is None:
+            points = [
+                (center[0] - radius, center[1], center[2]),  # Start point
+                (center[0], center[1] + radius, center[2]),  # Midpoint (top)
+                (center[0] + radius, center[1], center[2]),  # Right point
+                (center[0], center[1] - radius, center[2]),  # Midpoint (bottom)
+                (center[0] - radius, center[1], center[2])  # End point (back to start)
+            ]
+        else:
+            # Start, quarter, half, three quarters and back to start in the drawing direction
+            step = -pi / 2 if clockwise else pi / 2
+            points = [tuple(round(coord, 4) for coord in (center[0] + radius * cos(radians(start_angle) + i * step),
+                                                           center[1] + radius * sin(radians(start_angle) + i * step),
+                                                           center[2])) for i in range(4)]
+            points.append(points[0])
 
-        return instructions
+        super().__init__(name, points, lifting, velocity, float_precision)
 
-    def move_instructions_offset(self, origin_robtarget_name: str, origin: Point3D = (450.0, 0, 450.0), tool_name: str = "tool0", global_velocity: int = 1000) -> List[str]:
-        instructions = []
+    def moves(self, global_velocity: int = 1000) -> List[ProgramItem]:
+        items: List[ProgramItem] = []
 
         points = self.get_points()
 
         # Pre down point
         if not self.skip_pre_down:
-            instructions.append(f"        !init_lifted\n")
-            instructions.append(f"        MoveJ Offs {Figure.offset_coord(origin_robtarget_name, origin, points[0])}, v{global_velocity}, fine, {tool_name};\n")
+            items.append(f"        !init_lifted\n")
+            items.append(Move(MoveKind.JOINT, points[0], global_velocity, pen_down=False))
 
         # Move to start point (down)
-        instructions.append(f"        MoveL Offs {Figure.offset_coord(origin_robtarget_name, origin, points[1])}, v{global_velocity}, fine, {tool_name};\n")
+        items.append(Move(MoveKind.LINEAR, points[1], global_velocity, pen_down=self.skip_pre_down))
 
-        if distance_vectors(points[2], points[3]) < 0.1:
-            # If the upper and lower points are too close, we can skip the arc movement
-            instructions.append(f"        MoveL Offs {Figure.offset_coord(origin_robtarget_name, origin, points[2])}, v{self.velocity}, fine, {tool_name};\n")
-            instructions.append(f"        MoveL Offs {Figure.offset_coord(origin_robtarget_name, origin, points[4])}, v{self.velocity}, fine, {tool_name};\n")
-        else:
-            # Create the upper half arc movement
-            instructions.append(f"        MoveC Offs {Figure.offset_coord(origin_robtarget_name, origin, points[2])}, Offs {Figure.offset_coord(origin_robtarget_name, origin, points[3])}, v{self.velocity}, fine, {tool_name};\n")
-
-        if distance_vectors(points[4], points[5]) < 0.1:
-            # If the lower points are too close, we can skip the arc movement
-            instructions.append(f"        MoveL Offs {Figure.offset_coord(origin_robtarget_name, origin, points[4])}, v{self.velocity}, fine, {tool_name};\n")
-            instructions.append(f"        MoveL Offs {Figure.offset_coord(origin_robtarget_name, origin, points[5])}, v{self.velocity}, fine, {tool_name};\n")
-        else:
-            # Create the lower half arc movement
-            instructions.append(f"        MoveC Offs {Figure.offset_coord(origin_robtarget_name, origin, points[4])}, Offs {Figure.offset_coord(origin_robtarget_name, origin, points[5])}, v{self.velocity}, fine, {tool_name};\n")
+        # Upper and lower half arc movements
+        for via, target in ((points[2], points[3]), (points[4], points[5])):
+            if distance_vectors(via, target) < 0.1:
+                # If the arc points are too close, we can skip the arc movement
+                items.append(Move(MoveKind.LINEAR, via, self.velocity, pen_down=True))
+                items.append(Move(MoveKind.LINEAR, target, self.velocity, pen_down=True))
+            else:
+                items.append(Move(MoveKind.CIRCULAR, target, self.velocity, pen_down=True, via=via))
 
         # Move to end point (lifted position)
         if not self.skip_end_lifting:
-            instructions.append(f"        MoveL Offs {Figure.offset_coord(origin_robtarget_name, origin, points[6])}, v{global_velocity}, fine, {tool_name};\n")
-            instructions.append(f"        !end_lifted\n")
+            items.append(Move(MoveKind.LINEAR, points[6], global_velocity, pen_down=False))
+            items.append(f"        !end_lifted\n")
 
-        return instructions
\ No newline at end of file
+        return items
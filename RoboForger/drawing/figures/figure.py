@@ -1,5 +1,6 @@
-from typing import List
+from typing import Callable, Dict, List, Tuple
 from RoboForger.fig_types import Point3D
+from RoboForger.drawing.moves import Move, ProgramItem, format_move, format_move_offset, offset_coord
 
 
 class Figure:
@@ -28,6 +29,7 @@ class Figure:
 
         self.rob_target_names: List[str] = [] # Rob targets saves the names of the rob targets
         self.target_count = 0
+        self._extra_target_names: Dict[Point3D, str] = {} # Names of the move points that are not figure points
 
         # Add lifting points
         self._add_lifted_points()
@@ -108,6 +110,20 @@ class Figure:
             raise ValueError("The figure has no points.")
         return self._points[-1]
 
+    def move_end_points(self, start_point: Point3D, end_point: Point3D):
+        """
+        Moves the start and end points (the lifted ones) to new positions, the down points next to them are moved by the
+        same offset so the figure keeps its shape. Used to snap end points that should be shared with other figures.
+        """
+        start_offset = tuple(new - old for new, old in zip(start_point, self._points[0]))
+        end_offset = tuple(new - old for new, old in zip(end_point, self._points[-1]))
+
+        self._points[1] = Figure.round_point(tuple(coord + offset for coord, offset in zip(self._points[1], start_offset)), self.float_precision)
+        self._points[-2] = Figure.round_point(tuple(coord + offset for coord, offset in zip(self._points[-2], end_offset)), self.float_precision)
+
+        self._points[0] = start_point
+        self._points[-1] = end_point
+
     def reverse_points(self):
         """
         Reverses the order of points in the figure.
@@ -153,18 +169,62 @@ class Figure:
     @staticmethod
     def offset_coord(origin_target_name: str, origin: Point3D, point: Point3D) -> str:
 
-        return f"({origin_target_name}, {round(point[0] - origin[0], 4)}, {round(point[1] - origin[1], 4)}, {round(point[2] - origin[2], 4)})"
+        return offset_coord(origin_target_name, origin, point)
 
-    # Override this method in subclasses to provide specific move instructions
-    def move_instructions(self, tool_name: str = "tool0", global_velocity: int = 1000) -> List[str]:
+    # Override this method in subclasses to describe the motion of the figure
+    def moves(self, global_velocity: int = 1000) -> List[ProgramItem]:
+        """
+        Returns the moves drawing the figure (see drawing.moves) mixed with comment lines. The moves in the air
+        (pre-down, descent, lifting) use global_velocity and the drawing moves the figure velocity.
+        """
         ...
 
+    def move_instructions(self, tool_name: str = "tool0", global_velocity: int = 1000) -> List[str]:
+        """
+        Move instructions referencing the rob targets of the figure (generated by get_rob_targets_formatted).
+        """
+        return self.format_instructions(self.moves(global_velocity), tool_name)
+
+    def format_instructions(self, items: List[ProgramItem], tool_name: str = "tool0") -> List[str]:
+        """
+        Formats moves of this figure (as returned by moves, possibly with their zones changed) with rob target names.
+        """
+        if not self.get_rob_target_names():
+            raise ValueError(f"No robot targets generated for {self.name}.")
+
+        target_name = self.target_namer()
+        return [format_move(item, target_name, tool_name) for item in items]
+
     def move_instructions_offset(self, origin_robtarget_name: str, origin: Point3D = (450.0, 0, 450.0), tool_name: str = "tool0", global_velocity: int = 1000) -> List[str]:
         """
         This method is used to generate move instructions with the offset method for the tool.
-        It can be overridden in subclasses if needed.
         """
-        ...
+        return [format_move_offset(item, origin_robtarget_name, origin, tool_name) for item in self.moves(global_velocity)]
+
+    def target_namer(self) -> Callable[[Point3D], str]:
+        """
+        Returns a function giving the rob target name of the move points, called in move order. The moves visit the
+        figure points in order, so every point is looked up from the last one found (a closed figure starts and ends
+        at the same coordinates but they are different targets).
+        """
+        points = self.get_points()
+        names = self.rob_target_names
+        cursor = 0
+
+        def target_name(point: Point3D) -> str:
+            nonlocal cursor
+
+            for index in range(cursor, len(points)):
+                if points[index] == point:
+                    cursor = index
+                    return names[index]
+
+            if point in self._extra_target_names:
+                return self._extra_target_names[point]
+
+            return names[points.index(point)]
+
+        return target_name
 
     def clear_rob_targets(self):
         """
@@ -180,9 +240,15 @@ class Figure:
         """
         return self.rob_target_names
 
-    def get_rob_targets_formatted(self) -> List[str]:
+    def get_rob_targets(self) -> List[Tuple[str, Point3D]]:
+        """
+        Returns the (name, point) of every rob target of the figure, see get_rob_targets_formatted.
+        """
         return self.__generate_rob_targets()
 
+    def get_rob_targets_formatted(self) -> List[str]:
+        return [Figure.rob_target_format(target_name, point) for target_name, point in self.__generate_rob_targets()]
+
     @staticmethod
     def _create_rob_target_coord(point: Point3D) -> str:
         """
@@ -209,7 +275,8 @@ class Figure:
         ** The generated rob targets are in ORDER ACCORDING TO THE POINTS at the current state of the figure.
         """
         self.rob_target_names.clear()
-        rob_targets_formatted: List[str] = []
+        self._extra_target_names.clear()
+        rob_targets: List[Tuple[str, Point3D]] = []
         self.target_count = 0
 
         for point in self.get_points():
@@ -217,9 +284,25 @@ class Figure:
             self.target_count += 1
 
             self.rob_target_names.append(target_name)
-            rob_targets_formatted.append(Figure.rob_target_format(target_name, point))
+            rob_targets.append((target_name, point))
+
+        # Moves can go through points that are not figure points (e.g. circle points of fitted arcs)
+        known_points = set(self.get_points())
+        for item in self.moves():
+            if not isinstance(item, Move):
+                continue
+
+            for point in (item.via, item.target):
+                if point is None or point in known_points or point in self._extra_target_names:
+                    continue
+
+                target_name = self.__generate_target_name(self.target_count)
+                self.target_count += 1
+
+                self._extra_target_names[point] = target_name
+                rob_targets.append((target_name, point))
 
-        return rob_targets_formatted
+        return rob_targets
 
     def __generate_target_name(self, count: int) -> str:
         return f"P{self.name}{count}"
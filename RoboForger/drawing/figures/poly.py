@@ -1,6 +1,7 @@
 from typing import List
 from .figure import Figure
 from RoboForger.fig_types import Point3D
+from RoboForger.drawing.moves import Move, MoveKind, ProgramItem
 
 
 class PolyLine(Figure):
@@ -13,57 +14,26 @@ class PolyLine(Figure):
 
         super().__init__(name, points, lifting, velocity, float_precision)
 
-    def move_instructions(self, tool_name: str = "tool0", global_velocity: int = 1000) -> List[str]:
-        instructions = []
-
-        targets = self.get_rob_target_names()
-
-        if not targets:
-            raise ValueError("No robot targets generated for the polyline.")
-
-        # Move to the first point
-        if not self.skip_pre_down:
-            instructions.append(f"        !init_lifted\n")
-            instructions.append(
-                f"        MoveJ {targets[0]}, v{global_velocity}, fine, {tool_name};\n"
-            )
-
-        for rob_target in targets[1:-1]:  # Skip the last target which is the lift point
-            instructions.append(
-                f"        MoveL {rob_target}, v{self.velocity}, fine, {tool_name};\n"
-            )
-
-        # Move to the last point (lift point)
-        if not self.skip_end_lifting:
-            instructions.append(f"        !end_lifted\n")
-            instructions.append(
-                f"        MoveL {targets[-1]}, v{global_velocity}, fine, {tool_name};\n"
-            )
-
-        return instructions
-
-    def move_instructions_offset(self, origin_robtarget_name: str, origin: Point3D = (450.0, 0.0, 450.0), tool_name: str = "tool0",  global_velocity: int = 1000) -> List[str]:
-        instructions = []
+    def moves(self, global_velocity: int = 1000) -> List[ProgramItem]:
+        items: List[ProgramItem] = []
 
         points = self.get_points()
 
         # Pre down point
         if not self.skip_pre_down:
-            instructions.append(f"        !init_lifted\n")
-            instructions.append(f"        MoveJ Offs {Figure.offset_coord(origin_robtarget_name, origin, points[0])}, v{global_velocity}, fine, {tool_name};\n")
-
-        for point in points[1:-1]:  # Skip the first and last points (lifted points)
-
-            instruction = f"        MoveL Offs {Figure.offset_coord(origin_robtarget_name, origin, point)}, v{global_velocity}, fine, {tool_name};\n"
+            items.append(f"        !init_lifted\n")
+            items.append(Move(MoveKind.JOINT, points[0], global_velocity, pen_down=False))
 
-            instructions.append(instruction)
+        # Skip the first and last points (lifted points), the first down point is the descent
+        for i, point in enumerate(points[1:-1]):
+            items.append(Move(MoveKind.LINEAR, point, global_velocity, pen_down=i > 0 or self.skip_pre_down))
 
         # Final lifted point
         if not self.skip_end_lifting:
-            instructions.append(f"        MoveL Offs {Figure.offset_coord(origin_robtarget_name, origin, points[-1])}, v{global_velocity}, fine, {tool_name};\n")
-            instructions.append(f"        !end_lifted\n")
+            items.append(Move(MoveKind.LINEAR, points[-1], global_velocity, pen_down=False))
+            items.append(f"        !end_lifted\n")
 
-        return instructions
+        return items
 
     def __str__(self):
         format_str = f"Polyline<name={self.name} start_point={self.start_point} end_point={self.end_point}>"
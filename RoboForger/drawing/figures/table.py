@@ -0,0 +1,261 @@
+"""
+Columnar storage for the lines, arcs and circles of a drawing.
+
+A PolyLine object costs hundreds of bytes (point tuples, lifted points, names...) and building millions of them is slow,
+so FigureTable keeps one row per figure in NumPy columns and applies the conversion steps (pre scaling, origin
+translation, rounding, limits check) to all the rows at once. Figure objects are only built when a caller asks for them.
+
+Splines are not stored here, their control points and knots are variable length data.
+"""
+from enum import IntEnum
+from typing import Dict, Iterator, List, Tuple
+from RoboForger.fig_types import Point3D, RawLine, RawArc, RawCircle
+from .figure import Figure
+from .poly import PolyLine
+from .arc import Arc
+from .circle import Circle
+
+import numpy as np
+
+
+class FigureKind(IntEnum):
+    LINE = 0
+    ARC = 1
+    CIRCLE = 2
+
+
+class FigureTable:
+    """
+    One row per figure, rows are grouped by kind (lines, then arcs, then circles). The columns that do not apply to a
+    kind are left at zero:
+    - kind: FigureKind of the row
+    - number: index of the figure among the figures of its kind, used for its name (Line{number}, Arc{number}...)
+    - start, end: (N, 3) line end points
+    - center: (N, 3) arc and circle centers
+    - radius: arc and circle radius
+    - start_angle, end_angle: arc angles in degrees
+    - clockwise: arc direction
+    """
+    __slots__ = (
+        "kind",
+        "number",
+        "start",
+        "end",
+        "center",
+        "radius",
+        "start_angle",
+        "end_angle",
+        "clockwise",
+        "lifting",
+        "float_precision",
+    )
+
+    def __init__(self, kind: np.ndarray, number: np.ndarray, start: np.ndarray, end: np.ndarray, center: np.ndarray,
+                 radius: np.ndarray, start_angle: np.ndarray, end_angle: np.ndarray, clockwise: np.ndarray,
+                 lifting: float = 0.0, float_precision: int = 4):
+        """
+        :param lifting: Lifting of the figures materialized from this table.
+        :param float_precision: Decimals kept by the figures materialized from this table (and by bounds).
+        """
+        self.kind = kind
+        self.number = number
+        self.start = start
+        self.end = end
+        self.center = center
+        self.radius = radius
+        self.start_angle = start_angle
+        self.end_angle = end_angle
+        self.clockwise = clockwise
+        self.lifting = lifting
+        self.float_precision = float_precision
+
+    @staticmethod
+    def from_arrays(lines: np.ndarray, arcs: np.ndarray, circles: np.ndarray) -> "FigureTable":
+        """
+        Builds the table from the array form of the parser (see cad_parser.collect_entities):
+        :param lines: (N, 6) start xyz, end xyz
+        :param arcs: (N, 6) center xyz, radius, start angle, end angle (degrees, counter clockwise)
+        :param circles: (N, 4) center xyz, radius
+        """
+        lines = np.asarray(lines, dtype=np.float64).reshape(-1, 6)
+        arcs = np.asarray(arcs, dtype=np.float64).reshape(-1, 6)
+        circles = np.asarray(circles, dtype=np.float64).reshape(-1, 4)
+
+        line_count, arc_count, circle_count = len(lines), len(arcs), len(circles)
+        size = line_count + arc_count + circle_count
+
+        arc_rows = slice(line_count, line_count + arc_count)
+        circle_rows = slice(line_count + arc_count, size)
+
+        kind = np.repeat(np.array([FigureKind.LINE, FigureKind.ARC, FigureKind.CIRCLE], dtype=np.int8),
+                         [line_count, arc_count, circle_count])
+        number = np.concatenate([np.arange(line_count), np.arange(arc_count), np.arange(circle_count)])
+
+        start = np.zeros((size, 3))
+        end = np.zeros((size, 3))
+        center = np.zeros((size, 3))
+        radius = np.zeros(size)
+        start_angle = np.zeros(size)
+        end_angle = np.zeros(size)
+
+        start[:line_count] = lines[:, 0:3]
+        end[:line_count] = lines[:, 3:6]
+
+        center[arc_rows] = arcs[:, 0:3]
+        radius[arc_rows] = arcs[:, 3]
+        start_angle[arc_rows] = arcs[:, 4]
+        end_angle[arc_rows] = arcs[:, 5]
+
+        center[circle_rows] = circles[:, 0:3]
+        radius[circle_rows] = circles[:, 3]
+
+        return FigureTable(kind, number, start, end, center, radius, start_angle, end_angle, np.zeros(size, dtype=bool))
+
+    @staticmethod
+    def from_raw(lines: List[RawLine], arcs: List[RawArc], circles: List[RawCircle]) -> "FigureTable":
+        """
+        Builds the table from the raw figure records (RawLine, RawArc, RawCircle).
+        """
+        table = FigureTable.from_arrays(
+            [(*line['start'], *line['end']) for line in lines],
+            [(*arc['center'], arc['radius'], arc['start_angle'], arc['end_angle']) for arc in arcs],
+            [(*circle['center'], circle['radius']) for circle in circles],
+        )
+        table.clockwise[table.kind == FigureKind.ARC] = [arc['clockwise'] for arc in arcs]
+
+        return table
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    def count(self, kind: FigureKind) -> int:
+        return int(np.count_nonzero(self.kind == kind))
+
+    def transform(self, pre_scale: float, lifting: float, origin: Point3D, float_precision: int) -> "FigureTable":
+        """
+        Vectorized Converter.apply_pre_scaling + real_coord2robo_coord: scales X and Y, puts every point at Z = -lifting
+        and moves them to the origin. Returns a new table, radius is scaled too and angles are kept.
+        """
+        scale = np.array([pre_scale, pre_scale, 0.0])
+        translation = np.array([origin[0], origin[1], -lifting + origin[2]])
+
+        return FigureTable(
+            self.kind,
+            self.number,
+            self.start * scale + translation,
+            self.end * scale + translation,
+            self.center * scale + translation,
+            self.radius * pre_scale,
+            self.start_angle,
+            self.end_angle,
+            self.clockwise,
+            lifting=lifting,
+            float_precision=float_precision,
+        )
+
+    def _arc_extents(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per arc (min, max) unit offsets from the center in X and Y: the end points plus every axis crossing the arc
+        sweeps over.
+        """
+        tau = 2 * np.pi
+        clockwise = self.clockwise[rows]
+
+        # A clockwise arc covers the same angles as the counter clockwise arc from its end to its start
+        first = np.radians(np.where(clockwise, self.end_angle[rows], self.start_angle[rows])) % tau
+        last = np.radians(np.where(clockwise, self.start_angle[rows], self.end_angle[rows])) % tau
+        sweep = (last - first) % tau
+
+        def covers(angle: float) -> np.ndarray:
+            return (angle - first) % tau <= sweep
+
+        cos_ends = np.stack([np.cos(first), np.cos(last)])
+        sin_ends = np.stack([np.sin(first), np.sin(last)])
+
+        low = np.stack([np.where(covers(np.pi), -1.0, cos_ends.min(axis=0)),
+                        np.where(covers(1.5 * np.pi), -1.0, sin_ends.min(axis=0))], axis=1)
+        high = np.stack([np.where(covers(0.0), 1.0, cos_ends.max(axis=0)),
+                         np.where(covers(0.5 * np.pi), 1.0, sin_ends.max(axis=0))], axis=1)
+
+        return low, high
+
+    def bounds(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per figure (N, 3) minimum and maximum coordinates of the drawn path (arcs by their real extent) including the
+        lifted points, rounded to float_precision.
+        """
+        minimum = np.minimum(self.start, self.end)
+        maximum = np.maximum(self.start, self.end)
+
+        rounds = self.kind != FigureKind.LINE
+        minimum[rounds] = self.center[rounds]
+        maximum[rounds] = self.center[rounds]
+
+        # Circle rounds its center to 4 decimals before placing its points
+        circles = self.kind == FigureKind.CIRCLE
+        circle_centers = np.round(self.center[circles], 4)
+        minimum[circles] = circle_centers
+        maximum[circles] = circle_centers
+        minimum[circles, :2] -= self.radius[circles, None]
+        maximum[circles, :2] += self.radius[circles, None]
+
+        arcs = np.flatnonzero(self.kind == FigureKind.ARC)
+        if len(arcs):
+            low, high = self._arc_extents(arcs)
+            minimum[arcs, :2] += low * self.radius[arcs, None]
+            maximum[arcs, :2] += high * self.radius[arcs, None]
+
+        maximum[:, 2] += self.lifting
+
+        return np.round(minimum, self.float_precision), np.round(maximum, self.float_precision)
+
+    def figures(self, kind: FigureKind | None = None, velocity: int | None = None) -> Iterator[Figure]:
+        """
+        Materializes the Figure objects of the rows (of the given kind), one at a time.
+        :param velocity: Velocity set on every figure, None keeps the figure default.
+        """
+        rows = np.arange(len(self)) if kind is None else np.flatnonzero(self.kind == kind)
+
+        kinds = self.kind[rows].tolist()
+        numbers = self.number[rows].tolist()
+        starts = self.start[rows].tolist()
+        ends = self.end[rows].tolist()
+        centers = self.center[rows].tolist()
+        radii = self.radius[rows].tolist()
+        start_angles = self.start_angle[rows].tolist()
+        end_angles = self.end_angle[rows].tolist()
+        clockwise = self.clockwise[rows].tolist()
+
+        for i in range(len(rows)):
+            if kinds[i] == FigureKind.LINE:
+                figure = PolyLine(f"Line{numbers[i]}", [tuple(starts[i]), tuple(ends[i])], lifting=self.lifting,
+                                  velocity=1000, float_precision=self.float_precision)
+            elif kinds[i] == FigureKind.ARC:
+                figure = Arc(f"Arc{numbers[i]}", center=tuple(centers[i]), radius=radii[i], start_angle=start_angles[i],
+                             end_angle=end_angles[i], clockwise=clockwise[i], lifting=self.lifting,
+                             float_precision=self.float_precision)
+            else:
+                figure = Circle(f"Circle{numbers[i]}", tuple(centers[i]), radii[i], lifting=self.lifting,
+                                float_precision=self.float_precision)
+
+            if velocity is not None:
+                figure.set_velocity(velocity)
+
+            yield figure
+
+    def to_raw(self) -> Dict[str, list]:
+        """
+        Returns the rows as raw figure records, {'lines': [RawLine...], 'arcs': [RawArc...], 'circles': [RawCircle...]}.
+        """
+        lines, arcs, circles = (np.flatnonzero(self.kind == kind) for kind in FigureKind)
+
+        return {
+            'lines': [{'start': tuple(start), 'end': tuple(end)}
+                      for start, end in zip(self.start[lines].tolist(), self.end[lines].tolist())],
+            'arcs': [{'center': tuple(center), 'radius': radius, 'start_angle': start_angle, 'end_angle': end_angle, 'clockwise': clockwise}
+                     for center, radius, start_angle, end_angle, clockwise in zip(self.center[arcs].tolist(), self.radius[arcs].tolist(),
+                                                                                  self.start_angle[arcs].tolist(), self.end_angle[arcs].tolist(),
+                                                                                  self.clockwise[arcs].tolist())],
+            'circles': [{'center': tuple(center), 'radius': radius}
+                        for center, radius in zip(self.center[circles].tolist(), self.radius[circles].tolist())],
+        }
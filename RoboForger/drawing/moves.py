@@ -0,0 +1,494 @@
+"""
+Structured move instructions.
+
+Figures describe their motion as a list of program items: Move records (kind, target, circle point, velocity, zone, pen
+state) and comment lines (plain strings, already formatted). Keeping the geometry around until the code is written lets
+Draw post process the motion (zone blending, cycle time estimation) before formatting it as offset (Offs) or robtarget
+based RAPID instructions.
+
+Programs have hundreds of thousands of moves, so the geometry, the zones, the cycle time and the offset formatting work
+on batches of moves as arrays (see move_arrays) instead of one move at a time.
+"""
+from enum import Enum
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+from RoboForger.fig_types import Point3D
+from math import radians
+
+import numpy as np
+
+
+# Standard RAPID zonedata and their TCP path zone radius (mm), biggest first
+ZONES: Tuple[Tuple[str, float], ...] = (
+    ("z50", 50.0),
+    ("z40", 40.0),
+    ("z30", 30.0),
+    ("z20", 20.0),
+    ("z15", 15.0),
+    ("z10", 10.0),
+    ("z5", 5.0),
+    ("z1", 1.0),
+    ("z0", 0.3),
+)
+
+# Zone radii in increasing order, to pick the biggest zone under a limit with a search
+_ZONE_NAMES = np.array([zone for zone, _ in reversed(ZONES)] , dtype=object)
+_ZONE_RADII = np.array([radius for _, radius in reversed(ZONES)])
+
+# Rough TCP acceleration (mm/s^2) used by the cycle time estimation
+DEFAULT_ACCELERATION = 2000.0
+
+
+class MoveKind(Enum):
+    JOINT = "MoveJ"
+    LINEAR = "MoveL"
+    CIRCULAR = "MoveC"
+
+
+class Move:
+    """
+    A single move instruction, target is where the move ends and via the circle point of a MoveC. pen_down tells if
+    the tool is drawing during the move, zone is the RAPID zonedata at the target ("fine" stops there). tolerance caps
+    the deviation of the corner paths at both ends of the move (None: the blending tolerance of the program).
+    """
+    __slots__ = ("kind", "target", "via", "velocity", "zone", "pen_down", "comment", "tolerance")
+
+    def __init__(self, kind: MoveKind, target: Point3D, velocity: int, pen_down: bool, via: Point3D | None = None,
+                 zone: str = "fine", comment: str = "", tolerance: float | None = None):
+        self.kind = kind
+        self.target = target
+        self.via = via
+        self.velocity = velocity
+        self.zone = zone
+        self.pen_down = pen_down
+        self.comment = comment
+        self.tolerance = tolerance
+
+    def __repr__(self):
+        return f"Move<{self.kind.value} target={self.target} via={self.via} v{self.velocity} {self.zone} pen_down={self.pen_down}>"
+
+
+ProgramItem = Move | str
+
+
+def offset_coord(origin_target_name: str, origin: Point3D, point: Point3D) -> str:
+    return f"({origin_target_name}, {round(point[0] - origin[0], 4)}, {round(point[1] - origin[1], 4)}, {round(point[2] - origin[2], 4)})"
+
+
+def format_move(item: ProgramItem, target: Callable[[Point3D], str], tool_name: str) -> str:
+    """
+    Formats a program item as a RAPID line, target gives the RAPID expression of a point (robtarget name or Offs).
+    Comment lines are returned as they are.
+    """
+    if isinstance(item, str):
+        return item
+
+    comment = f" !{item.comment}" if item.comment else ""
+
+    if item.kind == MoveKind.CIRCULAR:
+        return f"        MoveC {target(item.via)}, {target(item.target)}, v{item.velocity}, {item.zone}, {tool_name};{comment}\n"
+
+    return f"        {item.kind.value} {target(item.target)}, v{item.velocity}, {item.zone}, {tool_name};{comment}\n"
+
+
+def format_move_offset(item: ProgramItem, origin_robtarget_name: str, origin: Point3D, tool_name: str) -> str:
+    """
+    Formats a program item with targets relative to the origin robtarget, Offs (origin, dx, dy, dz).
+    """
+    return format_move(item, lambda point: f"Offs {offset_coord(origin_robtarget_name, origin, point)}", tool_name)
+
+
+# Offs based instruction templates, filled with (circle point, x, y, z, velocity, zone, comment) of every move where
+# every coordinate is given as (sign, integer part, decimals), see _coordinate_parts. %.0s consumes an argument without
+# writing it (the circle point of linear and joint moves), {origin} and {tool} are the robtarget and tool names.
+_OFFSET_TEMPLATES = {
+    MoveKind.JOINT: "        MoveJ %.0sOffs ({origin}, %s%d.%s, %s%d.%s, %s%d.%s), v%s, %s, {tool};%s\n",
+    MoveKind.LINEAR: "        MoveL %.0sOffs ({origin}, %s%d.%s, %s%d.%s, %s%d.%s), v%s, %s, {tool};%s\n",
+    MoveKind.CIRCULAR: "        MoveC Offs ({origin}, %s), Offs ({origin}, %s%d.%s, %s%d.%s, %s%d.%s), v%s, %s, {tool};%s\n",
+}
+
+# Decimals of a 4 decimals number without trailing zeros, by its 4 decimals as an integer: 5 -> "0005", 4500 -> "45"
+_DECIMALS = np.array(["0"] + [f"{decimals:04d}".rstrip("0") for decimals in range(1, 10000)], dtype=object)
+_SIGNS = np.array(["", "-"], dtype=object)
+
+
+def _round_coordinates(values: np.ndarray) -> np.ndarray:
+    """
+    Values rounded to 4 decimals like round(value, 4). np.round scales the values and rounds half to even, so the few
+    values close to a half (0.00005, 1.23445) are rounded again with round.
+    """
+    rounded = np.round(values, 4)
+
+    scaled = values * 1e4
+    ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if len(ties):
+        flat = rounded.reshape(-1)
+        flat[ties] = [round(value, 4) for value in values.reshape(-1)[ties].tolist()]
+
+    return rounded
+
+
+def _coordinate_parts(values: np.ndarray) -> Tuple[List[str], List[int], List[str]]:
+    """
+    Values rounded to 4 decimals, split in (signs, integer parts, decimals) so "%s%d.%s" writes them as
+    str(round(value, 4)) does (4 decimals without their trailing zeros, "-0.0" for negative zero). Exact for robot
+    coordinates, str switches to the exponent notation above 1e16.
+    """
+    rounded = _round_coordinates(values).reshape(-1)
+    scaled = np.abs(np.rint(rounded * 1e4).astype(np.int64))
+
+    return _SIGNS[np.signbit(rounded).astype(np.intp)].tolist(), (scaled // 10000).tolist(), _DECIMALS[scaled % 10000].tolist()
+
+
+def format_items_offset(items: Sequence[ProgramItem], origin_robtarget_name: str, origin: Point3D, tool_name: str) -> str:
+    """
+    Text of format_move_offset for every item. The offsets of all moves are computed, rounded and split at once, then
+    the lines are written by a single template (the template of every line joined) filled in one go.
+    """
+    if not items:
+        return ""
+
+    moves = [item for item in items if isinstance(item, Move)]
+
+    targets, vias, circular = move_arrays(moves)
+    origin_array = np.asarray(origin, dtype=float)
+
+    signs, integers, decimals = _coordinate_parts(targets - origin_array)
+
+    circle_points = [""] * len(moves)
+    if circular.any():
+        via_parts = list(chain.from_iterable(zip(*_coordinate_parts(vias[circular] - origin_array))))
+        for via_index, index in enumerate(np.flatnonzero(circular).tolist()):
+            circle_points[index] = "%s%d.%s, %s%d.%s, %s%d.%s" % tuple(via_parts[9 * via_index:9 * via_index + 9])
+
+    columns = [circle_points,
+               signs[0::3], integers[0::3], decimals[0::3],
+               signs[1::3], integers[1::3], decimals[1::3],
+               signs[2::3], integers[2::3], decimals[2::3],
+               [move.velocity for move in moves], [move.zone for move in moves],
+               [f" !{move.comment}" if move.comment else "" for move in moves]]
+
+    templates = {kind: template.replace("{origin}", origin_robtarget_name.replace("%", "%%")).replace("{tool}", tool_name.replace("%", "%%"))
+                 for kind, template in _OFFSET_TEMPLATES.items()}
+    joint, linear, circle = templates[MoveKind.JOINT], templates[MoveKind.LINEAR], templates[MoveKind.CIRCULAR]
+
+    # Other lines (figure headers) are part of the template, they take no argument
+    line_templates = [(linear if item.kind is MoveKind.LINEAR else joint if item.kind is MoveKind.JOINT
+                       else circle if item.via is not None else linear) if isinstance(item, Move) else item.replace("%", "%%")
+                      for item in items]
+
+    return "".join(line_templates) % tuple(chain.from_iterable(zip(*columns)))
+
+
+def move_arrays(moves: Sequence[Move]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Targets (M, 3), circle points (M, 3, the target for moves without one) and the mask of the circular moves.
+    """
+    targets = np.array([move.target for move in moves], dtype=float).reshape(-1, 3)
+    circular = np.array([move.kind is MoveKind.CIRCULAR and move.via is not None for move in moves], dtype=bool)
+
+    vias = targets.copy()
+    if circular.any():
+        vias[circular] = [move.via for move, is_circular in zip(moves, circular) if is_circular]
+
+    return targets, vias, circular
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    Unit vectors of the rows, rows shorter than 1e-12 (no direction) become zero.
+    """
+    norms = np.linalg.norm(vectors, axis=1)
+    units = np.zeros_like(vectors)
+    valid = norms > 1e-12
+    units[valid] = vectors[valid] / norms[valid, None]
+    return units
+
+
+def move_geometry(start_point: Point3D, moves: Sequence[Move]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Geometry of consecutive moves, the first one starting at start_point: (start points (M, 3), path lengths (M,),
+    directions at the start (M, 3), directions at the end (M, 3), curvatures (M,)). Circular moves use the tangents and
+    the curvature (1 / radius) of the circle through start, via and target, and the length of the two chords; other
+    moves have no curvature. Moves without length have zero directions.
+    """
+    targets, vias, circular = move_arrays(moves)
+    starts = np.vstack([np.asarray(start_point, dtype=float).reshape(1, 3), targets[:-1]])
+
+    chords = targets - starts
+    lengths = np.linalg.norm(chords, axis=1)
+    start_directions = _unit_rows(chords)
+    end_directions = start_directions.copy()
+    curvatures = np.zeros(len(lengths))
+
+    if circular.any():
+        start, via, target = starts[circular], vias[circular], targets[circular]
+        a, b = via - start, target - start
+        lengths[circular] = np.linalg.norm(a, axis=1) + np.linalg.norm(target - via, axis=1)
+
+        normal = np.cross(a, b)
+        normal2 = np.einsum('ij,ij->i', normal, normal)
+        arc = normal2 >= 1e-12  # collinear points keep the chord direction
+
+        # Circumcenter of start, via and target
+        with np.errstate(divide='ignore', invalid='ignore'):
+            center = start + (np.cross(normal, a) * np.einsum('ij,ij->i', b, b)[:, None] +
+                              np.cross(b, normal) * np.einsum('ij,ij->i', a, a)[:, None]) / (2 * normal2[:, None])
+
+        start_tangents = _unit_rows(np.cross(normal, start - center))
+        end_tangents = _unit_rows(np.cross(normal, target - center))
+
+        # Both tangents turn the same way, orient them along the travel (towards the circle point at the start)
+        backwards = np.einsum('ij,ij->i', start_tangents, a) < 0
+        start_tangents[backwards] *= -1
+        end_tangents[backwards] *= -1
+
+        rows = np.flatnonzero(circular)[arc]
+        start_directions[rows] = start_tangents[arc]
+        end_directions[rows] = end_tangents[arc]
+        curvatures[rows] = 1 / np.linalg.norm(start[arc] - center[arc], axis=1)
+
+    return starts, lengths, start_directions, end_directions, curvatures
+
+
+def corner_zones(angles: np.ndarray, incoming_lengths: np.ndarray, outgoing_lengths: np.ndarray, tolerance: float | np.ndarray,
+                 incoming_curvatures: np.ndarray | None = None, outgoing_curvatures: np.ndarray | None = None) -> np.ndarray:
+    """
+    Biggest zone whose corner path stays within tolerance of the corner and within half of the shorter segment, for
+    every corner. A corner path of radius r at a turn of angle a cuts the corner by about r * sin(a / 2) / 2, and it
+    also cuts the chord of r on a circular move of curvature k (the sagitta, about r^2 * k / 8 per side), so arcs
+    joined without a turn still get small zones. tolerance can also be given per corner.
+    """
+    limits = np.minimum(incoming_lengths, outgoing_lengths) / 2
+
+    # Deviation b * r + c * r^2, the zone is the positive root of b * r + c * r^2 = tolerance
+    b = np.sin(angles / 2) / 2
+    c = np.zeros_like(b)
+    for curvatures in (incoming_curvatures, outgoing_curvatures):
+        if curvatures is not None:
+            c = c + curvatures / 8
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        radii = 2 * tolerance / (b + np.sqrt(b * b + 4 * c * tolerance))
+    limits = np.where(b + c > 1e-12, np.minimum(limits, radii), limits)
+
+    indices = np.searchsorted(_ZONE_RADII, limits, side='right') - 1
+    return np.where(indices >= 0, _ZONE_NAMES[np.maximum(indices, 0)], "fine")
+
+
+def corner_zone(angle: float, incoming_length: float, outgoing_length: float, tolerance: float,
+                incoming_curvature: float = 0.0, outgoing_curvature: float = 0.0) -> str:
+    return str(corner_zones(np.array([angle]), np.array([incoming_length]), np.array([outgoing_length]), tolerance,
+                            np.array([incoming_curvature]), np.array([outgoing_curvature]))[0])
+
+
+def _blend_batch(moves: List[Move], start_point: Point3D, tolerance: float, sharp_angle: float) -> Tuple[int | None, Point3D]:
+    """
+    Assigns the zones of the moves whose next move with length is also in the batch. Returns the index of the last
+    move with length (its zone depends on the moves after the batch, None if there is none) and its start point.
+    """
+    starts, lengths, start_directions, end_directions, curvatures = move_geometry(start_point, moves)
+
+    valid = np.flatnonzero(np.linalg.norm(start_directions, axis=1) > 0.5)
+    if not len(valid):
+        return None, start_point
+
+    held, following = valid[:-1], valid[1:]
+
+    if len(held):
+        # The pen changes between two moves with length if it changes anywhere from the first to the second
+        pen = np.array([move.pen_down for move in moves], dtype=bool)
+        changes = np.concatenate([[0], np.cumsum(pen[1:] != pen[:-1])])
+        pen_changes = changes[following] - changes[held] > 0
+
+        cosines = np.clip(np.einsum('ij,ij->i', end_directions[held], start_directions[following]), -1.0, 1.0)
+        angles = np.where(np.linalg.norm(end_directions[held], axis=1) > 0.5, np.arccos(cosines), np.inf)
+
+        blended = ~pen_changes & (angles <= sharp_angle)
+
+        # Moves with their own tolerance cap the corners at both of their ends
+        tolerances = np.array([np.inf if move.tolerance is None else move.tolerance for move in moves])
+        corner_tolerances = np.minimum(tolerance, np.minimum(tolerances[held], tolerances[following]))
+        zones = corner_zones(angles, lengths[held], lengths[following], corner_tolerances, curvatures[held], curvatures[following])
+
+        for i in np.flatnonzero(blended).tolist():
+            # Zero length moves between the corner moves take the zone of the corner
+            zone = zones[i]
+            for index in range(held[i], following[i]):
+                moves[index].zone = zone
+
+    last = int(valid[-1])
+    return last, tuple(starts[last].tolist())
+
+
+def blend_zones(items: Iterable[Any], start_point: Point3D, tolerance: float, sharp_corner_angle: float = 45.0,
+                batch_size: int = 4096) -> Iterator[Any]:
+    """
+    Assigns zones to the moves of a program, one move of lookahead: the zone at the end of a move depends on the next
+    move with some length. A move keeps fine when the pen goes down or up after it (pen state changes), when the turn
+    to the next move is sharper than sharp_corner_angle (degrees) or at the end of the stream. Other corners get the
+    biggest zone within tolerance, or within the tolerance of the moves at the corner if they have a smaller one (see
+    corner_zones). Zero length moves take the zone of the corner they sit on.
+
+    The moves are read in batches of batch_size, the items of a batch are yielded in order once their zones are known
+    (the last move with length waits for the next batch), tolerance <= 0 yields them untouched (all fine). Items that
+    are not moves (comment lines or any marker of the caller) are passed through in their place.
+    """
+    if tolerance <= 0:
+        yield from items
+        return
+
+    sharp_angle = radians(sharp_corner_angle)
+    position = start_point
+
+    pending: List[Any] = []  # items not yielded yet
+    moves: List[Move] = []  # moves of the pending items
+
+    for item in items:
+        pending.append(item)
+
+        if not isinstance(item, Move):
+            continue
+
+        moves.append(item)
+        if len(moves) < batch_size:
+            continue
+
+        last, last_start = _blend_batch(moves, position, tolerance, sharp_angle)
+        if last is None:
+            # Nothing with length, nothing waits for the next moves
+            position = moves[-1].target
+            yield from pending
+            pending, moves = [], []
+            continue
+
+        # Everything before the last move with length is final, it waits with the items after it
+        held = moves[last]
+        cut = next(i for i, other in enumerate(pending) if other is held)
+
+        yield from pending[:cut]
+        pending, moves, position = pending[cut:], moves[last:], last_start
+
+    if moves:
+        _blend_batch(moves, position, tolerance, sharp_angle)
+
+    yield from pending
+
+
+def _profile_times(lengths: np.ndarray, first_velocities: np.ndarray, last_velocities: np.ndarray, acceleration: float) -> np.ndarray:
+    """
+    Time of runs of moves that start and end stopped: the moves at their speed plus the ramps at both ends (a ramp to
+    v costs v / (2a) more than covering its distance at v), or a triangular profile if the run is too short.
+    """
+    ramp_lengths = (first_velocities ** 2 + last_velocities ** 2) / (2 * acceleration)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        short = 2 * np.sqrt(lengths / acceleration) - lengths / np.maximum(np.maximum(first_velocities, last_velocities), 1e-9)
+
+    return np.where(lengths >= ramp_lengths, (first_velocities + last_velocities) / (2 * acceleration), short)
+
+
+class CycleTimeEstimator:
+    """
+    Rough cycle time (seconds) of moves fed in batches: every move at its velocity (mm/s, MoveJ taken as a straight
+    line) and the robot stopping at every fine point. It keeps the time with the zones of the moves and the time with
+    fine everywhere, so programs can be measured while they are written.
+    """
+    __slots__ = ("acceleration", "position", "moves", "blended_points", "_time_with", "_time_without", "_run_length", "_first_velocity", "_last_velocity")
+
+    def __init__(self, start_point: Point3D, acceleration: float = DEFAULT_ACCELERATION):
+        self.acceleration = acceleration
+        self.position = start_point
+        self.moves = 0
+        self.blended_points = 0
+
+        self._time_with = 0.0
+        self._time_without = 0.0
+
+        # Run of blended moves since the last fine point
+        self._run_length = 0.0
+        self._first_velocity: float | None = None
+        self._last_velocity: float | None = None
+
+    def add(self, move: Move):
+        self.add_batch([move])
+
+    def add_batch(self, moves: Sequence[Move]):
+        if not moves:
+            return
+
+        _, lengths, _, _, _ = move_geometry(self.position, moves)
+        velocities = np.array([move.velocity for move in moves], dtype=float)
+        fine = np.array([move.zone == "fine" for move in moves], dtype=bool)
+
+        self.position = moves[-1].target
+        self.moves += len(moves)
+        self.blended_points += int(np.count_nonzero(~fine))
+
+        self._time_without += float(np.sum(lengths / velocities + _profile_times(lengths, velocities, velocities, self.acceleration)))
+        self._time_with += float(np.sum(lengths / velocities))
+
+        # Runs end at the fine moves, the first one continues the run left open by the previous batch
+        ends = np.flatnonzero(fine)
+        distances = np.concatenate([[self._run_length], self._run_length + np.cumsum(lengths)])
+
+        if len(ends):
+            begins = np.concatenate([[0], ends[:-1] + 1])
+            first_velocities = velocities[begins]
+            if self._first_velocity is not None:
+                first_velocities[0] = self._first_velocity
+
+            run_lengths = distances[ends + 1] - np.concatenate([[0.0], distances[ends[:-1] + 1]])
+            self._time_with += float(np.sum(_profile_times(run_lengths, first_velocities, velocities[ends], self.acceleration)))
+
+            self._run_length = float(distances[-1] - distances[ends[-1] + 1])
+            self._first_velocity = float(velocities[ends[-1] + 1]) if ends[-1] + 1 < len(moves) else None
+        else:
+            self._run_length = float(distances[-1])
+            if self._first_velocity is None:
+                self._first_velocity = float(velocities[0])
+
+        self._last_velocity = float(velocities[-1])
+
+    @property
+    def time_without_blending(self) -> float:
+        return self._time_without
+
+    @property
+    def time_with_blending(self) -> float:
+        # The robot stops after the last move whatever its zone
+        if self._first_velocity is None:
+            return self._time_with
+
+        return self._time_with + float(_profile_times(np.array([self._run_length]), np.array([self._first_velocity]),
+                                                      np.array([self._last_velocity]), self.acceleration)[0])
+
+    def report(self) -> Dict[str, float]:
+        return {
+            "moves": self.moves,
+            "blended_points": self.blended_points,
+            "fine_points": self.moves - self.blended_points,
+            "time_without_blending": self.time_without_blending,
+            "time_with_blending": self.time_with_blending,
+        }
+
+
+def estimate_cycle_time(items: Iterable[ProgramItem], start_point: Point3D, blending: bool = True,
+                        acceleration: float = DEFAULT_ACCELERATION) -> float:
+    """
+    Rough cycle time (seconds) of the moves (see CycleTimeEstimator), with blending=False every point is taken as fine.
+    """
+    estimator = CycleTimeEstimator(start_point, acceleration)
+    estimator.add_batch([item for item in items if isinstance(item, Move)])
+
+    return estimator.time_with_blending if blending else estimator.time_without_blending
+
+
+def cycle_time_report(items: Iterable[ProgramItem], start_point: Point3D, acceleration: float = DEFAULT_ACCELERATION) -> Dict[str, float]:
+    """
+    Compares the estimated cycle time of the moves with their zones and with fine everywhere.
+    """
+    estimator = CycleTimeEstimator(start_point, acceleration)
+    estimator.add_batch([item for item in items if isinstance(item, Move)])
+
+    return estimator.report()
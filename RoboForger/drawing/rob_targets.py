@@ -0,0 +1,63 @@
+"""
+Rob target table interns the rob targets of a program by rounded coordinates.
+
+Every figure declares a rob target per point, so the shared end points of chained figures (and any repeated coordinate)
+were declared once per figure with the same value. The table declares every coordinate once, with the name given by the
+first figure using it, and the moves of every figure reference that name.
+"""
+from typing import Callable, Dict, List
+from RoboForger.fig_types import Point3D
+from .figures.figure import Figure
+
+
+class RobTargetTable:
+    __slots__ = ("precision", "declared", "reused", "_names", "_names_by_key")
+
+    def __init__(self, precision: int = 4):
+        """
+        :param precision: Decimals the coordinates are rounded to before being compared (offset instructions are
+        written with 4 decimals too).
+        """
+        self.precision = precision
+
+        # Rob targets declared and figure targets that took the name of an already declared one, for the report
+        self.declared = 0
+        self.reused = 0
+
+        self._names: Dict[Point3D, str] = {}  # Exact points of the figures
+        self._names_by_key: Dict[Point3D, str] = {}  # Rounded points
+
+    def add(self, figure: Figure) -> List[str]:
+        """
+        Adds the rob targets of the figure, returns the declarations of the coordinates not in the table yet.
+        """
+        declarations: List[str] = []
+
+        for target_name, point in figure.get_rob_targets():
+            key = Figure.round_point(point, self.precision)
+
+            if key in self._names_by_key:
+                self._names[point] = self._names_by_key[key]
+                self.reused += 1
+                continue
+
+            self._names_by_key[key] = self._names[point] = target_name
+            self.declared += 1
+            declarations.append(Figure.rob_target_format(target_name, point))
+
+        return declarations
+
+    def target_name(self, point: Point3D) -> str:
+        """
+        Name of the rob target of a point of the figures added.
+        """
+        if point in self._names:
+            return self._names[point]
+
+        return self._names_by_key[Figure.round_point(point, self.precision)]
+
+    def target_namer(self) -> Callable[[Point3D], str]:
+        """
+        Same as Figure.target_namer for the moves of any figure added.
+        """
+        return self.target_name
@@ -25,3 +25,10 @@ class RawSpline(TypedDict):
     weights: List[float]
     control_points: List[Point3D]
     fit_points: List[Point3D]
+
+class LimitViolation(TypedDict):
+    figure: str
+    axis: str
+    bound: str
+    value: float
+    limit: float
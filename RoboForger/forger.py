@@ -2,13 +2,18 @@
 This module creates a Draw class that is used to generate the Rapid Code given a CAD file.
 """
 import os
-from typing import Tuple, Sequence
+import json
+import logging
+import numpy as np
+from typing import Dict, List, Sequence, TextIO, Tuple
 from RoboForger.drawing.figures.figure import Figure
 from RoboForger.fig_types import Point3D, RawLine, RawArc, RawCircle, RawSpline
-from RoboForger.drawing.figures import PolyLine, Arc, Circle, BSpline
+from RoboForger.drawing.figures import PolyLine, Arc, Circle, BSpline, FigureTable, FigureKind
 from RoboForger.preprocessing.cad_parser import CADParser
 from RoboForger.preprocessing.converter import Converter
+from RoboForger.preprocessing.cache import DxfCache, FigureCache
 from RoboForger.drawing.draw import Draw
+from RoboForger.detector.enums import TraceMode
 from RoboForger.utils import get_resource_path
 
 
@@ -31,6 +36,22 @@ class ForgerParameters:
         "workspace_limits",
         "use_intelligent_traces",
         "use_offset_programming",
+        "trace_mode",
+        "optimize_travel",
+        "travel_time_budget",
+        "snap_tolerance",
+        "streaming_min_file_mb",
+        "spline_chord_error",
+        "spline_arc_tolerance",
+        "zone_tolerance",
+        "sharp_corner_angle",
+        "simplify_tolerance",
+        "arc_merge_tolerance",
+        "procedure_budget",
+        "share_rob_targets",
+        "conversion_workers",
+        "cache_dir",
+        "cache_max_mb",
     )
 
     def __init__(self):
@@ -50,6 +71,22 @@ class ForgerParameters:
         self.workspace_limits = ((-600, -800, -200), (800, 800, 1200))
         self.use_intelligent_traces = True
         self.use_offset_programming = True
+        self.trace_mode: str = TraceMode.LONGEST_PATH.value
+        self.optimize_travel = False
+        self.travel_time_budget: float = 1.0
+        self.snap_tolerance: float = 0.0
+        self.streaming_min_file_mb: float = 50.0
+        self.spline_chord_error: float = 0.0
+        self.spline_arc_tolerance: float = 0.0
+        self.zone_tolerance: float = 0.0
+        self.sharp_corner_angle: float = 45.0
+        self.simplify_tolerance: float = 0.0
+        self.arc_merge_tolerance: float = 0.0
+        self.procedure_budget: int = 0
+        self.share_rob_targets: bool = False
+        self.conversion_workers: int = 0
+        self.cache_dir: str = ""  # Folder of the figure cache (see FigureCache), empty disables it
+        self.cache_max_mb: float = 512.0
 
     def to_dict(self) -> dict:
         return {
@@ -67,6 +104,22 @@ class ForgerParameters:
             "workspace_limits": self.workspace_limits,
             "use_intelligent_traces": self.use_intelligent_traces,
             "use_offset_programming": self.use_offset_programming,
+            "trace_mode": self.trace_mode,
+            "optimize_travel": self.optimize_travel,
+            "travel_time_budget": self.travel_time_budget,
+            "snap_tolerance": self.snap_tolerance,
+            "streaming_min_file_mb": self.streaming_min_file_mb,
+            "spline_chord_error": self.spline_chord_error,
+            "spline_arc_tolerance": self.spline_arc_tolerance,
+            "zone_tolerance": self.zone_tolerance,
+            "sharp_corner_angle": self.sharp_corner_angle,
+            "simplify_tolerance": self.simplify_tolerance,
+            "arc_merge_tolerance": self.arc_merge_tolerance,
+            "procedure_budget": self.procedure_budget,
+            "share_rob_targets": self.share_rob_targets,
+            "conversion_workers": self.conversion_workers,
+            "cache_dir": self.cache_dir,
+            "cache_max_mb": self.cache_max_mb,
         }
 
     def apply(self, data: dict):
@@ -75,7 +128,7 @@ class ForgerParameters:
                 setattr(self, key, value)
 
     def __str__(self):
-        return f"ForgerParameters(origin={self.origin}, zero={self.zero}, pre_scale={self.pre_scale}, float_precision={self.float_precision}, lifting={self.lifting}, tool_name='{self.tool_name}', global_velocity={self.global_velocity}, polyline_velocity={self.polyline_velocity}, arc_velocity={self.arc_velocity}, circle_velocity={self.circle_velocity}, spline_velocity={self.spline_velocity}, workspace_limits={self.workspace_limits}, use_intelligent_traces={self.use_intelligent_traces}, use_offset_programming={self.use_offset_programming})"
+        return f"ForgerParameters(origin={self.origin}, zero={self.zero}, pre_scale={self.pre_scale}, float_precision={self.float_precision}, lifting={self.lifting}, tool_name='{self.tool_name}', global_velocity={self.global_velocity}, polyline_velocity={self.polyline_velocity}, arc_velocity={self.arc_velocity}, circle_velocity={self.circle_velocity}, spline_velocity={self.spline_velocity}, workspace_limits={self.workspace_limits}, use_intelligent_traces={self.use_intelligent_traces}, use_offset_programming={self.use_offset_programming}, trace_mode='{self.trace_mode}', optimize_travel={self.optimize_travel}, travel_time_budget={self.travel_time_budget}, snap_tolerance={self.snap_tolerance}, streaming_min_file_mb={self.streaming_min_file_mb}, spline_chord_error={self.spline_chord_error}, spline_arc_tolerance={self.spline_arc_tolerance}, zone_tolerance={self.zone_tolerance}, sharp_corner_angle={self.sharp_corner_angle}, simplify_tolerance={self.simplify_tolerance}, arc_merge_tolerance={self.arc_merge_tolerance}, procedure_budget={self.procedure_budget}, share_rob_targets={self.share_rob_targets}, conversion_workers={self.conversion_workers}, cache_dir='{self.cache_dir}', cache_max_mb={self.cache_max_mb})"
 
 
 
@@ -94,19 +147,44 @@ class Forger:
 
         self._params = parameters
 
-        self._raw_lines: list[RawLine] = []
-        self._raw_arcs: list[RawArc] = []
-        self._raw_circles: list[RawCircle] = []
+        # Lines, arcs and circles are kept in columnar tables, splines as records/objects
+        self._raw_table: FigureTable = FigureTable.from_arrays([], [], [])
         self._raw_splines: list[RawSpline] = []
 
+        self._table: FigureTable = FigureTable.from_arrays([], [], [])
+
         self._polylines: list[PolyLine] = []
         self._arcs: list[Arc] = []
         self._circles: list[Circle] = []
         self._splines: list[BSpline] = []
+        # Sampled points of the converted splines (packed by FigureCache), the detector reverses and flags the spline
+        # objects of a draw so they are built again from these points for the next one
+        self._spline_points: Dict[str, np.ndarray] = FigureCache.pack_spline_points([])
 
         self._parsed: bool = False # flag to know if figures have been parsed
         self._converted: bool = False # flag to know if figures have been converted
+        self._materialized: bool = False # flag to know if the figure objects have been built from the converted table
         self._rapid_code: str = "" # generated RAPID code after processing
+        self._cycle_time_report: Dict[str, float] = {} # estimated cycle time with and without zone blending
+
+        self._file_digest: str | None = None # content digest of the parsed file, when the figure cache is used
+        self._traces_key: str | None = None # cache entry the detected figures of the next draw are saved to
+
+    def set_parameters(self, parameters: ForgerParameters):
+        """
+        Changes the parameters keeping the parsed figures, so the same file can be processed again without parsing it.
+        The figures are only converted again if a parameter of the conversion changed.
+        """
+        conversion_parameters = self._conversion_parameters()
+        self._params = parameters
+
+        if self._converted and self._conversion_parameters() != conversion_parameters:
+            self.convert_figures()
+        elif self._converted:
+            self._splines = self._build_splines(self._converter())
+
+        # The figure objects take the velocities of the parameters (and the detector of the last draw changed them)
+        self._materialized = False
 
     def parse_figures(self, cad_file: str):
         if not os.path.exists(cad_file):
@@ -115,57 +193,166 @@ class Forger:
         if self._parsed:
             self._parsed = False  # reset parsed flag if new parsing is done
 
-        try:
-            parser = CADParser(filepath=cad_file, binary_dwg2dxf_path=get_resource_path("bin/libredwg/dwg2dxf.exe"))
-        except Exception as e:
-            raise RuntimeError(f"Failed to initialize CAD parser: {e}")
-        
-        figures = parser.get_figures_parsed()
-        self._raw_lines = figures.get("lines", [])
-        self._raw_arcs = figures.get("arcs", [])
-        self._raw_circles = figures.get("circles", [])
-        self._raw_splines = figures.get("splines", [])
+        cache = self._figure_cache()
+        self._file_digest = FigureCache.file_digest(cad_file) if cache else None
+
+        key = FigureCache.key("raw", self._file_digest, {}) if cache else ""
+        entry = cache.load(key) if cache else None
+        raw = FigureCache.read_entry(entry, lambda arrays: (FigureCache.unpack_table(arrays, "raw"), FigureCache.unpack_splines(arrays)),
+                                     key) if entry is not None else None
+
+        if raw is not None:
+            self._raw_table, self._raw_splines = raw
+            logging.info(f"Parsed figures of {cad_file} loaded from the cache.")
+        else:
+            self._parse_file(cad_file)
+
+            if cache:
+                cache.save(key, {**FigureCache.pack_table(self._raw_table, "raw"), **FigureCache.pack_splines(self._raw_splines)})
 
         self._parsed = True
 
         if self._converted:
             self._converted = False  # reset converted flag if new parsing is done
 
+    def _parse_file(self, cad_file: str):
+        # Big files are streamed entity by entity instead of loading the whole DXF document in memory
+        streaming = os.path.getsize(cad_file) >= self._params.streaming_min_file_mb * 1024 * 1024
+
+        try:
+            dxf_cache = DxfCache(self._params.cache_dir, int(self._params.cache_max_mb * 1024 * 1024)) if self._params.cache_dir else None
+            parser = CADParser(filepath=cad_file, binary_dwg2dxf_path=get_resource_path("bin/libredwg/dwg2dxf.exe"),
+                               streaming=streaming, dxf_cache=dxf_cache)
+        except Exception as e:
+            raise RuntimeError(f"Failed to initialize CAD parser: {e}")
+
+        figures = parser.get_figures_arrays()
+        self._raw_table = FigureTable.from_arrays(figures["lines"], figures["arcs"], figures["circles"])
+        self._raw_splines = figures["splines"]
+
+    def _figure_cache(self) -> FigureCache | None:
+        if not self._params.cache_dir:
+            return None
+
+        return FigureCache(self._params.cache_dir, int(self._params.cache_max_mb * 1024 * 1024))
+
+    def _conversion_parameters(self) -> dict:
+        """
+        Parameters the converted figures depend on (cache key).
+        """
+        return {name: getattr(self._params, name) for name in ("float_precision", "pre_scale", "lifting", "origin",
+                                                                "spline_chord_error", "spline_arc_tolerance")}
+
+    def _trace_parameters(self) -> dict:
+        """
+        Parameters the detected figures depend on (cache key), the velocities are set again when they are loaded.
+        """
+        return {**self._conversion_parameters(),
+                **{name: getattr(self._params, name) for name in ("trace_mode", "optimize_travel", "travel_time_budget",
+                                                                  "snap_tolerance", "simplify_tolerance", "arc_merge_tolerance")}}
+
+    def _converter(self) -> Converter:
+        return Converter(float_precision=self._params.float_precision, pre_scale=self._params.pre_scale, lifting=self._params.lifting, origin=self._params.origin,
+                         spline_chord_error=self._params.spline_chord_error, spline_arc_tolerance=self._params.spline_arc_tolerance,
+                         workers=self._params.conversion_workers)
+
+    def _unpack_converted(self, arrays: Dict[str, np.ndarray], converter: Converter):
+        """
+        Converted figures packed by FigureCache, the splines are built from their sampled points.
+        """
+        self._table = FigureCache.unpack_table(arrays, "converted")
+        self._spline_points = {name: arrays[name] for name in ("sampled_count", "sampled_points")}
+        self._splines = self._build_splines(converter)
+
+    def _build_splines(self, converter: Converter) -> List[BSpline]:
+        return [converter.convert_spline(i, spline, points) for i, (spline, points) in
+                enumerate(zip(self._raw_splines, FigureCache.unpack_spline_points(self._spline_points)))]
+
     def convert_figures(self):
-        converter = Converter(float_precision=self._params.float_precision, pre_scale=self._params.pre_scale, lifting=self._params.lifting, origin=self._params.origin)
-        figures: dict[str, list[PolyLine | Arc | Circle | BSpline]] = converter.convert_figures(lines=self._raw_lines,
-                                                                                                arcs=self._raw_arcs,
-                                                                                                circles=self._raw_circles,
-                                                                                                splines=self._raw_splines)
-        self._polylines = figures.get("lines", []) # type: ignore
-        self._arcs = figures.get("arcs", []) # type: ignore
-        self._circles = figures.get("circles", [])  # type: ignore
-        self._splines = figures.get("splines", []) # type: ignore
-
-        for line in self._polylines:
-            # print(f"Polyline with velocity: {self._params.polyline_velocity}")
-            line.set_velocity(self._params.polyline_velocity)
-
-        for arc in self._arcs:
-            arc.set_velocity(self._params.arc_velocity)
-
-        for circle in self._circles:
-            circle.set_velocity(self._params.circle_velocity)
+        converter = self._converter()
+
+        cache = self._figure_cache() if self._file_digest else None
+        key = FigureCache.key("converted", self._file_digest, self._conversion_parameters()) if cache else ""
+        entry = cache.load(key) if cache else None
+        loaded = FigureCache.read_entry(entry, lambda arrays: self._unpack_converted(arrays, converter) or True, key) if entry is not None else None
+
+        if loaded:
+            logging.info("Converted figures loaded from the cache.")
+        else:
+            self._table = converter.convert_table(self._raw_table)
+            self._splines = converter.convert_splines(self._raw_splines)
+            self._spline_points = FigureCache.pack_spline_points(self._splines)
+
+            if cache:
+                cache.save(key, {**FigureCache.pack_table(self._table, "converted"), **self._spline_points})
 
         # for spline in self._splines:
         #     spline.set_velocity(self._params.spline_velocity)
 
         self._converted = True
+        self._materialized = False
+
+    def get_figure_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        The parsed figures, and the converted ones if they are, as NumPy arrays (packed like the figure cache entries),
+        so another process can load them with load_figure_arrays instead of parsing the file again.
+        """
+        arrays = {**FigureCache.pack_table(self._raw_table, "raw"), **FigureCache.pack_splines(self._raw_splines)}
+
+        if self._converted:
+            arrays.update({**FigureCache.pack_table(self._table, "converted"), **self._spline_points})
+            arrays["conversion_parameters"] = np.array(json.dumps(self._conversion_parameters(), sort_keys=True))
+
+        if self._file_digest:
+            arrays["file_digest"] = np.array(self._file_digest)
+
+        return arrays
+
+    def load_figure_arrays(self, arrays: Dict[str, np.ndarray]):
+        """
+        Loads the figures of get_figure_arrays as if the file had been parsed. The converted figures are used if they
+        were converted with the same conversion parameters, otherwise the figures are converted again.
+        """
+        self._raw_table = FigureCache.unpack_table(arrays, "raw")
+        self._raw_splines = FigureCache.unpack_splines(arrays)
+        self._file_digest = str(arrays["file_digest"]) if "file_digest" in arrays else None
+        self._parsed = True
+
+        if "conversion_parameters" in arrays and str(arrays["conversion_parameters"]) == json.dumps(self._conversion_parameters(), sort_keys=True):
+            self._unpack_converted(arrays, self._converter())
+            self._converted = True
+            self._materialized = False
+        else:
+            self.convert_figures()
+
+    def _materialize_figures(self):
+        """
+        Builds the figure objects of the converted table, only done once and only when a caller needs the objects.
+        """
+        if self._materialized:
+            return
+
+        self._polylines = list(self._table.figures(FigureKind.LINE, velocity=self._params.polyline_velocity)) # type: ignore
+        self._arcs = list(self._table.figures(FigureKind.ARC, velocity=self._params.arc_velocity)) # type: ignore
+        self._circles = list(self._table.figures(FigureKind.CIRCLE, velocity=self._params.circle_velocity)) # type: ignore
+
+        self._materialized = True
 
     def get_raw_figures(self) -> dict:
         return {
-            "lines": self._raw_lines,
-            "arcs": self._raw_arcs,
-            "circles": self._raw_circles,
+            **self._raw_table.to_raw(),
             "splines": self._raw_splines
         }
+
+    def get_figure_table(self) -> FigureTable:
+        """
+        Returns the converted lines, arcs and circles in columnar form, without building the figure objects.
+        """
+        return self._table
     
     def get_figures(self) -> dict:
+        self._materialize_figures()
+
         return {
             "polylines": self._polylines,
             "arcs": self._arcs,
@@ -173,23 +360,113 @@ class Forger:
             "splines": self._splines
         }
 
-    def generate_rapid_code(self):
+    def _make_draw(self) -> Draw:
+        self._materialize_figures()
+
         draw = Draw(tool_name=self._params.tool_name,
                     velocity=self._params.global_velocity,
                     workspace_limits=self._params.workspace_limits,
                     origin=self._params.origin,
                     zero=self._params.zero,
-                    use_detector=self._params.use_intelligent_traces)
+                    use_detector=self._params.use_intelligent_traces,
+                    trace_mode=TraceMode(self._params.trace_mode),
+                    optimize_travel=self._params.optimize_travel,
+                    travel_time_budget=self._params.travel_time_budget,
+                    snap_tolerance=self._params.snap_tolerance,
+                    zone_tolerance=self._params.zone_tolerance,
+                    sharp_corner_angle=self._params.sharp_corner_angle,
+                    simplify_tolerance=self._params.simplify_tolerance,
+                    arc_merge_tolerance=self._params.arc_merge_tolerance,
+                    procedure_budget=self._params.procedure_budget,
+                    share_rob_targets=self._params.share_rob_targets,
+                    circle_velocity=self._params.circle_velocity)
+
+        # All figures are validated together so every figure out of the limits is reported at once, the table rows and
+        # the sampled spline points give the bounds in the order of the figures
+        draw.add_figures(self._polylines + self._arcs + self._circles + self._splines, bounds=self._figure_bounds()) # type: ignore
+
+        cache = self._figure_cache() if self._file_digest and self._params.use_intelligent_traces else None
+        key = FigureCache.key("traces", self._file_digest, self._trace_parameters()) if cache else ""
+        entry = cache.load(key) if cache else None
+
+        figures = FigureCache.read_entry(entry, FigureCache.unpack_figures, key) if entry is not None else None
+
+        if figures is not None:
+            draw.detected_figures = self._set_velocities(figures)
+            logging.info("Detected traces loaded from the cache.")
+
+        self._traces_key = key if cache and figures is None else None
+
+        return draw
+
+    def _figure_bounds(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per figure (minimum, maximum) of the converted table rows (lines, arcs, circles) followed by the splines, whose
+        down points are reduced by spline from the sampled points array. The lifting is added to the maximum Z.
+        """
+        minimum, maximum = self._table.bounds()
+
+        counts = self._spline_points["sampled_count"]
+        points = self._spline_points["sampled_points"]
 
-        draw.add_figures(self._polylines) # type: ignore
-        draw.add_figures(self._arcs) # type: ignore
-        draw.add_figures(self._circles) # type: ignore
-        draw.add_figures(self._splines) # type: ignore
+        if len(counts):
+            offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            spline_minimum = np.minimum.reduceat(points, offsets, axis=0)
+            spline_maximum = np.maximum.reduceat(points, offsets, axis=0)
+            spline_maximum[:, 2] += self._params.lifting
+
+            minimum = np.concatenate((minimum, spline_minimum))
+            maximum = np.concatenate((maximum, np.round(spline_maximum, self._params.float_precision)))
+
+        return minimum, maximum
+
+    def _set_velocities(self, figures: List[Figure]) -> List[Figure]:
+        """
+        Sets the velocity of every kind of figure like _materialize_figures does (splines keep their own).
+        """
+        for figure in figures:
+            if isinstance(figure, PolyLine):
+                figure.set_velocity(self._params.polyline_velocity)
+            elif isinstance(figure, Arc):
+                figure.set_velocity(self._params.arc_velocity)
+            elif isinstance(figure, Circle):
+                figure.set_velocity(self._params.circle_velocity)
+
+        return figures
+
+    def _save_traces(self, draw: Draw):
+        """
+        Saves the figures the detector found for the last draw, if they were not loaded from the cache.
+        """
+        cache = self._figure_cache()
+
+        if cache and self._traces_key and draw.detected_figures is not None:
+            cache.save(self._traces_key, FigureCache.pack_figures(draw.detected_figures))
+            self._traces_key = None
+
+    def generate_rapid_code(self):
+        draw = self._make_draw()
 
         self._rapid_code = draw.generate_rapid_code(use_offset=self._params.use_offset_programming)
+        self._cycle_time_report = draw.cycle_time_report
+        self._save_traces(draw)
+
+    def write_rapid_code(self, stream: TextIO):
+        """
+        Generates the RAPID code straight into a text stream, the program is never held in memory as a whole (so
+        get_rapid_code stays empty).
+        """
+        draw = self._make_draw()
+
+        draw.write_rapid_code(stream, use_offset=self._params.use_offset_programming)
+        self._cycle_time_report = draw.cycle_time_report
+        self._save_traces(draw)
 
     def get_rapid_code(self) -> str:
         return self._rapid_code
+
+    def get_cycle_time_report(self) -> Dict[str, float]:
+        return self._cycle_time_report
     
     def export_rapid_to_txt(self, save_path: str):
         if not self._rapid_code or self._rapid_code == "":
@@ -198,3 +475,27 @@ class Forger:
         with open(save_path, 'w') as file:
             file.write(self._rapid_code)
         print(f"RAPID code exported to {save_path}")
+
+    def export_rapid_modules(self, save_dir: str) -> List[str]:
+        """
+        Generates the RAPID code as separate modules (see Draw.write_rapid_modules) written to save_dir as
+        <module>.mod files. Returns the paths of the files, MainModule last.
+        """
+        os.makedirs(save_dir, exist_ok=True)
+
+        draw = self._make_draw()
+        modules = draw.write_rapid_modules(lambda module: open(os.path.join(save_dir, f"{module}.mod"), 'w'),
+                                           use_offset=self._params.use_offset_programming)
+        self._cycle_time_report = draw.cycle_time_report
+        self._save_traces(draw)
+
+        print(f"RAPID modules exported to {save_dir}")
+        return [os.path.join(save_dir, f"{module}.mod") for module in modules]
+
+    def export_rapid_streaming(self, save_path: str):
+        """
+        Generates the RAPID code and writes it to save_path as it is generated (see write_rapid_code).
+        """
+        with open(save_path, 'w') as file:
+            self.write_rapid_code(file)
+        print(f"RAPID code exported to {save_path}")
@@ -0,0 +1,366 @@
+"""
+On disk cache of the figures of a CAD file, so processing the same file again skips the steps whose inputs did not
+change.
+
+Entries are keyed by the content digest of the file plus the parameters the step depends on:
+- raw: the parsed figures (file only)
+- converted: the converted figures (pre scaling, origin, lifting, precision, spline sampling)
+- traces: the figures in drawing order found by the detector (conversion plus detector parameters)
+
+Every entry is a .npz file of NumPy arrays (read without pickle): the figure tables by column, the variable length
+spline data as flat arrays with their counts, and the detected figures as one row per figure (kind, name, flags, the
+geometry of its kind and its points as flat arrays). The keys include the version of this layout, so entries written by
+another version are never read. The least recently used entries are deleted when the cache grows over its size limit.
+
+The DXF files converted from DWG files are cached the same way (see DxfCache), by DWG content and converter version.
+"""
+from typing import Any, Callable, Dict, List, Tuple
+from RoboForger.fig_types import Point3D, RawSpline
+from RoboForger.drawing.figures import Arc, BSpline, Circle, Figure, FigureTable, PolyLine
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import numpy as np
+
+
+class DiskCache:
+    """
+    Folder of cache entries (files named by key) sharing a size limit, the least recently used entries (by modification
+    time, refreshed when an entry is read) are deleted above it. Entries are written in a temporary folder first and
+    renamed, so readers (other processes included) never see a partial entry.
+    """
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024, suffix: str = ""):
+        """
+        :param directory: Folder of the entries, created when needed. Caches of different suffixes can share it, the
+        size limit is for the whole folder.
+        :param max_bytes: Size of the entries kept.
+        :param suffix: Extension of the entry files.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+
+    @staticmethod
+    def file_digest(path: str, block_size: int = 1024 * 1024) -> str:
+        """
+        SHA-256 of the file content, read in blocks.
+        """
+        digest = hashlib.sha256()
+
+        with open(path, 'rb') as file:
+            while block := file.read(block_size):
+                digest.update(block)
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def key(stage: str, file_digest: str, parameters: Dict[str, Any]) -> str:
+        """
+        Entry name of a step of a file with the given parameters (the ones the step result depends on).
+        """
+        description = json.dumps({"stage": stage, "file": file_digest, "parameters": parameters}, sort_keys=True, default=str)
+        return f"{stage}-{hashlib.sha256(description.encode()).hexdigest()}"
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def find(self, key: str) -> str | None:
+        """
+        Path of the entry marked as just used, None if it is not in the cache.
+        """
+        path = self.path(key)
+
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+
+        return path
+
+    def write(self, key: str, produce: Callable[[str], None]) -> str:
+        """
+        Creates the entry with produce (given the path to write it at, in a temporary folder of the cache), evicts the
+        least recently used entries if the cache is over its size and returns the path of the entry.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+
+        with tempfile.TemporaryDirectory(dir=self.directory, suffix=".tmp") as temporary:
+            temporary_path = os.path.join(temporary, f"entry{self.suffix}")
+            produce(temporary_path)
+            os.replace(temporary_path, self.path(key))
+
+        self.evict()
+        return self.path(key)
+
+    def evict(self):
+        """
+        Deletes the least recently used entries until the cache size is at most max_bytes.
+        """
+        entries: List[Tuple[float, int, str]] = []
+
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+
+            # Entries being read can not be deleted on some systems, they are left for a later eviction
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+
+            total -= size
+            logging.info(f"Evicted cache entry {path}")
+
+
+class FigureCache(DiskCache):
+    """
+    Figures of the pipeline steps as .npz entries (see the module description).
+    """
+    # Version of the layout of the entries, changed whenever the arrays of an entry change
+    FORMAT_VERSION = 2
+
+    # Kind codes of the detected figures
+    _FIGURE_KINDS: Tuple[type, ...] = (PolyLine, Arc, Circle, BSpline)
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        super().__init__(directory, max_bytes, ".npz")
+
+    @staticmethod
+    def key(stage: str, file_digest: str, parameters: Dict[str, Any]) -> str:
+        return DiskCache.key(stage, file_digest, {"format": FigureCache.FORMAT_VERSION, **parameters})
+
+    def load(self, key: str) -> Dict[str, np.ndarray] | None:
+        """
+        Arrays of the entry, None if it is not in the cache (or can not be read).
+        """
+        path = self.find(key)
+        if path is None:
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                return {name: entry[name] for name in entry.files}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+    def save(self, key: str, arrays: Dict[str, np.ndarray]):
+        self.write(key, lambda path: np.savez(path, **arrays))
+
+    @staticmethod
+    def read_entry(arrays: Dict[str, np.ndarray], unpack: Callable[[Dict[str, np.ndarray]], Any], key: str) -> Any:
+        """
+        Unpacked entry, None (a cache miss) if its arrays are not the ones unpack expects.
+        """
+        try:
+            return unpack(arrays)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            logging.warning(f"Ignoring invalid cache entry {key}: {e}")
+            return None
+
+
+    @staticmethod
+    def pack_table(table: FigureTable, prefix: str) -> Dict[str, np.ndarray]:
+        arrays = {f"{prefix}_{name}": getattr(table, name) for name in FigureTable.__slots__}
+        arrays[f"{prefix}_lifting"] = np.array(table.lifting, dtype=float)
+        arrays[f"{prefix}_float_precision"] = np.array(table.float_precision, dtype=np.int64)
+        return arrays
+
+    @staticmethod
+    def unpack_table(arrays: Dict[str, np.ndarray], prefix: str) -> FigureTable:
+        columns = {name: arrays[f"{prefix}_{name}"] for name in FigureTable.__slots__}
+        columns["lifting"] = float(columns["lifting"])
+        columns["float_precision"] = int(columns["float_precision"])
+        return FigureTable(**columns)
+
+    @staticmethod
+    def pack_splines(splines: List[RawSpline]) -> Dict[str, np.ndarray]:
+        """
+        Raw splines as flat arrays, every list field as its values and the count per spline.
+        """
+        arrays = {
+            "spline_degree": np.array([spline['degree'] for spline in splines], dtype=np.int64),
+            "spline_closed": np.array([spline['closed'] for spline in splines], dtype=bool),
+        }
+
+        for field, width in (("knots", 1), ("weights", 1), ("control_points", 3), ("fit_points", 3)):
+            lists = [spline[field] for spline in splines]
+            values = np.array([item for items in lists for item in items], dtype=float).reshape(-1, width)
+
+            arrays[f"spline_{field}_count"] = np.array([len(items) for items in lists], dtype=np.int64)
+            arrays[f"spline_{field}"] = values[:, 0] if width == 1 else values
+
+        return arrays
+
+    @staticmethod
+    def unpack_splines(arrays: Dict[str, np.ndarray]) -> List[RawSpline]:
+        fields = {}
+
+        for field in ("knots", "weights", "control_points", "fit_points"):
+            counts = arrays[f"spline_{field}_count"]
+            values = np.split(arrays[f"spline_{field}"], np.cumsum(counts)[:-1]) if len(counts) else []
+            fields[field] = [[tuple(item) for item in value.tolist()] if value.ndim == 2 else value.tolist() for value in values]
+
+        return [{'degree': degree, 'closed': closed, 'knots': knots, 'weights': weights, 'control_points': control_points,
+                 'fit_points': fit_points}
+                for degree, closed, knots, weights, control_points, fit_points in zip(
+                    arrays["spline_degree"].tolist(), arrays["spline_closed"].tolist(), fields["knots"], fields["weights"],
+                    fields["control_points"], fields["fit_points"])]
+
+    @staticmethod
+    def pack_spline_points(splines: List[BSpline]) -> Dict[str, np.ndarray]:
+        """
+        Down points of converted splines, to build them again without sampling (see Converter.convert_spline).
+        """
+        points = [spline.get_points()[1:-1] for spline in splines]
+
+        return {"sampled_count": np.array([len(spline_points) for spline_points in points], dtype=np.int64),
+                "sampled_points": np.array([point for spline_points in points for point in spline_points], dtype=float).reshape(-1, 3)}
+
+    @staticmethod
+    def unpack_spline_points(arrays: Dict[str, np.ndarray]) -> List[List[Point3D]]:
+        counts = arrays["sampled_count"]
+        if not len(counts):
+            return []
+
+        return [[tuple(point) for point in spline_points.tolist()]
+                for spline_points in np.split(arrays["sampled_points"], np.cumsum(counts)[:-1])]
+
+    @staticmethod
+    def pack_figures(figures: List[Figure]) -> Dict[str, np.ndarray]:
+        """
+        Detected figures (merged, snapped and oriented by the detector) as one row per figure: kind, name, skip flags,
+        drawing parameters, points (lifted ones included) and the geometry of arcs and circles. The splines also keep
+        their raw data (see pack_splines) in their order.
+        """
+        kinds = FigureCache._FIGURE_KINDS
+        count = len(figures)
+
+        arrays = {
+            "figures_kind": np.array([kinds.index(type(figure)) for figure in figures], dtype=np.int8),
+            "figures_name": np.array([figure.name for figure in figures], dtype=str),
+            "figures_skip": np.array([(figure.skip_pre_down, figure.skip_end_lifting) for figure in figures], dtype=bool).reshape(-1, 2),
+            "figures_velocity": np.array([figure.velocity for figure in figures], dtype=np.int64),
+            "figures_lifting": np.array([figure.lifting for figure in figures], dtype=float),
+            "figures_float_precision": np.array([figure.float_precision for figure in figures], dtype=np.int64),
+            "figures_points_count": np.array([len(figure.get_points()) for figure in figures], dtype=np.int64),
+            "figures_points": np.array([point for figure in figures for point in figure.get_points()], dtype=float).reshape(-1, 3),
+            "figures_center": np.zeros((count, 3)),
+            "figures_radius": np.zeros(count),
+            "figures_angles": np.zeros((count, 3)),  # start, end and mid angles of arcs (radians)
+            "figures_clockwise": np.zeros(count, dtype=bool),
+            "figures_spline_tolerances": np.zeros((count, 2)),  # chord error and arc tolerance of splines
+        }
+
+        splines: List[RawSpline] = []
+
+        for i, figure in enumerate(figures):
+            if isinstance(figure, (Arc, Circle)):
+                arrays["figures_center"][i] = figure.center
+                arrays["figures_radius"][i] = figure.radius
+
+            if isinstance(figure, Arc):
+                arrays["figures_angles"][i] = (figure.start_angle, figure.end_angle, figure.mid_angle)
+                arrays["figures_clockwise"][i] = figure.clockwise
+            elif isinstance(figure, BSpline):
+                arrays["figures_spline_tolerances"][i] = (figure.chord_error, figure.arc_tolerance)
+                splines.append({'degree': figure.degree, 'closed': figure.closed, 'knots': figure.knots.tolist(),
+                                'weights': figure.weights.tolist() if figure.weights is not None else [],
+                                'control_points': [tuple(point) for point in figure.control_points.tolist()],
+                                'fit_points': list(figure.fit_points)})
+
+        arrays.update(FigureCache.pack_splines(splines))
+        return arrays
+
+    @staticmethod
+    def unpack_figures(arrays: Dict[str, np.ndarray]) -> List[Figure]:
+        """
+        Figures of pack_figures, in the state the detector left them.
+        """
+        counts = arrays["figures_points_count"]
+        points = np.split(arrays["figures_points"], np.cumsum(counts)[:-1]) if len(counts) else []
+        splines = iter(FigureCache.unpack_splines(arrays))
+
+        figures: List[Figure] = []
+
+        for i, kind in enumerate(arrays["figures_kind"].tolist()):
+            figure_class = FigureCache._FIGURE_KINDS[kind]
+            figure_points = [tuple(point) for point in points[i].tolist()]
+            name = str(arrays["figures_name"][i])
+            velocity = int(arrays["figures_velocity"][i])
+            lifting = float(arrays["figures_lifting"][i])
+            float_precision = int(arrays["figures_float_precision"][i])
+            center = tuple(arrays["figures_center"][i].tolist())
+            radius = float(arrays["figures_radius"][i])
+
+            if figure_class is PolyLine:
+                figure = PolyLine(name, figure_points[1:-1], lifting, velocity, float_precision)
+            elif figure_class is Arc:
+                start_angle, end_angle, mid_angle = arrays["figures_angles"][i].tolist()
+                figure = Arc(name, center, radius, np.degrees(start_angle), np.degrees(end_angle),
+                             bool(arrays["figures_clockwise"][i]), lifting, velocity, float_precision)
+                figure.start_angle, figure.end_angle, figure.mid_angle = start_angle, end_angle, mid_angle
+            elif figure_class is Circle:
+                figure = Circle(name, center, radius, lifting, velocity, float_precision)
+            else:
+                spline = next(splines)
+                chord_error, arc_tolerance = arrays["figures_spline_tolerances"][i].tolist()
+                figure = BSpline(name, spline['degree'], spline['closed'], spline['knots'], spline['weights'],
+                                 spline['control_points'], spline['fit_points'], lifting=lifting, velocity=velocity,
+                                 float_precision=float_precision, chord_error=chord_error, arc_tolerance=arc_tolerance,
+                                 points=figure_points[1:-1])
+
+            # The detector moved (snapping) and reversed the points
+            figure._points = figure_points
+            figure.set_skip_pre_down(bool(arrays["figures_skip"][i, 0]))
+            figure.set_skip_end_lifted(bool(arrays["figures_skip"][i, 1]))
+            figures.append(figure)
+
+        return figures
+
+
+class DxfCache(DiskCache):
+    """
+    DXF files converted from DWG files by LibreDWG dwg2dxf, keyed by the DWG content and the converter version, so a
+    DWG is converted once instead of every time it is parsed.
+    """
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        super().__init__(directory, max_bytes, ".dxf")
+
+    @staticmethod
+    def converter_version(tool_path: str) -> Dict[str, Any]:
+        """
+        Identifies the converter binary without running it: another build replaces the file (size and time change).
+        """
+        stat = os.stat(tool_path)
+        return {"path": os.path.realpath(tool_path), "size": stat.st_size, "modified": stat.st_mtime_ns}
+
+    def convert(self, dwg_path: str, tool_path: str, convert: Callable[[str, str, str], None]) -> str:
+        """
+        Path of the DXF version of the DWG, converted with convert(dwg path, tool path, output path) only if it is not
+        in the cache.
+        """
+        key = DiskCache.key("dxf", DiskCache.file_digest(dwg_path), DxfCache.converter_version(tool_path))
+
+        path = self.find(key)
+        if path is not None:
+            logging.info(f"DXF conversion of {dwg_path} loaded from the cache.")
+            return path
+
+        return self.write(key, lambda output_path: convert(dwg_path, tool_path, output_path))
@@ -1,10 +1,118 @@
 import ezdxf
+from ezdxf.addons import iterdxf
 import os
 import subprocess
 import io
 import tempfile
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Iterable
 from RoboForger.fig_types import Point3D, RawLine, RawArc, RawCircle, RawSpline
+from RoboForger.preprocessing.cache import DxfCache
+
+import numpy as np
+
+
+def raw_line(e) -> RawLine:
+    start = (e.dxf.start.x, e.dxf.start.y, getattr(e.dxf.start, 'z', 0.0))
+    end = (e.dxf.end.x, e.dxf.end.y, getattr(e.dxf.end, 'z', 0.0))
+    return {'start': start, 'end': end}
+
+def raw_circle(e) -> RawCircle:
+    center = (e.dxf.center.x, e.dxf.center.y, getattr(e.dxf.center, 'z', 0.0))
+    return {'center': center, 'radius': e.dxf.radius}
+
+def raw_arc(e) -> RawArc:
+    center = (e.dxf.center.x, e.dxf.center.y, getattr(e.dxf.center, 'z', 0.0))
+    return {'center': center, 'radius': e.dxf.radius, 'start_angle': e.dxf.start_angle, 'end_angle': e.dxf.end_angle, 'clockwise': False}
+
+def raw_spline(e) -> RawSpline:
+    return {
+        'degree': e.dxf.degree,
+        'closed': e.closed,
+        'knots': e.knots,
+        'weights': e.weights,
+        'control_points': [(pt[0], pt[1], 0.0) for pt in e.control_points],
+        'fit_points': [(pt[0], pt[1], 0.0) for pt in e.fit_points],
+    }
+
+# DXF type -> (key in the parsed figures dict, record builder)
+ENTITY_READERS = {
+    'LINE': ('lines', raw_line),
+    'ARC': ('arcs', raw_arc),
+    'CIRCLE': ('circles', raw_circle),
+    'SPLINE': ('splines', raw_spline),
+}
+
+
+class RowCollector:
+    """
+    Float rows written in place into a preallocated array, the array doubles its capacity when it gets full.
+    """
+    def __init__(self, width: int, capacity: int = 1024):
+        self._data = np.empty((max(capacity, 1), width), dtype=np.float64)
+        self._count = 0
+
+    def append(self, row: Tuple[float, ...]):
+        if self._count == len(self._data):
+            grown = np.empty((2 * len(self._data), self._data.shape[1]), dtype=np.float64)
+            grown[:self._count] = self._data
+            self._data = grown
+
+        self._data[self._count] = row
+        self._count += 1
+
+    def array(self) -> np.ndarray:
+        return self._data[:self._count]
+
+
+def collect_entities(entities: Iterable, capacity: int = 1024) -> Dict[str, Any]:
+    """
+    Single pass over the entities dispatching on their DXF type. Returns the figures in array form:
+    - lines: (N, 6) start xyz, end xyz
+    - arcs: (N, 6) center xyz, radius, start angle, end angle (degrees, counter clockwise)
+    - circles: (N, 4) center xyz, radius
+    - splines: list of RawSpline (variable length data)
+    """
+    lines = RowCollector(6, capacity)
+    arcs = RowCollector(6, capacity)
+    circles = RowCollector(4, capacity)
+    splines: List[RawSpline] = []
+
+    for e in entities:
+        dxftype = e.dxftype()
+
+        if dxftype == 'LINE':
+            start, end = e.dxf.start, e.dxf.end
+            lines.append((start.x, start.y, start.z, end.x, end.y, end.z))
+        elif dxftype == 'ARC':
+            center = e.dxf.center
+            arcs.append((center.x, center.y, center.z, e.dxf.radius, e.dxf.start_angle, e.dxf.end_angle))
+        elif dxftype == 'CIRCLE':
+            center = e.dxf.center
+            circles.append((center.x, center.y, center.z, e.dxf.radius))
+        elif dxftype == 'SPLINE':
+            splines.append(raw_spline(e))
+
+    return {
+        'lines': lines.array(),
+        'arcs': arcs.array(),
+        'circles': circles.array(),
+        'splines': splines,
+    }
+
+
+def parse_entities(entities: Iterable) -> Dict[str, Any]:
+    """
+    Single pass over the entities dispatching on their DXF type, returns the raw figure records grouped by kind.
+    """
+    figures: Dict[str, List[Any]] = {kind: [] for kind, _ in ENTITY_READERS.values()}
+
+    for e in entities:
+        reader = ENTITY_READERS.get(e.dxftype())
+        if reader is not None:
+            kind, read = reader
+            figures[kind].append(read(e))
+
+    return figures
 
 
 class DXFParser:
@@ -26,68 +134,90 @@ class DXFParser:
         return f"File: {file_path} could not be loaded"
 
     def get_lines(self) -> List[RawLine]:
-        lines = []
-        for e in self._msp.query('LINE'):
-            start = (e.dxf.start.x, e.dxf.start.y, getattr(e.dxf.start, 'z', 0.0))
-            end = (e.dxf.end.x, e.dxf.end.y, getattr(e.dxf.end, 'z', 0.0))
-            lines.append({'start': start, 'end': end})
-        return lines
+        return [raw_line(e) for e in self._msp.query('LINE')]
 
     def get_circles(self) -> List[RawCircle]:
-        circles = []
-        for e in self._msp.query('CIRCLE'):
-            center = (e.dxf.center.x, e.dxf.center.y, getattr(e.dxf.center, 'z', 0.0))
-            radius = e.dxf.radius
-            circles.append({'center': center, 'radius': radius})
-        return circles
+        return [raw_circle(e) for e in self._msp.query('CIRCLE')]
 
     def get_arcs(self) -> List[RawArc]:
         """
         Returns a list of arcs represented by:
         (center, radius, start_point, end_point, start_angle, end_angle, clockwise)
         """
-        arcs = []
-        for e in self._msp.query('ARC'):
-            center = (e.dxf.center.x, e.dxf.center.y, getattr(e.dxf.center, 'z', 0.0))
-            radius = e.dxf.radius
-
-            start_angle = e.dxf.start_angle
-            end_angle = e.dxf.end_angle
-
-            arcs.append({'center': center, 'radius': radius, 'start_angle': start_angle, 'end_angle': end_angle, 'clockwise': False})
-        return arcs
+        return [raw_arc(e) for e in self._msp.query('ARC')]
 
     def get_splines(self) -> List[RawSpline]:
         """
         Returns a list of splines represented by
         """
-        splines = []
-        for e in self._msp.query('SPLINE'):
-            # just for testing if it works
-            # print(f"Spline: {e} - Degree: {e.dxf.degree} - Closed: {e.closed}. Control points{len(e.control_points)}: {e.control_points}. Weights: {e.weights}. Knots: {e.knots}. Fit points: {e.fit_points}")
-            splines.append(
-                {
-                    'degree': e.dxf.degree,
-                    'closed': e.closed,
-                    'knots': e.knots,
-                    'weights': e.weights,
-                    'control_points': [(pt[0], pt[1], 0.0) for pt in e.control_points],
-                    'fit_points': [(pt[0], pt[1], 0.0) for pt in e.fit_points],
-                }
-            )
-        return splines
+        # just for testing if it works
+        # print(f"Spline: {e} - Degree: {e.dxf.degree} - Closed: {e.closed}. Control points{len(e.control_points)}: {e.control_points}. Weights: {e.weights}. Knots: {e.knots}. Fit points: {e.fit_points}")
+        return [raw_spline(e) for e in self._msp.query('SPLINE')]
+
+    def get_figures_arrays(self) -> Dict[str, Any]:
+        """
+        Returns all figures of the modelspace in array form (see collect_entities), walking the modelspace once.
+        """
+        return collect_entities(self._msp, capacity=len(self._msp))
 
     def get_figures_parsed(self) -> Dict[str, Any]:
         """
         Returns a dictionary with all figures parsed from the DXF file.
         """
-        return {
-            'lines': self.get_lines(),
-            'arcs': self.get_arcs(),
-            'circles': self.get_circles(),
-            'splines': self.get_splines()
-        }
-    
+        return parse_entities(self._msp)
+
+
+class StreamingDXFParser:
+    """
+    Reads the entities straight from the modelspace section of a DXF file on disk (ezdxf iterdxf add-on), one entity
+    at a time. The document object model (blocks, layouts, objects...) is never built, so the peak memory does not
+    grow with the file size, only with the figures we keep.
+    """
+    def __init__(self, file_path: str):
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"DXF file not found: {file_path}")
+
+        self.file_path = file_path
+
+    def get_figures_arrays(self) -> Dict[str, Any]:
+        try:
+            return collect_entities(iterdxf.modelspace(self.file_path, types=ENTITY_READERS.keys()))
+        except ezdxf.DXFStructureError as e:
+            raise ValueError(f"Failed to stream DXF content using ezdxf: {e}")
+
+    def get_figures_parsed(self) -> Dict[str, Any]:
+        try:
+            return parse_entities(iterdxf.modelspace(self.file_path, types=ENTITY_READERS.keys()))
+        except ezdxf.DXFStructureError as e:
+            raise ValueError(f"Failed to stream DXF content using ezdxf: {e}")
+
+
+def run_dwg2dxf(dwg_filepath: str, tool_path: str, output_path: str):
+    """
+    Runs LibreDWG's dwg2dxf to write the DXF version of dwg_filepath at output_path.
+    """
+    # LibreDWG dwg2dxf syntax:
+    # dwg2dxf input.dwg -o output.dxf
+    cmd = [
+        tool_path,
+        dwg_filepath,
+        "-o",
+        output_path,
+        "--as=r2018"
+    ]
+
+    result = subprocess.run(cmd, capture_output=True, text=True)
+
+    print(f"DWG to DXF conversion stdout:\n{result.stdout}")
+
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"DWG to DXF conversion failed:\n{result.stderr}"
+        )
+
+    if not os.path.exists(output_path):
+        raise RuntimeError("Conversion completed but DXF file not created.")
+
 def dwg_to_dxf(dwg_filepath: str, tool_path: str) -> str:
     """
     Converts DWG to DXF using LibreDWG's dwg2dxf tool.
@@ -109,27 +239,7 @@ def dwg_to_dxf(dwg_filepath: str, tool_path: str) -> str:
             base_name = os.path.splitext(os.path.basename(dwg_filepath))[0]
             output_path = os.path.join(tmpdir, base_name + ".dxf")
 
-            # LibreDWG dwg2dxf syntax:
-            # dwg2dxf input.dwg -o output.dxf
-            cmd = [
-                tool_path,
-                dwg_filepath,
-                "-o",
-                output_path,
-                "--as=r2018"
-            ]
-
-            result = subprocess.run(cmd, capture_output=True, text=True)
-
-            print(f"DWG to DXF conversion stdout:\n{result.stdout}")
-
-            if result.returncode != 0:
-                raise RuntimeError(
-                    f"DWG to DXF conversion failed:\n{result.stderr}"
-                )
-
-            if not os.path.exists(output_path):
-                raise RuntimeError("Conversion completed but DXF file not created.")
+            run_dwg2dxf(dwg_filepath, tool_path, output_path)
 
             # Read DXF content
             with open(output_path, "r", encoding="utf-8", errors="ignore") as f:
@@ -138,17 +248,48 @@ def dwg_to_dxf(dwg_filepath: str, tool_path: str) -> str:
         raise RuntimeError(f"Error during DWG to DXF conversion: {e}")
 
 class CADParser:
-    def __init__(self, filepath: str, binary_dwg2dxf_path: str, temp_dir: str = "temp"):
+    def __init__(self, filepath: str, binary_dwg2dxf_path: str, temp_dir: str = "temp", streaming: bool = False,
+                 dxf_cache: DxfCache | None = None):
+        """
+        :param streaming: If True the entities are streamed from the file (StreamingDXFParser) instead of loading the
+        whole DXF document in memory. DWG files are converted to a temporary DXF file that lives as long as the parser.
+        :param dxf_cache: If given DWG files are converted once and their DXF file is read from the cache afterwards.
+        """
         self.filepath = filepath
         self.parser = None
         self.binary_path = binary_dwg2dxf_path
         self.temp_dir = temp_dir
+        self.streaming = streaming
+        self._dxf_tmpdir: tempfile.TemporaryDirectory | None = None
 
         if not os.path.exists(self.binary_path):
             raise FileNotFoundError(f"CADPARSER::DWG to DXF converter not found at {self.binary_path}")
 
         file_ext = os.path.splitext(filepath)[1].lower()
-        if file_ext == '.dxf':
+
+        if dxf_cache is not None and file_ext == '.dwg':
+            # The converted file stays in the cache, it is read like the one dwg_to_dxf converts
+            try:
+                output_path = dxf_cache.convert(filepath, self.binary_path, run_dwg2dxf)
+            except Exception as e:
+                raise RuntimeError(f"Error during DWG to DXF conversion: {e}")
+
+            if streaming:
+                self.parser = StreamingDXFParser(output_path)
+            else:
+                with open(output_path, "r", encoding="utf-8", errors="ignore") as f:
+                    self.parser = DXFParser(io.StringIO(f.read()))
+        elif streaming and file_ext == '.dxf':
+            self.parser = StreamingDXFParser(filepath)
+        elif streaming and file_ext == '.dwg':
+            self._dxf_tmpdir = tempfile.TemporaryDirectory()
+            output_path = os.path.join(self._dxf_tmpdir.name, os.path.splitext(os.path.basename(filepath))[0] + ".dxf")
+            try:
+                run_dwg2dxf(filepath, self.binary_path, output_path)
+            except Exception as e:
+                raise RuntimeError(f"Error during DWG to DXF conversion: {e}")
+            self.parser = StreamingDXFParser(output_path)
+        elif file_ext == '.dxf':
             stream = io.StringIO()
             with open(filepath, 'r') as f:
                 stream.write(f.read())
@@ -177,5 +318,11 @@ class CADParser:
     def get_figures_parsed(self) -> Dict[str, Any]:
         if self.parser:
             return self.parser.get_figures_parsed()
+        else:
+            raise ValueError("No parser available for the given file.")
+
+    def get_figures_arrays(self) -> Dict[str, Any]:
+        if self.parser:
+            return self.parser.get_figures_arrays()
         else:
             raise ValueError("No parser available for the given file.")
\ No newline at end of file
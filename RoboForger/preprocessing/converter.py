@@ -1,23 +1,34 @@
 """
 This module converts CAD objects to RoboForger objects.
 """
-from typing import List, Any, Dict
+from typing import List, Any, Dict, Iterable, Tuple
 from RoboForger.fig_types import Point3D, RawLine, RawCircle, RawArc, RawSpline
-from RoboForger.drawing.figures import PolyLine, Arc, Circle, Figure, BSpline
-from math import cos, sin, radians, pi, degrees
+from RoboForger.drawing.figures import PolyLine, Arc, Circle, Figure, BSpline, FigureTable
+from math import cos, sin, radians, pi, degrees, ceil
 from RoboForger.utils import real_coord2robo_coord
+from concurrent.futures import ProcessPoolExecutor
 import logging
 
+import numpy as np
+
 class Converter:
     """
     Converter takes the raw figures and converts them into roboforger figures (initializing the figure objects). Converter only needs the figure points,
     the code is able to change values like velocity later.
     """
-    def __init__(self, float_precision: int = 4, pre_scale: float = 1.0, lifting: float = 50.0, origin: Point3D = (450.0, 0, 450.0)):
+    def __init__(self, float_precision: int = 4, pre_scale: float = 1.0, lifting: float = 50.0, origin: Point3D = (450.0, 0, 450.0),
+                 spline_chord_error: float = 0.0, spline_arc_tolerance: float = 0.0, workers: int = 0):
+        """
+        :param workers: Processes sampling the splines in parallel (see convert_splines), 0 or 1 converts them in this
+        process.
+        """
         self.float_precision = float_precision
         self.lifting = lifting
         self.origin = origin
         self.pre_scale = pre_scale
+        self.spline_chord_error = spline_chord_error  # 0 keeps the uniform spline sampling
+        self.spline_arc_tolerance = spline_arc_tolerance  # 0 keeps one MoveL per spline point
+        self.workers = workers
 
     def apply_pre_scaling(self, point: Point3D) -> Point3D:
         """
@@ -27,66 +38,98 @@ class Converter:
         # To robo coordinates the figures are moved down by lifting value relative to the origin used
         return (x * self.pre_scale, y * self.pre_scale, -self.lifting)
 
-    def convert_lines_to_polylines(self, lines: List[RawLine]) -> List[PolyLine]:
-        polylines = []
-        for i, line in enumerate(lines):
-            # First apply pre scaling
-            start = self.apply_pre_scaling(line['start'])
-            end = self.apply_pre_scaling(line['end'])
-            robo_coords = [real_coord2robo_coord(start, self.origin), real_coord2robo_coord(end, self.origin)]
-            # print(f"Robo coords generated: {robo_coords}")
-            pl = PolyLine(f"Line{i}", robo_coords, lifting=self.lifting, velocity=1000, float_precision=self.float_precision)
-            polylines.append(pl)
-        return polylines
-
-    def convert_circles(self, circles: List[RawCircle]) -> List[Circle]:
-        circle_figs = []
-        for i, circle in enumerate(circles):
-            center = self.apply_pre_scaling(circle['center'])
-            radius = circle['radius'] * self.pre_scale  
-            c = Circle(f"Circle{i}", real_coord2robo_coord(center, self.origin), radius, lifting=self.lifting, float_precision=self.float_precision)
-            circle_figs.append(c)
-        return circle_figs
-
-    def convert_arcs(self, arcs: List[RawArc]) -> List[Arc]:
-        arc_figs = []
-        for i, arc  in enumerate(arcs):
-            center = self.apply_pre_scaling(arc["center"])
-            radius = arc["radius"] * self.pre_scale
-            start_angle = arc["start_angle"]
-            end_angle = arc["end_angle"]
-
-            print(f"Converting arc center: {center} to {real_coord2robo_coord(center, self.origin)}")
-
-            arc_figs.append(Arc(f"Arc{i}",
-                                         center=real_coord2robo_coord(center, self.origin),
-                                         radius=radius,
-                                         start_angle=start_angle,
-                                         end_angle=end_angle,
-                                         clockwise=arc["clockwise"],
-                                         lifting=self.lifting,
-                                         float_precision=self.float_precision))
-
-        return arc_figs
-
-    def convert_splines(self, splines: List[RawSpline]) -> List[BSpline]:
-
-        spline_figs = []
-        for i, spline in enumerate(splines):
-            control_points = [self.apply_pre_scaling(pt) for pt in spline['control_points']]
-            fit_points = [self.apply_pre_scaling(pt) for pt in spline['fit_points']]
-            spline_figs.append(BSpline(f"Spline{i}",
-                                      degree=spline['degree'],
-                                      closed=spline['closed'],
-                                      knots=spline['knots'],
-                                      weights=spline['weights'],
-                                      control_points=[real_coord2robo_coord(pt, self.origin) for pt in control_points],
-                                      fit_points=[real_coord2robo_coord(pt, self.origin) for pt in fit_points],
-                                      interpolation_precision=0.1,
-                                      lifting=self.lifting,
-                                      velocity=1000,
-                                      float_precision=self.float_precision))
-        return spline_figs
+    def convert_line(self, i: int, line: RawLine) -> PolyLine:
+        # First apply pre scaling
+        start = self.apply_pre_scaling(line['start'])
+        end = self.apply_pre_scaling(line['end'])
+        robo_coords = [real_coord2robo_coord(start, self.origin), real_coord2robo_coord(end, self.origin)]
+        # print(f"Robo coords generated: {robo_coords}")
+        return PolyLine(f"Line{i}", robo_coords, lifting=self.lifting, velocity=1000, float_precision=self.float_precision)
+
+    def convert_circle(self, i: int, circle: RawCircle) -> Circle:
+        center = self.apply_pre_scaling(circle['center'])
+        radius = circle['radius'] * self.pre_scale
+        return Circle(f"Circle{i}", real_coord2robo_coord(center, self.origin), radius, lifting=self.lifting, float_precision=self.float_precision)
+
+    def convert_arc(self, i: int, arc: RawArc) -> Arc:
+        center = self.apply_pre_scaling(arc["center"])
+        radius = arc["radius"] * self.pre_scale
+        start_angle = arc["start_angle"]
+        end_angle = arc["end_angle"]
+
+        print(f"Converting arc center: {center} to {real_coord2robo_coord(center, self.origin)}")
+
+        return Arc(f"Arc{i}",
+                   center=real_coord2robo_coord(center, self.origin),
+                   radius=radius,
+                   start_angle=start_angle,
+                   end_angle=end_angle,
+                   clockwise=arc["clockwise"],
+                   lifting=self.lifting,
+                   float_precision=self.float_precision)
+
+    def convert_spline(self, i: int, spline: RawSpline, points: List[Point3D] | None = None) -> BSpline:
+        control_points = [self.apply_pre_scaling(pt) for pt in spline['control_points']]
+        fit_points = [self.apply_pre_scaling(pt) for pt in spline['fit_points']]
+        return BSpline(f"Spline{i}",
+                       degree=spline['degree'],
+                       closed=spline['closed'],
+                       knots=spline['knots'],
+                       weights=spline['weights'],
+                       control_points=[real_coord2robo_coord(pt, self.origin) for pt in control_points],
+                       fit_points=[real_coord2robo_coord(pt, self.origin) for pt in fit_points],
+                       interpolation_precision=0.1,
+                       lifting=self.lifting,
+                       velocity=1000,
+                       float_precision=self.float_precision,
+                       chord_error=self.spline_chord_error,
+                       arc_tolerance=self.spline_arc_tolerance,
+                       points=points)
+
+    def convert_lines_to_polylines(self, lines: Iterable[RawLine]) -> List[PolyLine]:
+        return [self.convert_line(i, line) for i, line in enumerate(lines)]
+
+    def convert_circles(self, circles: Iterable[RawCircle]) -> List[Circle]:
+        return [self.convert_circle(i, circle) for i, circle in enumerate(circles)]
+
+    def convert_arcs(self, arcs: Iterable[RawArc]) -> List[Arc]:
+        return [self.convert_arc(i, arc) for i, arc in enumerate(arcs)]
+
+    def convert_splines(self, splines: Iterable[RawSpline]) -> List[BSpline]:
+        """
+        Converts the splines, sampling them in parallel when workers > 1: the list is split in consecutive chunks, every
+        process samples the splines of a chunk and sends back their points as two arrays (points per spline and all
+        the points), and the splines are built here from those points in the original order. The points are the ones
+        the serial conversion samples, so both give the same splines.
+        """
+        splines = list(splines)
+
+        if self.workers <= 1 or len(splines) < 2:
+            return [self.convert_spline(i, spline) for i, spline in enumerate(splines)]
+
+        chunk_size = ceil(len(splines) / (self.workers * 4))
+        chunks = [splines[start:start + chunk_size] for start in range(0, len(splines), chunk_size)]
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            sampled = list(executor.map(_sample_splines, [self] * len(chunks), range(0, len(splines), chunk_size), chunks))
+
+        converted: List[BSpline] = []
+
+        for counts, points in sampled:
+            for spline_points in np.split(points, np.cumsum(counts)[:-1]):
+                index = len(converted)
+                converted.append(self.convert_spline(index, splines[index], [tuple(point) for point in spline_points.tolist()]))
+
+        logging.info(f"Converted {len(splines)} splines in {len(chunks)} chunks with {self.workers} processes.")
+
+        return converted
+
+    def convert_table(self, table: FigureTable) -> FigureTable:
+        """
+        Converts the lines, arcs and circles of a FigureTable all at once (same pre scaling and origin translation as
+        the per figure conversion), the figure objects are materialized later with FigureTable.figures.
+        """
+        return table.transform(self.pre_scale, self.lifting, self.origin, self.float_precision)
 
     def convert_figures(self, lines: List[RawLine], arcs: List[RawArc], circles: List[RawCircle], splines: List[RawSpline]) -> Dict[str, List[PolyLine | Arc | Circle | BSpline]]:
         """
@@ -97,4 +140,20 @@ class Converter:
                    "circles": self.convert_circles(circles),
                    "splines": self.convert_splines(splines)}
         
-        return figures
\ No newline at end of file
+        return figures
+
+
+def _sample_splines(converter: Converter, first_index: int, splines: List[RawSpline]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Process pool task of Converter.convert_splines: samples the splines and returns the number of points of every
+    spline (S,) and their points (N, 3), the down points of the converted splines (already rounded).
+    """
+    counts: List[int] = []
+    points: List[Point3D] = []
+
+    for i, spline in enumerate(splines):
+        spline_points = converter.convert_spline(first_index + i, spline).get_points()[1:-1]
+        counts.append(len(spline_points))
+        points.extend(spline_points)
+
+    return np.array(counts, dtype=np.int64), np.array(points, dtype=float).reshape(-1, 3)
@@ -0,0 +1,7 @@
+"""
+Timing benchmarks of RoboForger, kept out of the test suite (tests/ holds the assertions). Every module registers its
+benchmarks with common.benchmark and all of them run through one entry point, from the repository root:
+
+    python -m benchmarks --help
+    python -m benchmarks traces --sizes 1000 10000
+"""
@@ -0,0 +1,28 @@
+import argparse
+import importlib
+import pkgutil
+
+import benchmarks
+from benchmarks.common import BENCHMARKS
+
+
+def main():
+    for module in pkgutil.iter_modules(benchmarks.__path__):
+        if not module.name.startswith("_") and module.name != "common":
+            importlib.import_module(f"benchmarks.{module.name}")
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run a RoboForger benchmark.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True, metavar="benchmark")
+
+    for name in sorted(BENCHMARKS):
+        entry = BENCHMARKS[name]
+        subparser = subparsers.add_parser(name, help=entry.description, description=entry.description)
+        for argument, options in entry.arguments.items():
+            subparser.add_argument(f"--{argument.replace('_', '-')}", **options)
+
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark].function(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Spline arc fitting: the move instructions of sampled random walk splines (uniform dense sampling and chord error
+adaptive sampling) drawn with one MoveL per point against the arcs (MoveC) and lines drawing.arc_fitting fits to them.
+Every sampled point is checked to be within the tolerance of the fitted path.
+"""
+from typing import List
+
+import numpy as np
+
+from RoboForger.drawing.arc_fitting import fit_arcs, FittedSegment, SegmentKind
+from RoboForger.drawing.figures import BSpline
+
+from benchmarks.common import benchmark, timed
+
+
+def make_spline(rng: np.random.Generator, control_count: int, degree: int, chord_error: float, interpolation_precision: float) -> BSpline:
+    steps = rng.uniform(-10, 10, size=(control_count, 3))
+    steps[:, 2] = 0.0
+    interior = np.linspace(0, 1, control_count - degree + 1)[1:-1].tolist()
+    knots = [0.0] * (degree + 1) + interior + [1.0] * (degree + 1)
+
+    return BSpline("Spline", degree=degree, closed=False, knots=knots, weights=[],
+                   control_points=[tuple(point) for point in np.cumsum(steps, axis=0)], fit_points=[],
+                   interpolation_precision=interpolation_precision, lifting=50, float_precision=4, chord_error=chord_error)
+
+
+def circle_through(a: np.ndarray, b: np.ndarray, c: np.ndarray):
+    ab, ac = b - a, c - a
+    cross = ab[0] * ac[1] - ab[1] * ac[0]
+    center = a + np.array([ac[1] * (ab @ ab) - ab[1] * (ac @ ac), ab[0] * (ac @ ac) - ac[0] * (ab @ ab)]) / (2 * cross)
+    return center, np.linalg.norm(a - center)
+
+
+def path_distance(points: np.ndarray, start: np.ndarray, segments: List[FittedSegment]) -> np.ndarray:
+    """
+    Distance of every point to the closest fitted segment.
+    """
+    distances = np.full(len(points), np.inf)
+
+    for segment in segments:
+        end = np.array(segment.end[:2])
+        chord = end - start
+
+        if segment.kind == SegmentKind.ARC:
+            center, radius = circle_through(start, np.array(segment.mid[:2]), end)
+
+            # Only the points between the segment ends (projected on the chord) belong to this arc
+            along = (points - start) @ chord / (chord @ chord)
+            distance = np.where((along >= 0) & (along <= 1), np.abs(np.linalg.norm(points - center, axis=1) - radius),
+                                np.minimum(np.linalg.norm(points - start, axis=1), np.linalg.norm(points - end, axis=1)))
+        else:
+            along = np.clip((points - start) @ chord / max(chord @ chord, 1e-18), 0.0, 1.0)
+            distance = np.linalg.norm(points - (start + along[:, None] * chord), axis=1)
+
+        distances = np.minimum(distances, distance)
+        start = end
+
+    return distances
+
+
+@benchmark("arc_fitting", "Spline move instructions, MoveL per sampled point against fitted arcs and lines.",
+           control_points={"type": int, "nargs": "+", "default": [10, 50, 200]},
+           splines={"type": int, "default": 20},
+           tolerance={"type": float, "default": 0.1})
+def run(args):
+    rng = np.random.default_rng(0)
+
+    print(f"{'sampling':>9} {'controls':>9} {'MoveL':>8} {'fitted':>8} {'reduction':>10} {'max dev':>8} {'fit (s)':>8}")
+
+    for sampling, chord_error, interpolation_precision in (("uniform", 0.0, 100.0), ("adaptive", 0.05, 10.0)):
+        for control_count in args.control_points:
+            moves_l, fitted, deviation, fit_time = 0, 0, 0.0, 0.0
+
+            for _ in range(args.splines):
+                points = np.array(make_spline(rng, control_count, 3, chord_error, interpolation_precision).get_all_points())
+
+                segments, elapsed = timed(fit_arcs, points.tolist(), args.tolerance)
+                fit_time += elapsed
+
+                moves_l += len(points)
+                fitted += 1 + len(segments)
+                deviation = max(deviation, float(path_distance(points[:, :2], points[0, :2], segments).max()))
+
+            assert deviation <= args.tolerance + 1e-6, f"Fitted path deviates {deviation} from the samples"
+            print(f"{sampling:>9} {control_count:>9} {moves_l:>8} {fitted:>8} {moves_l / fitted:>9.1f}x {deviation:>8.4f} {fit_time:>8.3f}")
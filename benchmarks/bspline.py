@@ -0,0 +1,131 @@
+"""
+BSpline sampling: the batched basis functions (cached per knots, degree, control points and samples) against De Boor's
+algorithm one parameter at a time, on random clamped B-Splines and NURBS, cold (new knot vectors) and warm (same knot
+vectors, other control points). Also the uniform sampling against the chord error adaptive sampling, asked for the
+chord error the uniform sampling reached, by the points both need.
+"""
+from typing import List
+
+import numpy as np
+
+from RoboForger.drawing.figures import BSpline
+
+from benchmarks.common import benchmark, timed
+
+
+def de_boor(knots: np.ndarray, degree: int, ctrl_h: np.ndarray, t_values: np.ndarray) -> np.ndarray:
+    """
+    Previous implementation of BSpline._evaluate_spline, kept here as the baseline.
+    """
+    n = len(ctrl_h) - 1
+    p = degree
+    result_points = []
+
+    for t in t_values:
+        k = np.searchsorted(knots, t, side='right') - 1
+        k = np.clip(k, p, n)
+
+        d = ctrl_h[k - p : k + 1].copy()
+
+        for r in range(1, p + 1):
+            for j in range(p, r - 1, -1):
+                denom = knots[j + k - r + 1] - knots[j + k - p]
+                alpha = (t - knots[j + k - p]) / denom if denom != 0 else 0.0
+                d[j] = (1.0 - alpha) * d[j - 1] + alpha * d[j]
+
+        final_val = d[p]
+        result_points.append(final_val[:3] / final_val[3] if ctrl_h.shape[1] == 4 else final_val)
+
+    return np.array(result_points)
+
+
+def make_knots(rng: np.random.Generator, control_count: int, degree: int) -> List[float]:
+    """
+    Clamped knot vector with random interior knots.
+    """
+    interior = np.sort(rng.uniform(0, 1, control_count - degree - 1))
+    return [0.0] * (degree + 1) + interior.tolist() + [1.0] * (degree + 1)
+
+
+def make_spline(rng: np.random.Generator, knots: List[float], control_count: int, degree: int, rational: bool) -> BSpline:
+    # Planar random walk, like the smooth curves of a drawing
+    steps = rng.uniform(-10, 10, size=(control_count, 3))
+    steps[:, 2] = 0.0
+    control_points = [tuple(point) for point in np.cumsum(steps, axis=0)]
+    weights = rng.uniform(0.5, 2.0, control_count).tolist() if rational else []
+    return BSpline("Spline", degree=degree, closed=False, knots=knots, weights=weights, control_points=control_points,
+                   fit_points=[], interpolation_precision=10, lifting=50, float_precision=4)
+
+
+def random_splines(rng: np.random.Generator, count: int, control_count: int, degree: int) -> List[BSpline]:
+    # Every other spline is a NURBS
+    return [make_spline(rng, make_knots(rng, control_count, degree), control_count, degree, rational=i % 2 == 1)
+            for i in range(count)]
+
+
+SPLINE_ARGUMENTS = {
+    "control_points": {"type": int, "nargs": "+", "default": [10, 50, 200]},
+    "splines": {"type": int, "default": 50},
+    "degree": {"type": int, "default": 3},
+}
+
+
+@benchmark("bspline", "BSpline evaluation, cached basis functions against De Boor.", **SPLINE_ARGUMENTS)
+def run_evaluation(args):
+    rng = np.random.default_rng(0)
+
+    print(f"{'controls':>9} {'samples':>8} {'de boor (s)':>12} {'cold (s)':>9} {'warm (s)':>9} {'max error':>10}")
+
+    for control_count in args.control_points:
+        splines = random_splines(rng, args.splines, control_count, args.degree)
+        samples = splines[0].num_points
+
+        expected, de_boor_time = timed(lambda: [
+            de_boor(spline.knots, spline.degree, spline._homogeneous_control_points(),
+                    np.linspace(spline.knots[spline.degree], spline.knots[-spline.degree - 1], spline.num_points))
+            for spline in splines])
+
+        BSpline.uniform_basis.cache_clear()
+        cold, cold_time = timed(lambda: [spline.get_all_points() for spline in splines])
+        warm, warm_time = timed(lambda: [spline.get_all_points() for spline in splines])
+
+        assert cold == warm
+        error = max(np.abs(np.array(points) - reference).max() for points, reference in zip(cold, expected))
+
+        print(f"{control_count:>9} {samples:>8} {de_boor_time:>12.3f} {cold_time:>9.3f} {warm_time:>9.3f} {error:>10.1e}")
+
+
+def max_chord_error(spline: BSpline, t_values: np.ndarray, dense: int = 20_000) -> float:
+    """
+    Largest distance between the spline (densely evaluated) and the segments joining the points of t_values.
+    """
+    dense_t = np.linspace(t_values[0], t_values[-1], dense)
+    samples = spline._evaluate_spline(t_values)
+    segment = np.clip(np.searchsorted(t_values, dense_t, side='right') - 1, 0, len(t_values) - 2)
+
+    return float(BSpline._segment_distance(spline._evaluate_spline(dense_t), samples[segment], samples[segment + 1]).max())
+
+
+@benchmark("spline_sampling", "Spline points, uniform against chord error adaptive sampling.", **SPLINE_ARGUMENTS)
+def run_sampling(args):
+    rng = np.random.default_rng(0)
+
+    print(f"{'controls':>9} {'uniform pts':>12} {'adaptive pts':>13} {'uniform err':>12} {'adaptive err':>13} {'adaptive (s)':>13}")
+
+    for control_count in args.control_points:
+        uniform_points, adaptive_points, uniform_errors, adaptive_errors, adaptive_time = 0, 0, [], [], 0.0
+
+        for spline in random_splines(rng, args.splines, control_count, args.degree):
+            uniform_t = np.linspace(spline.knots[spline.degree], spline.knots[-spline.degree - 1], spline.num_points)
+            uniform_error = max_chord_error(spline, uniform_t)
+
+            adaptive_t, elapsed = timed(spline.adaptive_parameters, uniform_error)
+            adaptive_errors.append(max_chord_error(spline, adaptive_t))
+            uniform_errors.append(uniform_error)
+
+            uniform_points += len(uniform_t)
+            adaptive_points += len(adaptive_t)
+            adaptive_time += elapsed
+
+        print(f"{control_count:>9} {uniform_points:>12} {adaptive_points:>13} {max(uniform_errors):>12.4f} "
+              f"{max(adaptive_errors):>13.4f} {adaptive_time:>13.3f}")
@@ -0,0 +1,78 @@
+"""
+Registry of the benchmarks and the helpers they share.
+"""
+import random
+import time
+from typing import Any, Callable, Dict, Tuple
+
+import ezdxf
+
+
+class Benchmark:
+    __slots__ = ("name", "description", "arguments", "function")
+
+    def __init__(self, name: str, description: str, arguments: Dict[str, Dict[str, Any]], function: Callable):
+        self.name = name
+        self.description = description
+        self.arguments = arguments
+        self.function = function
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, description: str, **arguments: Dict[str, Any]) -> Callable:
+    """
+    Registers the decorated function, called with the parsed arguments, as the benchmark name.
+    :param arguments: argparse options of every --argument (underscores become dashes).
+    """
+    def register(function: Callable) -> Callable:
+        if name in BENCHMARKS:
+            raise ValueError(f"Benchmark {name} is already registered.")
+        BENCHMARKS[name] = Benchmark(name, description, arguments, function)
+        return function
+
+    return register
+
+
+def timed(function: Callable, *args) -> Tuple[Any, float]:
+    """
+    Result of the call and the seconds it took.
+    """
+    start_time = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start_time
+
+
+def best_of(function: Callable, repeat: int) -> float:
+    """
+    Shortest of repeat timings of the call, in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+
+def write_chained_lines_dxf(path: str, polylines: int, segments: int, splines: int = 0, seed: int = 0):
+    """
+    Writes a DXF of polylines random walks of segments chained lines each, plus splines open splines of 6 points.
+    """
+    random.seed(seed)
+    doc = ezdxf.new("R2018")
+    msp = doc.modelspace()
+
+    for _ in range(polylines):
+        x, y = random.uniform(-300, 300), random.uniform(-300, 300)
+        for _ in range(segments):
+            next_x, next_y = x + random.uniform(-5, 5), y + random.uniform(-5, 5)
+            msp.add_line((x, y), (next_x, next_y))
+            x, y = next_x, next_y
+
+    for _ in range(splines):
+        x, y = random.uniform(-300, 300), random.uniform(-300, 300)
+        msp.add_open_spline([(x + 10 * i, y + random.uniform(-10, 10)) for i in range(6)], degree=3)
+
+    doc.saveas(path)
@@ -0,0 +1,74 @@
+"""
+Figure extraction from a loaded DXF document: the single dispatch pass of DXFParser.get_figures_parsed (and the array
+collectors of get_figures_arrays) against one modelspace query per entity type. Document loading is not timed, it is
+the same for both.
+"""
+import io
+import random
+
+import ezdxf
+
+from RoboForger.preprocessing.cad_parser import DXFParser
+
+from benchmarks.common import benchmark, best_of
+
+
+def make_document(count: int, seed: int = 0) -> io.StringIO:
+    """
+    Creates a DXF document with count entities (70% lines, 15% arcs, 10% circles, 5% splines) mixed with TEXT entities
+    we are not interested in, and returns it as a text stream.
+    """
+    random.seed(seed)
+    doc = ezdxf.new("R2018")
+    msp = doc.modelspace()
+
+    for i in range(count):
+        x, y = random.uniform(-400, 400), random.uniform(-400, 400)
+        kind = random.random()
+
+        if kind < 0.70:
+            msp.add_line((x, y), (x + random.uniform(-10, 10), y + random.uniform(-10, 10)))
+        elif kind < 0.85:
+            msp.add_arc((x, y), random.uniform(1, 10), random.uniform(0, 360), random.uniform(0, 360))
+        elif kind < 0.95:
+            msp.add_circle((x, y), random.uniform(1, 10))
+        else:
+            msp.add_open_spline([(x + 5 * j, y + random.uniform(-5, 5)) for j in range(6)])
+
+        if i % 10 == 0:
+            msp.add_text(f"T{i}", dxfattribs={"insert": (x, y)})
+
+    stream = io.StringIO()
+    doc.write(stream)
+    stream.seek(0)
+    return stream
+
+
+def per_type_queries(parser: DXFParser) -> dict:
+    """
+    Previous implementation of get_figures_parsed, one modelspace query per entity type.
+    """
+    return {
+        'lines': parser.get_lines(),
+        'arcs': parser.get_arcs(),
+        'circles': parser.get_circles(),
+        'splines': parser.get_splines(),
+    }
+
+
+@benchmark("dxf_parse", "DXF figure extraction, single dispatch pass against per type queries.",
+           sizes={"type": int, "nargs": "+", "default": [10_000, 100_000]},
+           repeat={"type": int, "default": 3})
+def run(args):
+    print(f"{'entities':>10} {'per type (s)':>13} {'single pass (s)':>16} {'arrays only (s)':>16} {'speedup':>8}")
+
+    for size in args.sizes:
+        parser = DXFParser(make_document(size))
+
+        assert per_type_queries(parser) == parser.get_figures_parsed(), "Single pass figures differ from the per type queries"
+
+        per_type_time = best_of(lambda: per_type_queries(parser), args.repeat)
+        single_pass_time = best_of(parser.get_figures_parsed, args.repeat)
+        arrays_time = best_of(parser.get_figures_arrays, args.repeat)
+
+        print(f"{size:>10} {per_type_time:>13.3f} {single_pass_time:>16.3f} {arrays_time:>16.3f} {per_type_time / single_pass_time:>7.1f}x")
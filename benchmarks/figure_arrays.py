@@ -0,0 +1,66 @@
+"""
+Processing of a DXF of chained lines and splines from the file (parsed and converted again) and from the figures the
+application already loaded, handed over as NumPy arrays in a shared memory block (Forger.get_figure_arrays), with the
+size of the arrays shared.
+"""
+import os
+import tempfile
+
+from RoboForger.forger import Forger, ForgerParameters
+from RoboForger.app.shared_arrays import SharedArrays
+
+from benchmarks.common import benchmark, timed, write_chained_lines_dxf
+
+
+def from_file(path: str, params: ForgerParameters) -> str:
+    forger = Forger(parameters=params)
+    forger.parse_figures(path)
+    forger.convert_figures()
+    forger.generate_rapid_code()
+    return forger.get_rapid_code()
+
+
+def from_arrays(figures: SharedArrays, params: ForgerParameters) -> str:
+    shared = SharedArrays.attach(figures.handle)
+    try:
+        forger = Forger(parameters=params)
+        forger.load_figure_arrays(shared.arrays())
+        forger.generate_rapid_code()
+        code = forger.get_rapid_code()
+        del forger
+    finally:
+        shared.close()
+    return code
+
+
+@benchmark("figure_arrays", "File processing from the file against from the loaded figure arrays.",
+           polylines={"type": int, "default": 500},
+           segments={"type": int, "default": 20},
+           splines={"type": int, "default": 200})
+def run(args):
+    # The travel optimizer stops on a time budget, without it both programs can be compared
+    params = ForgerParameters()
+    params.optimize_travel = False
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "drawing.dxf")
+        write_chained_lines_dxf(path, args.polylines, args.segments, args.splines)
+
+        # Loaded by the application for the preview
+        loaded = Forger(parameters=params)
+        loaded.parse_figures(path)
+        loaded.convert_figures()
+
+        expected, file_time = timed(from_file, path, params)
+        figures, pack_time = timed(SharedArrays.create, loaded.get_figure_arrays())
+
+        try:
+            code, arrays_time = timed(from_arrays, figures, params)
+            assert code == expected, "The loaded figures give a different program"
+        finally:
+            figures.close()
+            figures.unlink()
+
+    print(f"{'source':>12} {'time (s)':>9}")
+    print(f"{'file':>12} {file_time:>9.3f}")
+    print(f"{'arrays':>12} {arrays_time:>9.3f}   (+{pack_time:.3f} s packing in the application, {figures.nbytes / 1024:.1f} KB)")
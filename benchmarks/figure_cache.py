@@ -0,0 +1,52 @@
+"""
+Processing of a DXF of chained lines without the figure cache, with a cold cache and with a warm one (the parsed,
+converted and traced figures stored by file digest and parameters, see preprocessing.cache). The warm run changes the
+velocity, which none of them depend on, so it only generates the code.
+"""
+import os
+import tempfile
+
+from RoboForger.forger import Forger, ForgerParameters
+
+from benchmarks.common import benchmark, timed, write_chained_lines_dxf
+
+
+def process(path: str, cache_dir: str, velocity: int) -> tuple:
+    """
+    Code of the file and the seconds of every step (parse, convert, generate).
+    """
+    parameters = ForgerParameters()
+    parameters.cache_dir = cache_dir
+    parameters.polyline_velocity = velocity
+    parameters.travel_time_budget = 0.2
+
+    forger = Forger(parameters)
+    times = [timed(step)[1] for step in (lambda: forger.parse_figures(path), forger.convert_figures, forger.generate_rapid_code)]
+
+    return forger.get_rapid_code(), times
+
+
+@benchmark("figure_cache", "File processing without the figure cache, with a cold cache and with a warm one.",
+           polylines={"type": int, "default": 200},
+           segments={"type": int, "default": 20})
+def run(args):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "drawing.dxf")
+        cache_dir = os.path.join(directory, "cache")
+        write_chained_lines_dxf(path, args.polylines, args.segments)
+
+        print(f"{'run':>12} {'parse (s)':>10} {'convert (s)':>12} {'generate (s)':>13} {'total (s)':>10}")
+
+        expected = None
+
+        for name, run_cache_dir, velocity in (("no cache", "", 500), ("cold cache", cache_dir, 1000), ("warm cache", cache_dir, 500)):
+            code, times = process(path, run_cache_dir, velocity)
+
+            if expected is None:
+                expected = code
+            elif velocity == 500:
+                assert code == expected, "Cached figures give a different program"
+
+            print(f"{name:>12} {times[0]:>10.3f} {times[1]:>12.3f} {times[2]:>13.3f} {sum(times):>10.3f}")
+
+        print(f"cache size: {sum(entry.stat().st_size for entry in os.scandir(cache_dir)) / 1024:.1f} KB")
@@ -0,0 +1,54 @@
+"""
+Line conversion: the columnar FigureTable (all the lines at once with NumPy, objects built on demand) against one
+PolyLine per line with Converter.convert_lines_to_polylines. Above --object-limit lines the object time is extrapolated
+linearly.
+"""
+import numpy as np
+
+from RoboForger.drawing.figures import FigureTable
+from RoboForger.preprocessing.converter import Converter
+
+from benchmarks.common import benchmark, timed
+
+
+def make_lines(count: int, seed: int = 0) -> np.ndarray:
+    """
+    Random lines in the parser array form, (count, 6) start xyz, end xyz.
+    """
+    rng = np.random.default_rng(seed)
+    lines = rng.uniform(-400, 400, size=(count, 6))
+    lines[:, [2, 5]] = 0.0
+    return lines
+
+
+@benchmark("figure_table", "Line conversion, columnar FigureTable against per object Converter.",
+           sizes={"type": int, "nargs": "+", "default": [10_000, 100_000, 1_000_000]},
+           object_limit={"type": int, "default": 100_000})
+def run(args):
+    converter = Converter(float_precision=4, pre_scale=1.5, lifting=50.0, origin=(450.0, 0.0, 450.0))
+    reference_rate: float | None = None
+
+    print(f"{'lines':>10} {'table (s)':>10} {'bounds (s)':>11} {'objects (s)':>12} {'speedup':>8}")
+
+    for size in args.sizes:
+        lines = make_lines(size)
+        raw_table = FigureTable.from_arrays(lines, np.empty((0, 6)), np.empty((0, 4)))
+
+        table, table_time = timed(converter.convert_table, raw_table)
+        _, bounds_time = timed(table.bounds)
+
+        if size <= args.object_limit:
+            raw_lines = raw_table.to_raw()['lines']
+            polylines, object_time = timed(converter.convert_lines_to_polylines, raw_lines)
+
+            sample = range(0, size, max(1, size // 100))
+            materialized = list(table.figures())
+            assert all(polylines[i].get_points() == materialized[i].get_points() for i in sample), "Table figures differ from the converted figures"
+
+            reference_rate = object_time / size
+            object_label = f"{object_time:.3f}"
+        else:
+            object_time = reference_rate * size
+            object_label = f"~{object_time:.1f}"
+
+        print(f"{size:>10} {table_time:>10.3f} {bounds_time:>11.3f} {object_label:>12} {object_time / table_time:>7.0f}x")
@@ -0,0 +1,66 @@
+"""
+Offset move instructions formatted one at a time (drawing.moves.format_move_offset, an f-string rounding every
+coordinate) and in batches (drawing.moves.format_items_offset, NumPy rounding and joined templates), on random linear
+moves with some circular moves and figure headers. Also times the whole offset program of Draw.
+"""
+import numpy as np
+
+from RoboForger.drawing.draw import Draw
+from RoboForger.drawing.figures import PolyLine
+from RoboForger.drawing.moves import Move, MoveKind, format_move_offset, format_items_offset
+
+from benchmarks.common import benchmark, timed
+
+ORIGIN = (450.0, 0.0, 450.0)
+
+
+def make_items(rng: np.random.Generator, count: int) -> list:
+    points = rng.uniform(-300, 300, size=(count, 3)).tolist()
+    items = []
+
+    for index, point in enumerate(points):
+        if index % 20 == 0:
+            items.append(f"\n        ! Figure: Line{index}\n")
+
+        if index % 50 == 0:
+            items.append(Move(MoveKind.CIRCULAR, tuple(point), 200, True, via=tuple(points[index - 1]), zone="z1"))
+        else:
+            items.append(Move(MoveKind.LINEAR, tuple(point), 1000, True))
+
+    return items
+
+
+def per_move(items: list) -> str:
+    return "".join(format_move_offset(item, "origin", ORIGIN, "tool0") for item in items)
+
+
+def make_draw(rng: np.random.Generator, count: int) -> Draw:
+    """
+    Polylines of 20 points, count points in total.
+    """
+    draw = Draw(workspace_limits=None, use_detector=False, zone_tolerance=0.1)
+    walks = np.cumsum(rng.uniform(-5, 5, size=(count // 20, 20, 3)), axis=1)
+    walks[:, :, 2] = 0.0
+    draw.add_figures([PolyLine(f"Line{i}", [tuple(point) for point in walk.tolist()], lifting=50, float_precision=4)
+                      for i, walk in enumerate(walks)])
+    return draw
+
+
+@benchmark("instruction_format", "Offset move instructions formatted one at a time against in batches.",
+           moves={"type": int, "nargs": "+", "default": [10_000, 100_000]})
+def run(args):
+    rng = np.random.default_rng(0)
+
+    print(f"{'moves':>8} {'per move (s)':>13} {'batch (s)':>10} {'speedup':>8} {'draw (s)':>9}")
+
+    for count in args.moves:
+        items = make_items(rng, count)
+
+        single, per_move_time = timed(per_move, items)
+        batch, batch_time = timed(format_items_offset, items, "origin", ORIGIN, "tool0")
+        assert single == batch, "Batched formatting differs from the per move formatting"
+
+        # Whole program (figure moves, blending, cycle time, formatting)
+        _, draw_time = timed(make_draw(rng, count).generate_rapid_code, True)
+
+        print(f"{count:>8} {per_move_time:>13.3f} {batch_time:>10.3f} {per_move_time / batch_time:>7.1f}x {draw_time:>9.3f}")
@@ -0,0 +1,52 @@
+"""
+Splines converted in this process and in a process pool (Converter.convert_splines with workers, chunks of splines
+sampled by a ProcessPoolExecutor that sends back the points as arrays), on random splines. The converted splines must
+be the same.
+"""
+import os
+
+import numpy as np
+
+from RoboForger.preprocessing.converter import Converter
+
+from benchmarks.common import benchmark, timed
+
+
+def make_raw_splines(rng: np.random.Generator, count: int, control_count: int, degree: int) -> list:
+    interior = np.linspace(0, 1, control_count - degree + 1)[1:-1].tolist()
+    knots = [0.0] * (degree + 1) + interior + [1.0] * (degree + 1)
+
+    splines = []
+    for _ in range(count):
+        steps = rng.uniform(-10, 10, size=(control_count, 3))
+        steps[:, 2] = 0.0
+        splines.append({'degree': degree, 'closed': False, 'knots': knots, 'weights': [],
+                        'control_points': [tuple(point) for point in np.cumsum(steps, axis=0).tolist()], 'fit_points': []})
+
+    return splines
+
+
+@benchmark("parallel_conversion", "Spline conversion in this process against a process pool.",
+           splines={"type": int, "default": 500},
+           control_points={"type": int, "default": 50},
+           chord_error={"type": float, "default": 0.01},
+           workers={"type": int, "nargs": "+", "default": [2, 4, os.cpu_count() or 1]})
+def run(args):
+    splines = make_raw_splines(np.random.default_rng(0), args.splines, args.control_points, 3)
+
+    def convert(workers: int) -> list:
+        return Converter(spline_chord_error=args.chord_error, spline_arc_tolerance=0.1, workers=workers).convert_splines(splines)
+
+    serial, serial_time = timed(convert, 0)
+    print(f"{'workers':>8} {'time (s)':>9} {'speedup':>8}   ({len(splines)} splines, "
+          f"{sum(len(spline.get_points()) for spline in serial)} points)")
+    print(f"{'serial':>8} {serial_time:>9.3f} {1:>7.1f}x")
+
+    for workers in args.workers:
+        parallel, parallel_time = timed(convert, workers)
+
+        assert [spline.name for spline in parallel] == [spline.name for spline in serial]
+        assert [spline.get_points() for spline in parallel] == [spline.get_points() for spline in serial], \
+            "Parallel conversion differs from the serial one"
+
+        print(f"{workers:>8} {parallel_time:>9.3f} {serial_time / parallel_time:>7.1f}x")
@@ -0,0 +1,72 @@
+"""
+Memory used to build the RAPID program as a string (Draw.generate_rapid_code) and to stream it to a file as the moves
+of every figure are built (Draw.write_rapid_code), on growing numbers of random polylines without the detector. The
+written files must be equal.
+"""
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from RoboForger.drawing.draw import Draw
+from RoboForger.drawing.figures import PolyLine
+
+from benchmarks.common import benchmark
+
+
+def make_draw(rng: np.random.Generator, polylines: int, points: int) -> Draw:
+    draw = Draw(workspace_limits=None, use_detector=False, zone_tolerance=0.1)
+
+    walks = np.cumsum(rng.uniform(-5, 5, size=(polylines, points, 3)), axis=1)
+    walks[:, :, 2] = 0.0
+    draw.add_figures([PolyLine(f"Line{i}", [tuple(point) for point in walk.tolist()], lifting=50, float_precision=4)
+                      for i, walk in enumerate(walks)])
+
+    return draw
+
+
+def measure(function) -> tuple:
+    """
+    Seconds of the call and its traced peak memory in MB.
+    """
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+@benchmark("rapid_writer", "Peak memory of the RAPID program built as a string against streamed to a file.",
+           polylines={"type": int, "nargs": "+", "default": [1_000, 5_000]},
+           points={"type": int, "default": 20})
+def run(args):
+    rng = np.random.default_rng(0)
+
+    print(f"{'moves':>9} {'string (s)':>11} {'string (MB)':>12} {'stream (s)':>11} {'stream (MB)':>12} {'file (MB)':>10}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        string_path, stream_path = os.path.join(directory, "string.mod"), os.path.join(directory, "stream.mod")
+
+        for polylines in args.polylines:
+            draw = make_draw(rng, polylines, args.points)
+
+            def build_string():
+                with open(string_path, "w") as file:
+                    file.write(draw.generate_rapid_code(use_offset=True))
+
+            def stream():
+                with open(stream_path, "w") as file:
+                    draw.write_rapid_code(file, use_offset=True)
+
+            string_time, string_peak = measure(build_string)
+            stream_time, stream_peak = measure(stream)
+
+            with open(string_path) as string_file, open(stream_path) as stream_file:
+                assert string_file.read() == stream_file.read()
+
+            print(f"{draw.cycle_time_report['moves']:>9} {string_time:>11.2f} {string_peak:>12.1f} {stream_time:>11.2f} "
+                  f"{stream_peak:>12.1f} {os.path.getsize(stream_path) / 1024 / 1024:>10.1f}")
@@ -0,0 +1,48 @@
+"""
+Size of absolute mode programs with a rob target per figure point and with the shared table of
+drawing.rob_targets.RobTargetTable (every coordinate declared once), on grids of segments where every inner node is the
+end of four segments.
+"""
+import re
+
+from RoboForger.drawing.draw import Draw
+from RoboForger.drawing.figures import PolyLine
+
+from benchmarks.common import benchmark, timed
+
+
+def make_grid(size: int, step: float) -> list:
+    figures = []
+
+    for i in range(size):
+        for j in range(size):
+            x, y = i * step, j * step
+            figures.append(PolyLine(f"H{i}_{j}", [(x, y, 0.0), (x + step, y, 0.0)], lifting=50, float_precision=4))
+            figures.append(PolyLine(f"V{i}_{j}", [(x, y, 0.0), (x, y + step, 0.0)], lifting=50, float_precision=4))
+
+    return figures
+
+
+@benchmark("rob_target_table", "Absolute mode programs with rob targets per figure against the shared table.",
+           sizes={"type": int, "nargs": "+", "default": [10, 50, 100]},
+           step={"type": float, "default": 5.0})
+def run(args):
+    print(f"{'figures':>8} {'targets':>8} {'shared':>8} {'size (KB)':>10} {'shared (KB)':>12} {'time (s)':>9} {'shared (s)':>11}")
+
+    for size in args.sizes:
+        results = []
+
+        for share in (False, True):
+            draw = Draw(workspace_limits=None, use_detector=False, share_rob_targets=share)
+            draw.add_figures(make_grid(size, args.step))
+
+            code, elapsed = timed(draw.generate_rapid_code, False)
+
+            declared = re.findall(r"CONST robtarget (\w+):=", code)
+            used = set(re.findall(r"Move[JL] (\w+),", code))
+            assert used <= set(declared), "Moves reference undeclared rob targets"
+
+            results.append((len(declared), len(code) / 1024, elapsed))
+
+        (targets, size_kb, elapsed), (shared, shared_kb, shared_elapsed) = results
+        print(f"{2 * size * size:>8} {targets:>8} {shared:>8} {size_kb:>10.1f} {shared_kb:>12.1f} {elapsed:>9.3f} {shared_elapsed:>11.3f}")
@@ -0,0 +1,102 @@
+"""
+Figure arrays and generated code sent between processes through a multiprocessing queue (pickled and written through
+a pipe) and in shared memory (app.shared_arrays.SharedArrays, only the handle goes through the queue). A long lived
+process, like the warm worker, receives figure tables of several sizes and sends back a program of the same size both
+ways; every transfer is timed until the data is usable on the other side.
+"""
+import multiprocessing
+import time
+
+import numpy as np
+
+from RoboForger.app.shared_arrays import SharedArrays
+
+from benchmarks.common import benchmark
+
+
+MB = 1024 * 1024
+
+
+def make_figures(size_mb: int) -> dict:
+    rows = size_mb * MB // (3 * 3 * 8 + 8)
+    rng = np.random.default_rng(0)
+
+    return {"start": rng.uniform(-300, 300, (rows, 3)), "end": rng.uniform(-300, 300, (rows, 3)),
+            "center": np.zeros((rows, 3)), "radius": np.zeros(rows)}
+
+
+def serve(jobs: multiprocessing.Queue, results: multiprocessing.Queue):
+    """
+    The other process (a module function, the spawn start method imports it).
+    """
+    code = ""
+
+    while (job := jobs.get()) is not None:
+        action, transport, payload = job
+
+        if action == "code":
+            code = "MoveL Target_1,v100,fine,Tool\\WObj:=WobjName;\n" * (payload // 48)
+            results.put(None)
+        elif action == "figures" and transport == "queue":
+            results.put(float(payload["start"][-1].sum()))
+        elif action == "figures":
+            shared = SharedArrays.attach(payload)
+            results.put(float(shared.array("start")[-1].sum()))
+            shared.close()
+        elif transport == "queue":
+            results.put(code)
+        else:
+            block = SharedArrays.create({"rapid_code": np.frombuffer(code.encode(), dtype=np.uint8)}, track=False)
+            results.put(block.handle)
+            block.close()
+
+
+def timed_job(jobs: multiprocessing.Queue, results: multiprocessing.Queue, job: tuple) -> tuple:
+    start_time = time.perf_counter()
+    jobs.put(job)
+    result = results.get()
+    return result, time.perf_counter() - start_time
+
+
+@benchmark("shared_arrays", "Figures and code sent between processes through a queue against shared memory.",
+           sizes={"type": int, "nargs": "+", "default": [10, 100, 300], "help": "MB of figures and code"})
+def run(args):
+    jobs, results = multiprocessing.Queue(), multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(jobs, results))
+    process.start()
+
+    print(f"{'size (MB)':>10} {'figures queue (s)':>18} {'figures shared (s)':>19} {'code queue (s)':>15} {'code shared (s)':>16}")
+
+    for size in args.sizes:
+        figures = make_figures(size)
+        expected = float(figures["start"][-1].sum())
+
+        value, figures_queue_time = timed_job(jobs, results, ("figures", "queue", figures))
+        assert value == expected
+
+        # Shared once by the application when the file is loaded
+        shared = SharedArrays.create(figures)
+        value, figures_shared_time = timed_job(jobs, results, ("figures", "shared", shared.handle))
+        assert value == expected
+        shared.close()
+        shared.unlink()
+
+        jobs.put(("code", None, size * MB))
+        results.get()
+
+        code, code_queue_time = timed_job(jobs, results, ("send", "queue", None))
+
+        start_time = time.perf_counter()
+        jobs.put(("send", "shared", None))
+        block = SharedArrays.attach(results.get())
+        shared_code = str(block.array("rapid_code").data, "utf-8")
+        block.close()
+        block.unlink()
+        code_shared_time = time.perf_counter() - start_time
+
+        assert shared_code == code
+
+        print(f"{size:>10} {figures_queue_time:>18.3f} {figures_shared_time:>19.3f} {code_queue_time:>15.3f} {code_shared_time:>16.3f}")
+
+    jobs.put(None)
+    process.join()
@@ -0,0 +1,84 @@
+"""
+Figure graph builder of detector.traces: the endpoint index against the pairwise comparison (O(n^2)) it replaced, on
+chains of connected lines. Above --pairwise-limit figures the pairwise time is extrapolated quadratically.
+"""
+import random
+from typing import Dict, List
+
+from RoboForger.drawing.figures import Figure, PolyLine
+from RoboForger.detector.enums import ConnectionType
+from RoboForger.detector.traces import create_graph_from_figures, find_traces, is_figure_connected
+
+from benchmarks.common import benchmark, timed
+
+
+def pairwise_graph(figures: List[Figure]) -> Dict[Figure, List[Figure]]:
+    """
+    Previous implementation of create_graph_from_figures, kept here as the baseline.
+    """
+    graph: Dict[Figure, List[Figure]] = {}
+
+    for figure in figures:
+        graph[figure] = []
+
+        for other_figure in figures:
+            if figure == other_figure:
+                continue
+
+            connection_type = is_figure_connected(figure, other_figure)
+
+            if connection_type == ConnectionType.START2END or connection_type == ConnectionType.END2START:
+                graph[figure].append(other_figure)
+
+    return graph
+
+
+def make_chains(count: int, chain_length: int = 50, seed: int = 0) -> List[Figure]:
+    """
+    Creates count lines grouped in open chains of chain_length connected lines.
+    """
+    random.seed(seed)
+    figures: List[Figure] = []
+
+    while len(figures) < count:
+        x, y = random.uniform(-400, 400), random.uniform(-400, 400)
+
+        for _ in range(min(chain_length, count - len(figures))):
+            next_x, next_y = x + random.uniform(-5, 5), y + random.uniform(-5, 5)
+            figures.append(PolyLine(f"Line{len(figures)}", [(x, y, 0.0), (next_x, next_y, 0.0)], lifting=50.0, float_precision=4))
+            x, y = next_x, next_y
+
+    return figures
+
+
+@benchmark("traces", "Figure graph builder, endpoint index against pairwise comparison.",
+           sizes={"type": int, "nargs": "+", "default": [1_000, 10_000, 100_000]},
+           pairwise_limit={"type": int, "default": 1_000})
+def run(args):
+    reference_time: float | None = None
+    reference_size: int | None = None
+
+    print(f"{'figures':>10} {'indexed (s)':>12} {'pairwise (s)':>14} {'speedup':>10} {'find_traces (s)':>16}")
+
+    for size in args.sizes:
+        figures = make_chains(size)
+
+        graph, indexed_time = timed(create_graph_from_figures, figures)
+
+        if size <= args.pairwise_limit:
+            pairwise, pairwise_time = timed(pairwise_graph, figures)
+            assert pairwise == graph, "Indexed graph differs from the pairwise graph"
+            reference_time, reference_size = pairwise_time, size
+            pairwise_label = f"{pairwise_time:.3f}"
+        elif reference_time is not None:
+            pairwise_time = reference_time * (size / reference_size) ** 2
+            pairwise_label = f"~{pairwise_time:.1f}"
+        else:
+            pairwise_time = None
+            pairwise_label = "-"
+
+        traces, traces_time = timed(find_traces, graph)
+        assert sum(len(trace) for trace in traces) == size
+
+        speedup = f"{pairwise_time / indexed_time:.0f}x" if pairwise_time else "-"
+        print(f"{size:>10} {indexed_time:>12.3f} {pairwise_label:>14} {speedup:>10} {traces_time:>16.3f}")
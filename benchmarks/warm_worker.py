@@ -0,0 +1,115 @@
+"""
+Latency, from the request to the result, of processing a DXF of chained lines in a new process per run (which imports
+the pipeline and parses the file again) and in the warm worker of app.warm_worker (started once, given the figures the
+application loaded): a newly loaded file and the same file with another velocity.
+"""
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from RoboForger.forger import Forger, ForgerParameters
+from RoboForger.app.warm_worker import WarmWorker
+from RoboForger.app.shared_arrays import SharedArrays
+
+from benchmarks.common import benchmark, write_chained_lines_dxf
+
+
+def process(file_path: str, result_queue: multiprocessing.Queue, params: ForgerParameters):
+    forger = Forger(parameters=params)
+    forger.parse_figures(file_path)
+    forger.convert_figures()
+    forger.generate_rapid_code()
+    result_queue.put(forger.get_rapid_code())
+
+
+def run_in_new_process(file_path: str, params: ForgerParameters) -> tuple:
+    start_time = time.perf_counter()
+
+    result_queue = multiprocessing.Queue()
+    process_ = multiprocessing.Process(target=process, args=(file_path, result_queue, params))
+    process_.start()
+    code = result_queue.get()
+    process_.join()
+
+    return code, time.perf_counter() - start_time
+
+
+def load(file_path: str, params: ForgerParameters) -> SharedArrays:
+    """
+    Loads the file like the application does to preview it.
+    """
+    forger = Forger(parameters=params)
+    forger.parse_figures(file_path)
+    forger.convert_figures()
+    return SharedArrays.create(forger.get_figure_arrays())
+
+
+def run_in_worker(worker: WarmWorker, results: dict, document: tuple, params: ForgerParameters) -> tuple:
+    done = threading.Event()
+    results["done"] = done
+
+    start_time = time.perf_counter()
+    worker.submit(document[0], document[1].handle, params)
+    done.wait()
+    elapsed = time.perf_counter() - start_time
+
+    if isinstance(results["value"], Exception):
+        raise results["value"]
+
+    return results["value"]["rapid_code"], elapsed
+
+
+@benchmark("warm_worker", "File processing in a new process per run against the warm worker.",
+           polylines={"type": int, "default": 200},
+           segments={"type": int, "default": 20},
+           start_method={"default": "spawn", "choices": multiprocessing.get_all_start_methods()})
+def run(args):
+    multiprocessing.set_start_method(args.start_method, force=True)
+
+    # The travel optimizer stops on a time budget, without it the programs of every run can be compared
+    params = ForgerParameters()
+    params.optimize_travel = False
+
+    other_params = ForgerParameters()
+    other_params.optimize_travel = False
+    other_params.polyline_velocity = 1000
+
+    with tempfile.TemporaryDirectory() as directory:
+        path, warm_up_path = os.path.join(directory, "drawing.dxf"), os.path.join(directory, "warm_up.dxf")
+        write_chained_lines_dxf(path, args.polylines, args.segments)
+        write_chained_lines_dxf(warm_up_path, 1, 1)
+
+        results = {}
+
+        def on_result(job_id, value):
+            results["value"] = value
+            results["done"].set()
+
+        worker = WarmWorker(on_result=on_result)
+        worker.start()
+        # The worker is warm when the user processes a file
+        warm_up = ("warm up", load(warm_up_path, params))
+        run_in_worker(worker, results, warm_up, params)
+
+        document = ("drawing", load(path, params))
+
+        expected, new_process_time = run_in_new_process(path, params)
+        code, new_file_time = run_in_worker(worker, results, document, params)
+        assert code == expected, "The warm worker gives a different program"
+
+        other_expected, _ = run_in_new_process(path, other_params)
+        code, same_file_time = run_in_worker(worker, results, document, other_params)
+        assert code == other_expected, "The warm document gives a different program with new parameters"
+
+        worker.stop()
+
+        for _, figures in (warm_up, document):
+            figures.close()
+            figures.unlink()
+
+    print(f"{'run':>28} {'time (s)':>9}   ({args.start_method} start method)")
+    print(f"{'new process':>28} {new_process_time:>9.3f}")
+    print(f"{'warm worker, new file':>28} {new_file_time:>9.3f}")
+    print(f"{'warm worker, same file':>28} {same_file_time:>9.3f}")
@@ -0,0 +1,49 @@
+"""
+Estimated cycle time of random polylines (smooth random walks with some sharp turns) with fine points everywhere and
+with the zone blending of drawing.moves.blend_zones, for several tolerances.
+"""
+import numpy as np
+
+from RoboForger.drawing.draw import Draw
+from RoboForger.drawing.figures import PolyLine
+
+from benchmarks.common import benchmark, timed
+
+
+def make_polyline(rng: np.random.Generator, index: int, segments: int) -> PolyLine:
+    """
+    Random walk turning a little at every point and sharply from time to time.
+    """
+    turns = rng.normal(0, 0.3, segments)
+    turns[rng.uniform(size=segments) < 0.1] += rng.choice([-2.0, 2.0])
+    headings = np.cumsum(turns)
+    lengths = rng.uniform(2, 20, segments)
+
+    steps = np.column_stack([np.cos(headings) * lengths, np.sin(headings) * lengths, np.zeros(segments)])
+    start = np.array([rng.uniform(-300, 300), rng.uniform(-300, 300), 0.0])
+    points = np.vstack([start, start + np.cumsum(steps, axis=0)])
+
+    return PolyLine(f"Line{index}", [tuple(point) for point in points.tolist()], lifting=50, float_precision=4)
+
+
+@benchmark("zone_blending", "Cycle time with fine points against zone blending.",
+           polylines={"type": int, "default": 50},
+           segments={"type": int, "default": 40},
+           tolerances={"type": float, "nargs": "+", "default": [0.0, 0.05, 0.1, 0.5, 1.0]})
+def run(args):
+    rng = np.random.default_rng(0)
+    figures = [make_polyline(rng, i, args.segments) for i in range(args.polylines)]
+
+    print(f"{'tolerance':>10} {'moves':>7} {'blended':>8} {'fine (s)':>9} {'blended (s)':>12} {'saved':>7} {'plan (s)':>9}")
+
+    for tolerance in args.tolerances:
+        draw = Draw(workspace_limits=None, use_detector=False, zone_tolerance=tolerance)
+        draw.add_figures(figures)
+
+        _, plan_time = timed(draw.generate_rapid_code, True)
+
+        report = draw.cycle_time_report
+        saved = 1 - report['time_with_blending'] / report['time_without_blending']
+
+        print(f"{tolerance:>10} {report['moves']:>7} {report['blended_points']:>8} {report['time_without_blending']:>9.1f} "
+              f"{report['time_with_blending']:>12.1f} {saved:>6.1%} {plan_time:>9.3f}")
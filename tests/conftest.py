@@ -0,0 +1,65 @@
+"""
+Shared fixtures of the tests: forgers loaded with small figure sets, as if a file had been parsed.
+"""
+from typing import Callable, List
+
+import numpy as np
+import pytest
+
+from RoboForger.drawing.figures import FigureTable
+from RoboForger.fig_types import RawArc, RawCircle, RawLine, RawSpline
+from RoboForger.forger import Forger, ForgerParameters
+from RoboForger.preprocessing.cache import FigureCache
+
+
+def raw_spline(control_points: List[tuple], degree: int = 3) -> RawSpline:
+    """
+    Open clamped spline with uniform knots.
+    """
+    interior = np.linspace(0, 1, len(control_points) - degree + 1)[1:-1].tolist()
+    return {"degree": degree, "closed": False, "knots": [0.0] * (degree + 1) + interior + [1.0] * (degree + 1),
+            "weights": [], "control_points": [tuple(map(float, point)) for point in control_points], "fit_points": []}
+
+
+def figure_arrays(lines: List[RawLine] = (), arcs: List[RawArc] = (), circles: List[RawCircle] = (),
+                  splines: List[RawSpline] = ()) -> dict:
+    """
+    The parsed figure arrays of the figures (see Forger.get_figure_arrays).
+    """
+    table = FigureTable.from_raw(list(lines), list(arcs), list(circles))
+    return {**FigureCache.pack_table(table, "raw"), **FigureCache.pack_splines(list(splines))}
+
+
+@pytest.fixture
+def parameters() -> Callable[..., ForgerParameters]:
+    """
+    Factory of parameters with the given values, the travel optimizer is off (it stops on a time budget).
+    """
+    def make(**values) -> ForgerParameters:
+        params = ForgerParameters()
+        params.optimize_travel = False
+        for name, value in values.items():
+            if not hasattr(params, name):
+                raise AttributeError(f"Unknown parameter {name}")
+            setattr(params, name, value)
+        return params
+
+    return make
+
+
+@pytest.fixture
+def load_forger() -> Callable[..., Forger]:
+    """
+    Factory of forgers with the given raw figures loaded and converted, file_digest stands for the file they come
+    from (the figure cache needs it).
+    """
+    def make(params: ForgerParameters, file_digest: str | None = None, **figures) -> Forger:
+        arrays = figure_arrays(**figures)
+        if file_digest is not None:
+            arrays["file_digest"] = np.array(file_digest)
+
+        forger = Forger(parameters=params)
+        forger.load_figure_arrays(arrays)
+        return forger
+
+    return make
@@ -0,0 +1,124 @@
+"""
+Tests of the spline arc fitting (drawing.arc_fitting) and of the fitted spline moves.
+"""
+from typing import List
+
+import numpy as np
+
+import RoboForger.drawing.figures.bspline as bspline_module
+from RoboForger.drawing.arc_fitting import fit_arcs, FittedSegment, SegmentKind
+from RoboForger.drawing.figures import BSpline
+from RoboForger.drawing.moves import MoveKind
+
+
+def make_spline(control_points, chord_error: float = 0.0, arc_tolerance: float = 0.0) -> BSpline:
+    degree = 3
+    interior = np.linspace(0, 1, len(control_points) - degree + 1)[1:-1].tolist()
+    knots = [0.0] * (degree + 1) + interior + [1.0] * (degree + 1)
+
+    return BSpline("Spline", degree=degree, closed=False, knots=knots, weights=[],
+                   control_points=[tuple(point) for point in control_points], fit_points=[], interpolation_precision=10,
+                   lifting=50, float_precision=4, chord_error=chord_error, arc_tolerance=arc_tolerance)
+
+
+def circle_through(a: np.ndarray, b: np.ndarray, c: np.ndarray):
+    ab, ac = b - a, c - a
+    cross = ab[0] * ac[1] - ab[1] * ac[0]
+    center = a + np.array([ac[1] * (ab @ ab) - ab[1] * (ac @ ac), ab[0] * (ac @ ac) - ac[0] * (ab @ ab)]) / (2 * cross)
+    return center, np.linalg.norm(a - center)
+
+
+def path_distance(points: np.ndarray, segments: List[FittedSegment]) -> np.ndarray:
+    """
+    Distance of every point to the closest fitted segment, the path starts at the first point.
+    """
+    distances = np.full(len(points), np.inf)
+    start = points[0]
+
+    for segment in segments:
+        end = np.array(segment.end[:2])
+        chord = end - start
+
+        if segment.kind == SegmentKind.ARC:
+            center, radius = circle_through(start, np.array(segment.mid[:2]), end)
+            along = (points - start) @ chord / (chord @ chord)
+            distance = np.where((along >= 0) & (along <= 1), np.abs(np.linalg.norm(points - center, axis=1) - radius),
+                                np.minimum(np.linalg.norm(points - start, axis=1), np.linalg.norm(points - end, axis=1)))
+        else:
+            along = np.clip((points - start) @ chord / max(chord @ chord, 1e-18), 0.0, 1.0)
+            distance = np.linalg.norm(points - (start + along[:, None] * chord), axis=1)
+
+        distances = np.minimum(distances, distance)
+        start = end
+
+    return distances
+
+
+SMOOTH_SPLINES = {
+    "s_curve": [(0, 0, 0), (50, 40, 0), (100, -40, 0), (150, 40, 0), (200, 0, 0)],
+    "wave": [(x * 20, 30 * np.sin(x / 2), 0) for x in range(15)],
+    "ellipse": [(100 * np.cos(t), 50 * np.sin(t), 0) for t in np.linspace(0, 1.5 * np.pi, 9)],
+}
+
+
+def test_fitted_path_stays_within_tolerance():
+    rng = np.random.default_rng(0)
+
+    for _ in range(10):
+        steps = rng.uniform(-10, 10, size=(20, 3))
+        steps[:, 2] = 0.0
+        for chord_error in (0.0, 0.05):
+            points = np.array(make_spline(np.cumsum(steps, axis=0), chord_error).get_all_points())
+
+            for tolerance in (0.05, 0.1):
+                segments = fit_arcs(points.tolist(), tolerance)
+
+                assert segments[-1].end == tuple(points[-1].tolist())
+                assert path_distance(points[:, :2], segments).max() <= tolerance + 1e-9
+
+
+def test_smooth_splines_reduce_moves():
+    # The dense MoveL chain of the uniform sampling against the fitted moves (start MoveL + one per segment)
+    for name, control_points in SMOOTH_SPLINES.items():
+        points = make_spline(control_points).get_all_points()
+        segments = fit_arcs(points, 0.05)
+
+        assert len(points) / (1 + len(segments)) >= 5, f"{name}: {len(points)} points fitted with {len(segments)} segments"
+
+
+def test_arcs_resume_after_a_line():
+    # A straight run followed by a quarter circle, the tangent of the line must not stop the arc fitting
+    line = [(float(x), 0.0, 0.0) for x in range(0, 50)]
+    angles = np.linspace(0, np.pi / 2, 60)[1:]
+    arc = [(50 + 30 * np.sin(a), 30 - 30 * np.cos(a), 0.0) for a in angles]
+
+    segments = fit_arcs(line + arc, 0.05)
+
+    assert len(segments) <= 3
+    assert any(segment.kind == SegmentKind.ARC for segment in segments)
+
+
+def test_fitted_moves_are_fitted_once(monkeypatch):
+    calls = []
+
+    def counting_fit_arcs(points, tolerance):
+        calls.append(tolerance)
+        return fit_arcs(points, tolerance)
+
+    monkeypatch.setattr(bspline_module, "fit_arcs", counting_fit_arcs)
+
+    spline = make_spline(SMOOTH_SPLINES["s_curve"], arc_tolerance=0.1)
+    first = spline.moves()
+    second = spline.moves()
+
+    assert len(calls) == 1
+    assert [(move.kind, move.target, move.via) for move in first if not isinstance(move, str)] == \
+           [(move.kind, move.target, move.via) for move in second if not isinstance(move, str)]
+    assert any(move.kind is MoveKind.CIRCULAR for move in first if not isinstance(move, str))
+
+    # New points are fitted again
+    spline.reverse_points()
+    reversed_moves = [move for move in spline.moves() if not isinstance(move, str)]
+
+    assert len(calls) == 2
+    assert reversed_moves[-2].target == first[2].target
@@ -0,0 +1,88 @@
+"""
+Tests of the BSpline evaluation (drawing.figures.bspline).
+"""
+import numpy as np
+import pytest
+
+from RoboForger.drawing.figures import BSpline
+
+
+def de_boor(knots: np.ndarray, degree: int, control_points: np.ndarray, t_values: np.ndarray) -> np.ndarray:
+    """
+    Reference evaluation, De Boor's algorithm one parameter at a time (homogeneous control points for NURBS).
+    """
+    n = len(control_points) - 1
+    points = []
+
+    for t in t_values:
+        k = int(np.clip(np.searchsorted(knots, t, side='right') - 1, degree, n))
+        d = control_points[k - degree:k + 1].copy()
+
+        for r in range(1, degree + 1):
+            for j in range(degree, r - 1, -1):
+                denominator = knots[j + k - r + 1] - knots[j + k - degree]
+                alpha = (t - knots[j + k - degree]) / denominator if denominator != 0 else 0.0
+                d[j] = (1.0 - alpha) * d[j - 1] + alpha * d[j]
+
+        points.append(d[degree][:3] / d[degree][3] if control_points.shape[1] == 4 else d[degree])
+
+    return np.array(points)
+
+
+def random_spline(rng: np.random.Generator, control_count: int, rational: bool, chord_error: float = 0.0) -> BSpline:
+    degree = 3
+    interior = np.sort(rng.uniform(0, 1, control_count - degree - 1)).tolist()
+    steps = rng.uniform(-10, 10, size=(control_count, 3))
+    steps[:, 2] = 0.0
+
+    return BSpline("Spline", degree=degree, closed=False, knots=[0.0] * (degree + 1) + interior + [1.0] * (degree + 1),
+                   weights=rng.uniform(0.5, 2.0, control_count).tolist() if rational else [],
+                   control_points=[tuple(point) for point in np.cumsum(steps, axis=0)], fit_points=[],
+                   interpolation_precision=10, lifting=50, float_precision=6, chord_error=chord_error)
+
+
+@pytest.mark.parametrize("rational", [False, True])
+def test_points_match_de_boor(rational):
+    rng = np.random.default_rng(1)
+
+    for control_count in (4, 10, 40):
+        spline = random_spline(rng, control_count, rational)
+        t_values = np.linspace(spline.knots[spline.degree], spline.knots[-spline.degree - 1], spline.num_points)
+        expected = de_boor(spline.knots, spline.degree, spline._homogeneous_control_points(), t_values)
+
+        np.testing.assert_allclose(spline.get_all_points(), expected, atol=1e-9)
+
+        # Same knots, other control points: the cached basis functions give the new curve
+        other = BSpline("Other", degree=3, closed=False, knots=spline.knots.tolist(), weights=[],
+                        control_points=[tuple(point) for point in spline.control_points[::-1]], fit_points=[],
+                        interpolation_precision=10, lifting=50, float_precision=6)
+        expected = de_boor(other.knots, other.degree, other._homogeneous_control_points(), t_values)
+        np.testing.assert_allclose(other.get_all_points(), expected, atol=1e-9)
+
+
+def max_chord_error(spline: BSpline, t_values: np.ndarray, dense: int = 20_000) -> float:
+    """
+    Largest distance between the spline (densely evaluated) and the segments joining the points of t_values.
+    """
+    dense_t = np.linspace(t_values[0], t_values[-1], dense)
+    samples = spline._evaluate_spline(t_values)
+    segment = np.clip(np.searchsorted(t_values, dense_t, side='right') - 1, 0, len(t_values) - 2)
+
+    return float(BSpline._segment_distance(spline._evaluate_spline(dense_t), samples[segment], samples[segment + 1]).max())
+
+
+@pytest.mark.parametrize("chord_error", [0.01, 0.1])
+def test_adaptive_sampling_meets_the_chord_error(chord_error):
+    rng = np.random.default_rng(2)
+
+    for i in range(10):
+        spline = random_spline(rng, 30, rational=i % 2 == 1, chord_error=chord_error)
+        t_values = spline.adaptive_parameters(chord_error)
+
+        # The deviation is probed at three points of every interval, the peak between them can be a little higher
+        assert max_chord_error(spline, t_values) <= chord_error * 1.1
+        assert len(spline.get_points()) == len(t_values) + 2
+
+        # The uniform sampling needs more points for the same error
+        uniform = np.linspace(spline.knots[spline.degree], spline.knots[-spline.degree - 1], len(t_values))
+        assert max_chord_error(spline, uniform) > chord_error
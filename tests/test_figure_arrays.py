@@ -0,0 +1,60 @@
+"""
+Tests of the figures handed to another process as arrays (Forger.get_figure_arrays and load_figure_arrays).
+"""
+import numpy as np
+import pytest
+
+from RoboForger.forger import Forger
+
+from conftest import raw_spline
+
+FIGURES = {
+    "lines": [{"start": (0.0, 0.0, 0.0), "end": (10.0, 0.0, 0.0)}, {"start": (10.0, 0.0, 0.0), "end": (10.0, 10.0, 0.0)}],
+    "arcs": [{"center": (10.0, 20.0, 0.0), "radius": 10.0, "start_angle": 270.0, "end_angle": 90.0, "clockwise": False}],
+    "circles": [{"center": (60.0, 60.0, 0.0), "radius": 5.0}],
+    "splines": [raw_spline([(50, 0, 0), (60, 20, 0), (70, -20, 0), (80, 0, 0)])],
+}
+
+
+def generate(forger: Forger) -> str:
+    forger.generate_rapid_code()
+    return forger.get_rapid_code()
+
+
+def reloaded(arrays: dict, params) -> Forger:
+    forger = Forger(parameters=params)
+    forger.load_figure_arrays(arrays)
+    return forger
+
+
+def test_converted_figures_are_reused(load_forger, parameters, monkeypatch):
+    params = parameters(spline_chord_error=0.05)
+    loaded = load_forger(params, file_digest="drawing", **FIGURES)
+    arrays = loaded.get_figure_arrays()
+
+    assert str(arrays["file_digest"]) == "drawing"
+    assert "conversion_parameters" in arrays
+
+    # Same conversion parameters: nothing is converted again
+    monkeypatch.setattr(Forger, "convert_figures", lambda self: pytest.fail("The figures were converted again"))
+    forger = reloaded(arrays, params)
+
+    assert generate(forger) == generate(loaded)
+    for name, array in forger.get_figure_arrays().items():
+        np.testing.assert_array_equal(array, arrays[name], err_msg=name)
+
+
+def test_other_conversion_parameters_convert_again(load_forger, parameters):
+    arrays = load_forger(parameters(spline_chord_error=0.05), **FIGURES).get_figure_arrays()
+    params = parameters(spline_chord_error=0.0, lifting=30.0)
+
+    assert generate(reloaded(arrays, params)) == generate(load_forger(params, **FIGURES))
+
+
+def test_raw_figures_round_trip(load_forger, parameters):
+    forger = load_forger(parameters(), **FIGURES)
+    raw = forger.get_raw_figures()
+
+    assert raw["lines"] == FIGURES["lines"]
+    assert raw["splines"] == FIGURES["splines"]
+    assert reloaded(forger.get_figure_arrays(), parameters()).get_raw_figures() == raw
@@ -0,0 +1,155 @@
+"""
+Tests of the on disk figure cache (preprocessing.cache).
+"""
+import os
+
+import numpy as np
+import pytest
+
+from RoboForger.preprocessing.cache import DiskCache, DxfCache, FigureCache
+
+from conftest import raw_spline
+
+
+FIGURES = {
+    "lines": [{"start": (0.0, 0.0, 0.0), "end": (10.0, 0.0, 0.0)}, {"start": (10.0, 0.0, 0.0), "end": (10.0, 10.0, 0.0)},
+              {"start": (30.0, 0.0, 0.0), "end": (40.0, 5.0, 0.0)}],
+    "arcs": [{"center": (10.0, 20.0, 0.0), "radius": 10.0, "start_angle": 270.0, "end_angle": 90.0, "clockwise": False}],
+    "circles": [{"center": (60.0, 60.0, 0.0), "radius": 5.0}],
+    "splines": [raw_spline([(50, 0, 0), (60, 20, 0), (70, -20, 0), (80, 0, 0)])],
+}
+
+
+def generate(forger) -> str:
+    forger.generate_rapid_code()
+    return forger.get_rapid_code()
+
+
+def entry_path(directory, stage: str) -> str:
+    paths = [name for name in os.listdir(directory) if name.startswith(f"{stage}-")]
+    assert len(paths) == 1
+    return os.path.join(directory, paths[0])
+
+
+def test_traces_are_reused(tmp_path, load_forger, parameters):
+    params = parameters(cache_dir=str(tmp_path), spline_arc_tolerance=0.1)
+    expected = generate(load_forger(parameters(spline_arc_tolerance=0.1), **FIGURES))
+
+    assert generate(load_forger(params, file_digest="drawing", **FIGURES)) == expected
+
+    # Entries are plain arrays
+    with np.load(entry_path(tmp_path, "traces"), allow_pickle=False) as entry:
+        assert "figures_kind" in entry.files
+
+    forger = load_forger(params, file_digest="drawing", **FIGURES)
+    draw = forger._make_draw()
+    assert draw.detected_figures is not None, "The traces were not loaded from the cache"
+    assert generate(forger) == expected
+
+
+def test_figures_round_trip(load_forger, parameters):
+    forger = load_forger(parameters(snap_tolerance=0.01, simplify_tolerance=0.01), **FIGURES)
+    figures = forger._make_draw()._detected_figures()
+
+    packed = FigureCache.pack_figures(figures)
+    loaded = FigureCache.unpack_figures(packed)
+
+    assert [type(figure) for figure in loaded] == [type(figure) for figure in figures]
+    assert [figure.name for figure in loaded] == [figure.name for figure in figures]
+    assert [figure.get_points() for figure in loaded] == [figure.get_points() for figure in figures]
+    assert [(figure.skip_pre_down, figure.skip_end_lifting) for figure in loaded] == \
+           [(figure.skip_pre_down, figure.skip_end_lifting) for figure in figures]
+
+    for name, array in FigureCache.pack_figures(loaded).items():
+        np.testing.assert_array_equal(array, packed[name], err_msg=name)
+
+
+def test_invalid_entry_is_a_miss(tmp_path, load_forger, parameters):
+    params = parameters(cache_dir=str(tmp_path))
+    expected = generate(load_forger(params, file_digest="drawing", **FIGURES))
+
+    # An entry of an older layout under the same key
+    path = entry_path(tmp_path, "traces")
+    np.savez(path, figures=np.frombuffer(b"not figures", dtype=np.uint8))
+
+    assert generate(load_forger(params, file_digest="drawing", **FIGURES)) == expected
+
+    # Written again
+    with np.load(path, allow_pickle=False) as entry:
+        assert "figures_kind" in entry.files
+
+
+def test_keys_depend_on_the_format_version(monkeypatch):
+    key = FigureCache.key("traces", "drawing", {"zone_tolerance": 0.1})
+
+    assert key == FigureCache.key("traces", "drawing", {"zone_tolerance": 0.1})
+    assert key != FigureCache.key("traces", "drawing", {"zone_tolerance": 0.2})
+    assert key != FigureCache.key("converted", "drawing", {"zone_tolerance": 0.1})
+
+    monkeypatch.setattr(FigureCache, "FORMAT_VERSION", FigureCache.FORMAT_VERSION + 1)
+    assert key != FigureCache.key("traces", "drawing", {"zone_tolerance": 0.1})
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=250, suffix=".bin")
+
+    def write(key: str, age: int):
+        path = cache.write(key, lambda path: open(path, "wb").write(b"x" * 100))
+        os.utime(path, (1000 + age, 1000 + age))
+
+    write("first", 0)
+    write("second", 1)
+
+    # Reading refreshes an entry
+    assert cache.find("first") is not None
+    assert cache.find("missing") is None
+
+    write("third", 2)
+
+    assert cache.find("second") is None
+    assert cache.find("first") is not None
+    assert cache.find("third") is not None
+
+
+def test_dwg_conversions_are_reused(tmp_path):
+    cache = DxfCache(str(tmp_path / "cache"))
+    dwg, tool = tmp_path / "drawing.dwg", tmp_path / "dwg2dxf"
+    dwg.write_bytes(b"first drawing")
+    tool.write_bytes(b"converter")
+    conversions = []
+
+    def convert(dwg_path: str, tool_path: str, output_path: str):
+        conversions.append(dwg_path)
+        with open(dwg_path, "rb") as source, open(output_path, "wb") as output:
+            output.write(b"DXF of " + source.read())
+
+    path = cache.convert(str(dwg), str(tool), convert)
+    assert open(path, "rb").read() == b"DXF of first drawing"
+    assert cache.convert(str(dwg), str(tool), convert) == path
+    assert len(conversions) == 1
+
+    # Another content or another converter build is converted again
+    dwg.write_bytes(b"second drawing")
+    assert open(cache.convert(str(dwg), str(tool), convert), "rb").read() == b"DXF of second drawing"
+    assert len(conversions) == 2
+
+    tool.write_bytes(b"converter 2")
+    cache.convert(str(dwg), str(tool), convert)
+    assert len(conversions) == 3
+
+
+def test_failed_conversion_is_not_cached(tmp_path):
+    cache = DxfCache(str(tmp_path / "cache"))
+    dwg, tool = tmp_path / "drawing.dwg", tmp_path / "dwg2dxf"
+    dwg.write_bytes(b"drawing")
+    tool.write_bytes(b"converter")
+
+    def fail(dwg_path: str, tool_path: str, output_path: str):
+        with open(output_path, "w") as output:
+            output.write("partial")
+        raise RuntimeError("conversion failed")
+
+    with pytest.raises(RuntimeError):
+        cache.convert(str(dwg), str(tool), fail)
+
+    assert [entry.name for entry in os.scandir(tmp_path / "cache")] == []
@@ -0,0 +1,30 @@
+"""
+Tests of the columnar figure table (drawing.figures.table) against the per object conversion.
+"""
+import numpy as np
+
+from RoboForger.drawing.figures import FigureKind, FigureTable
+from RoboForger.preprocessing.converter import Converter
+
+
+def test_table_conversion_matches_the_objects():
+    rng = np.random.default_rng(0)
+    lines = [{"start": (*rng.uniform(-100, 100, 2), 0.0), "end": (*rng.uniform(-100, 100, 2), 0.0)} for _ in range(20)]
+    arcs = [{"center": (*rng.uniform(-100, 100, 2), 0.0), "radius": float(rng.uniform(1, 20)),
+             "start_angle": float(rng.uniform(0, 360)), "end_angle": float(rng.uniform(0, 360)), "clockwise": bool(i % 2)}
+            for i in range(20)]
+    circles = [{"center": (*rng.uniform(-100, 100, 2), 0.0), "radius": float(rng.uniform(1, 20))} for _ in range(5)]
+
+    converter = Converter(float_precision=4, pre_scale=1.5, lifting=50.0, origin=(450.0, 0.0, 450.0))
+    table = converter.convert_table(FigureTable.from_raw(lines, arcs, circles))
+
+    expected = converter.convert_lines_to_polylines(lines) + converter.convert_arcs(arcs) + converter.convert_circles(circles)
+    figures = list(table.figures())
+
+    assert [type(figure) for figure in figures] == [type(figure) for figure in expected]
+    assert [figure.name for figure in figures] == [figure.name for figure in expected]
+    for figure, other in zip(figures, expected):
+        np.testing.assert_allclose(figure.get_points(), other.get_points(), atol=1e-9, err_msg=figure.name)
+
+    assert len(list(table.figures(FigureKind.ARC))) == len(arcs)
+    assert FigureTable.from_raw(lines, arcs, circles).to_raw() == {"lines": lines, "arcs": arcs, "circles": circles}
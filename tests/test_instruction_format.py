@@ -0,0 +1,49 @@
+"""
+Tests of the batched offset instruction formatting (drawing.moves.format_items_offset).
+"""
+import numpy as np
+import pytest
+
+from RoboForger.drawing.moves import Move, MoveKind, format_items_offset, format_move_offset
+
+ORIGIN = (450.0, 0.0, 450.0)
+
+
+def per_move(items: list, origin=ORIGIN, origin_name: str = "origin", tool_name: str = "tool0") -> str:
+    return "".join(format_move_offset(item, origin_name, origin, tool_name) for item in items)
+
+
+@pytest.mark.parametrize("value", [0.0, -0.0, 1e-5, 5e-5, -5e-5, 0.00015, 1.23445, -1.23445, 2.675, 0.1 + 0.2,
+                                   123456.78905, -999.99995, 7.0, 1e12])
+def test_coordinates_are_written_like_round(value):
+    moves = [Move(MoveKind.LINEAR, (ORIGIN[0] + value, value, ORIGIN[2] - value), 1000, True),
+             Move(MoveKind.LINEAR, (value, -value, value), 1000, True)]
+
+    assert format_items_offset(moves, "origin", ORIGIN, "tool0") == per_move(moves)
+
+
+def test_batch_equals_the_moves_one_by_one():
+    rng = np.random.default_rng(0)
+    # Points with 0 to 6 decimals, exact ties of the 4 decimals rounding included
+    scales = 10.0 ** rng.integers(0, 7, size=(500, 1))
+    points = (np.round(rng.uniform(-300, 300, size=(500, 3)) * scales) / scales).tolist()
+
+    items = []
+    for index, point in enumerate(points):
+        if index % 20 == 0:
+            items.append(f"\n        ! Figure: Line{index} 100%\n")
+        if index % 50 == 0:
+            items.append(Move(MoveKind.CIRCULAR, tuple(point), 200, True, via=tuple(points[index - 1]), zone="z1"))
+        elif index % 30 == 0:
+            items.append(Move(MoveKind.JOINT, tuple(point), 1000, False, comment="init_lifted"))
+        else:
+            items.append(Move(MoveKind.LINEAR, tuple(point), 1000, True, zone="z5" if index % 2 else "fine"))
+
+
+    assert format_items_offset(items, "origin", ORIGIN, "tool0") == per_move(items)
+    assert format_items_offset(items, "o%s", (0.0, 0.0, 0.0), "t%d") == per_move(items, (0.0, 0.0, 0.0), "o%s", "t%d")
+
+
+def test_no_items():
+    assert format_items_offset([], "origin", ORIGIN, "tool0") == ""
+    assert format_items_offset(["        ! only a comment\n"], "origin", ORIGIN, "tool0") == "        ! only a comment\n"
@@ -0,0 +1,83 @@
+"""
+Tests of the workspace limits validation (Draw.add_figures with the bounds of the figure table).
+"""
+import numpy as np
+import pytest
+
+from RoboForger.drawing.draw import Draw
+from RoboForger.drawing.figures import Arc, PolyLine
+
+from conftest import raw_spline
+
+
+# The origin moves the drawing by (450, 0, 450) and the default limits end at X = 800
+FIGURES = {
+    "lines": [{"start": (0.0, 0.0, 0.0), "end": (100.0, 0.0, 0.0)}, {"start": (100.0, 0.0, 0.0), "end": (100.0, 50.0, 0.0)}],
+    "arcs": [{"center": (200.0, 0.0, 0.0), "radius": 20.0, "start_angle": 30.0, "end_angle": 210.0, "clockwise": False}],
+    "circles": [{"center": (-100.0, 100.0, 0.0), "radius": 30.0}],
+    "splines": [raw_spline([(0, 200, 0), (50, 260, 0), (100, 140, 0), (150, 200, 0)]),
+                raw_spline([(-200, -200, 0), (-150, -100, 0), (-100, -300, 0), (-50, -200, 0)])],
+}
+
+
+def materialized(forger) -> list:
+    forger._materialize_figures()
+    return forger._polylines + forger._arcs + forger._circles + forger._splines
+
+
+def test_bounds_follow_the_figures(load_forger, parameters):
+    forger = load_forger(parameters(spline_chord_error=0.05), **FIGURES)
+    figures = materialized(forger)
+
+    minimum, maximum = forger._figure_bounds()
+    points_minimum, points_maximum = Draw.figure_bounds(figures)
+
+    assert minimum.shape == maximum.shape == (len(figures), 3)
+
+    # Lines, circles and splines: exactly the bounds of their points
+    others = [i for i, figure in enumerate(figures) if not isinstance(figure, Arc)]
+    np.testing.assert_allclose(minimum[others], points_minimum[others], atol=1e-9)
+    np.testing.assert_allclose(maximum[others], points_maximum[others], atol=1e-9)
+
+    # The arc covers its top point, (200, 20) before the origin offset, which none of its points is at
+    arc = figures.index(forger._arcs[0])
+    assert maximum[arc, 1] == pytest.approx(20.0)
+    assert points_maximum[arc, 1] < maximum[arc, 1]
+    assert np.all(minimum[arc] <= points_minimum[arc]) and np.all(maximum[arc] >= points_maximum[arc])
+
+
+def test_every_violation_is_reported(load_forger, parameters):
+    # The circle passes the X limit (800) and the arc only between its points, the spline leaves the Y limit
+    figures = {
+        "lines": FIGURES["lines"],
+        "arcs": [{"center": (0.0, -700.0, 0.0), "radius": 150.0, "start_angle": 200.0, "end_angle": 340.0, "clockwise": False}],
+        "circles": [{"center": (340.0, 0.0, 0.0), "radius": 20.0}],
+        "splines": [raw_spline([(0, 700, 0), (50, 1000, 0), (100, 700, 0), (150, 700, 0)])],
+    }
+    forger = load_forger(parameters(), **figures)
+
+    with pytest.raises(ValueError) as error:
+        forger._make_draw()
+
+    message = str(error.value)
+    assert message.startswith("3 figures are out of drawing limits")
+    assert "Circle0: x max 810.0 exceeds limit 800.0" in message
+    assert "Arc0: y min -850.0 exceeds limit -800.0" in message
+    assert "Spline0: y max" in message
+    assert "Line" not in message
+
+
+def test_violations_of_figures_without_bounds():
+    draw = Draw(workspace_limits=((0.0, 0.0, 0.0), (100.0, 100.0, 100.0)))
+    inside = PolyLine("Inside", [(10.0, 10.0, 10.0), (20.0, 20.0, 10.0)], lifting=50)
+    outside = PolyLine("Outside", [(10.0, 10.0, 10.0), (120.0, 20.0, 10.0)], lifting=50)
+
+    with pytest.raises(ValueError, match="Outside: x max 120.0 exceeds limit 100.0"):
+        draw.add_figures([inside, outside])
+    assert draw.figures == []
+
+    draw.add_figures([inside])
+    assert draw.figures == [inside]
+
+    with pytest.raises(ValueError, match="Expected the bounds of 1 figures"):
+        draw.add_figures([inside], bounds=Draw.figure_bounds([inside, outside]))
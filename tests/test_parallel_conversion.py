@@ -0,0 +1,44 @@
+"""
+Tests of the splines sampled in a process pool (Converter.convert_splines with workers).
+"""
+import numpy as np
+import pytest
+
+from conftest import raw_spline
+from RoboForger.preprocessing.converter import Converter
+
+
+def random_splines(count: int, control_count: int = 12) -> list:
+    rng = np.random.default_rng(0)
+    splines = []
+    for _ in range(count):
+        steps = rng.uniform(-10, 10, size=(control_count, 3))
+        steps[:, 2] = 0.0
+        splines.append(raw_spline(np.cumsum(steps, axis=0).tolist(), degree=int(rng.integers(2, 4))))
+    return splines
+
+
+@pytest.mark.parametrize("chord_error, arc_tolerance", [(0.0, 0.0), (0.01, 0.1)])
+def test_parallel_splines_equal_the_serial_ones(chord_error, arc_tolerance):
+    splines = random_splines(11)
+
+    serial = Converter(spline_chord_error=chord_error, spline_arc_tolerance=arc_tolerance).convert_splines(splines)
+    parallel = Converter(spline_chord_error=chord_error, spline_arc_tolerance=arc_tolerance, workers=2).convert_splines(splines)
+
+    assert [spline.name for spline in parallel] == [f"Spline{i}" for i in range(len(splines))]
+    assert [spline.get_points() for spline in parallel] == [spline.get_points() for spline in serial]
+    assert [spline.get_rob_targets() for spline in parallel] == [spline.get_rob_targets() for spline in serial]
+
+
+def test_parallel_program_equals_the_serial_one(load_forger, parameters):
+    splines = random_splines(6)
+    lines = [{"start": (0.0, 0.0, 0.0), "end": (10.0, 0.0, 0.0)}]
+
+    serial = load_forger(parameters(spline_chord_error=0.01), lines=lines, splines=splines)
+    parallel = load_forger(parameters(spline_chord_error=0.01, conversion_workers=2), lines=lines, splines=splines)
+
+    serial.generate_rapid_code()
+    parallel.generate_rapid_code()
+
+    assert "Spline5" in serial.get_rapid_code()
+    assert parallel.get_rapid_code() == serial.get_rapid_code()
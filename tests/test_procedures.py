@@ -0,0 +1,90 @@
+"""
+Tests of the programs split in procedures or modules under a move budget (Draw.procedure_budget).
+"""
+import io
+import re
+from contextlib import contextmanager
+from typing import Dict, List
+
+import pytest
+
+from test_rapid_writer import make_draw
+
+MOVE = re.compile(r"^\s*(MoveJ|MoveL|MoveC) ", re.MULTILINE)
+ZONE = re.compile(r", (z\d+|fine), ")
+
+
+def procedures(code: str) -> Dict[str, List[str]]:
+    """
+    Move lines of every procedure of the code.
+    """
+    return {name: [line.strip() for line in body.splitlines() if MOVE.match(line)]
+            for name, body in re.findall(r"PROC (\w+)\(\)\n(.*?)    ENDPROC", code, re.DOTALL)}
+
+
+def calls(code: str) -> List[str]:
+    main = re.search(r"PROC main\(\)\n(.*?)    ENDPROC", code, re.DOTALL).group(1)
+    return re.findall(r"^        (Draw\d+);$", main, re.MULTILINE)
+
+
+def without_zones(moves: List[str]) -> List[str]:
+    return [ZONE.sub(", ZONE, ", move) for move in moves]
+
+
+@pytest.mark.parametrize("use_offset", [True, False])
+@pytest.mark.parametrize("budget", [5, 40, 100])
+def test_procedures_stay_under_the_budget(use_offset, budget):
+    # Moves of the figures, without the moves to the origin around them
+    whole = [move for move in procedures(make_draw().generate_rapid_code(use_offset=use_offset))["main"]
+             if not move.startswith("MoveJ origin,")]
+    code = make_draw(procedure_budget=budget).generate_rapid_code(use_offset=use_offset)
+    split = procedures(code)
+
+    names = calls(code)
+    assert names == [f"Draw{i + 1}" for i in range(len(split) - 1)]
+    assert len(names) >= len(whole) // budget
+
+    for name in names:
+        assert 0 < len(split[name]) <= budget
+        # The robot stops at the end of every procedure
+        assert split[name][-1].endswith(", fine, tool0;")
+
+    # Same moves in the same order, only the zones at the cuts change
+    moves = [move for name in names for move in split[name]]
+    assert without_zones(moves) == without_zones(whole)
+    assert sum(a != b for a, b in zip(moves, whole)) <= len(names) - 1
+
+
+def test_program_under_the_budget_stays_in_main():
+    code = make_draw(procedure_budget=10_000).generate_rapid_code(use_offset=True)
+
+    assert code == make_draw().generate_rapid_code(use_offset=True)
+    assert list(procedures(code)) == ["main"]
+
+
+@pytest.mark.parametrize("use_offset", [True, False])
+def test_modules_are_loaded_on_their_own(use_offset):
+    streams: Dict[str, io.StringIO] = {}
+
+    @contextmanager
+    def open_stream(name: str):
+        streams[name] = io.StringIO()
+        yield streams[name]
+
+    draw = make_draw(procedure_budget=40)
+    names = draw.write_rapid_modules(open_stream, use_offset=use_offset)
+    single = make_draw(procedure_budget=40).generate_rapid_code(use_offset=use_offset)
+
+    assert names == list(streams) and names[-1] == "MainModule"
+    assert calls(streams["MainModule"].getvalue()) == calls(single)
+
+    for i, name in enumerate(names[:-1]):
+        code = streams[name].getvalue()
+        assert code.startswith(f"MODULE {name}\n")
+        # The same procedure as in the single module, with every target it uses declared in the module
+        assert procedures(code) == {f"Draw{i + 1}": procedures(single)[f"Draw{i + 1}"]}
+
+        declared = set(re.findall(r"^    LOCAL CONST robtarget (\w+):=", code, re.MULTILINE))
+        used = {target for move in procedures(code)[f"Draw{i + 1}"]
+                for target in re.findall(r"\b(P\w+|origin)\b", move.split(", v")[0])}
+        assert used <= declared
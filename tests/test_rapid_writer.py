@@ -0,0 +1,45 @@
+"""
+Tests of the streaming RAPID writer (Draw.write_rapid_code).
+"""
+import io
+
+import numpy as np
+import pytest
+
+from RoboForger.drawing.draw import Draw
+from RoboForger.drawing.figures import Arc, PolyLine
+
+
+def make_draw(**options) -> Draw:
+    rng = np.random.default_rng(0)
+    walks = np.cumsum(rng.uniform(-5, 5, size=(20, 10, 3)), axis=1)
+    walks[:, :, 2] = 0.0
+
+    draw = Draw(workspace_limits=None, use_detector=False, zone_tolerance=0.1, **options)
+    draw.add_figures([PolyLine(f"Line{i}", [tuple(point) for point in walk.tolist()], lifting=50, float_precision=4)
+                      for i, walk in enumerate(walks)] + [Arc("Arc0", (0.0, 0.0, 0.0), 20.0, 0.0, 200.0, lifting=50, float_precision=4)])
+    return draw
+
+
+@pytest.mark.parametrize("use_offset", [True, False])
+@pytest.mark.parametrize("buffer_lines", [1, 7, 4096])
+def test_stream_equals_the_string(use_offset, buffer_lines):
+    code = make_draw().generate_rapid_code(use_offset=use_offset)
+
+    stream = io.StringIO()
+    draw = make_draw()
+    draw.write_rapid_code(stream, use_offset=use_offset, buffer_lines=buffer_lines)
+
+    assert stream.getvalue() == code
+    assert code.startswith("MODULE MainModule\n") and code.endswith("ENDMODULE\n")
+    assert draw.cycle_time_report["moves"] > 0
+
+
+def test_iterating_the_code_builds_the_moves_lazily():
+    draw = make_draw()
+    pieces = draw.iter_rapid_code(use_offset=True)
+
+    # Nothing is formatted before the code is read, the cycle time report comes with the end of the module
+    assert draw.cycle_time_report == {}
+    assert "".join(pieces) == make_draw().generate_rapid_code(use_offset=True)
+    assert draw.cycle_time_report["moves"] > 0
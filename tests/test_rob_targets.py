@@ -0,0 +1,83 @@
+"""
+Tests of the rob targets shared by the figures in absolute mode (drawing.rob_targets.RobTargetTable).
+"""
+import io
+import re
+from contextlib import contextmanager
+from typing import Dict, List
+
+from RoboForger.drawing.draw import Draw
+from RoboForger.drawing.figures import Arc, PolyLine
+
+DECLARATION = re.compile(r"CONST robtarget (\w+):=\[\[([^\]]+)\]")
+MOVE = re.compile(r"^\s*Move[JLC] (\w+)(?:, (P\w+))?, v", re.MULTILINE)
+
+
+def make_grid(size: int, step: float = 5.0) -> list:
+    # Every inner node is the end of four segments, like the chained figures of a drawing
+    figures = []
+    for i in range(size):
+        for j in range(size):
+            x, y = i * step, j * step
+            figures.append(PolyLine(f"H{i}_{j}", [(x, y, 0.0), (x + step, y, 0.0)], lifting=50, float_precision=4))
+            figures.append(PolyLine(f"V{i}_{j}", [(x, y, 0.0), (x, y + step, 0.0)], lifting=50, float_precision=4))
+    return figures + [Arc("Arc0", (0.0, 0.0, 0.0), 5.0, 0.0, 90.0, lifting=50, float_precision=4)]
+
+
+def absolute_code(share: bool, **options) -> str:
+    draw = Draw(workspace_limits=None, use_detector=False, share_rob_targets=share, **options)
+    draw.add_figures(make_grid(4))
+    return draw.generate_rapid_code(use_offset=False)
+
+
+def declarations(code: str) -> Dict[str, tuple]:
+    found = DECLARATION.findall(code)
+    names = [name for name, _ in found]
+    assert len(names) == len(set(names)), "A rob target is declared twice"
+    return {name: tuple(float(value) for value in coordinates.split(",")) for name, coordinates in found}
+
+
+def drawn_points(code: str) -> List[tuple]:
+    """
+    Coordinates of the targets of every move, in order.
+    """
+    targets = declarations(code)
+    return [targets[name] for move in MOVE.findall(code) for name in move if name]
+
+
+def test_every_coordinate_is_declared_once():
+    code = absolute_code(share=True)
+    targets = declarations(code)
+
+    assert len(set(targets.values())) == len(targets)
+    # Every move references a declared target
+    assert all(name in targets for move in MOVE.findall(code) for name in move if name)
+
+
+def test_shared_targets_draw_the_same_points():
+    shared, per_figure = absolute_code(share=True), absolute_code(share=False)
+
+    assert drawn_points(shared) == drawn_points(per_figure)
+    assert len(declarations(shared)) == len(set(declarations(per_figure).values())) < len(declarations(per_figure))
+
+
+def test_split_modules_declare_the_shared_targets_they_use():
+    streams: Dict[str, io.StringIO] = {}
+
+    @contextmanager
+    def open_stream(name: str):
+        streams[name] = io.StringIO()
+        yield streams[name]
+
+    draw = Draw(workspace_limits=None, use_detector=False, share_rob_targets=True, procedure_budget=10)
+    draw.add_figures(make_grid(4))
+    draw.write_rapid_modules(open_stream, use_offset=False)
+
+    points = []
+    for stream in streams.values():
+        code = stream.getvalue()
+        targets = declarations(code)
+        assert len(set(targets.values())) == len(targets)
+        points += drawn_points(code)
+
+    assert points == drawn_points(absolute_code(share=False))
@@ -0,0 +1,118 @@
+"""
+Tests of the shared memory transport of arrays between processes (app.shared_arrays).
+"""
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from RoboForger.app.shared_arrays import SharedArrays
+
+from conftest import figure_arrays, raw_spline
+
+
+def arrays() -> dict:
+    return {"points": np.arange(30, dtype=float).reshape(10, 3), "counts": np.array([3, 0, 7], dtype=np.int64),
+            "flags": np.array([True, False, True]), "file_digest": np.array("drawing"), "empty": np.zeros((0, 3)),
+            "strided": np.arange(20, dtype=np.int32)[::2]}
+
+
+def assert_arrays_equal(loaded: dict, expected: dict):
+    assert list(loaded) == list(expected)
+    for name, array in expected.items():
+        assert loaded[name].dtype == array.dtype and loaded[name].shape == array.shape, name
+        np.testing.assert_array_equal(loaded[name], array, err_msg=name)
+
+
+def test_round_trip():
+    shared = SharedArrays.create(arrays())
+    try:
+        attached = SharedArrays.attach(shared.handle)
+        assert_arrays_equal(attached.arrays(), arrays())
+
+        # Every array starts on a cache line, other processes only read the block
+        assert all(offset % 64 == 0 for _, _, _, offset in shared.handle[1])
+        with pytest.raises(ValueError):
+            attached.array("points")[0, 0] = 1.0
+        with pytest.raises(KeyError):
+            attached.array("missing")
+
+        # The owner writes in place, the attached block sees it
+        shared.array("points")[0, 0] = -1.0
+        assert attached.array("points")[0, 0] == -1.0
+
+        attached.close()
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+def test_figure_arrays_round_trip():
+    expected = figure_arrays(lines=[{"start": (0.0, 0.0, 0.0), "end": (10.0, 0.0, 0.0)}],
+                             splines=[raw_spline([(0, 0, 0), (10, 20, 0), (20, -20, 0), (30, 0, 0)])])
+    shared = SharedArrays.create(expected)
+    try:
+        assert_arrays_equal(SharedArrays.attach(shared.handle).arrays(), expected)
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+def test_arrays_outlive_the_closed_block():
+    shared = SharedArrays.create(arrays())
+    points = SharedArrays.attach(shared.handle).array("points")
+    owned = shared.array("counts")
+
+    # The attached block is gone and the owner closed, the arrays keep the memory mapped
+    shared.close()
+    shared.unlink()
+
+    np.testing.assert_array_equal(points, arrays()["points"])
+    np.testing.assert_array_equal(owned, arrays()["counts"])
+
+
+def test_no_arrays():
+    shared = SharedArrays.create({})
+    try:
+        assert SharedArrays.attach(shared.handle).arrays() == {}
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+def read_and_answer(handle, results: multiprocessing.Queue):
+    """
+    Other process: reads the figures of the handle and answers with a block of its own, left for the caller to unlink.
+    """
+    shared = SharedArrays.attach(handle)
+    total = shared.array("points").sum()
+    shared.close()
+
+    answer = SharedArrays.create({"total": np.array([total]), "code": np.frombuffer(b"MoveL", dtype=np.uint8)}, track=False)
+    results.put(answer.handle)
+    answer.close()
+
+
+def test_round_trip_between_processes():
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    shared = SharedArrays.create(arrays())
+
+    try:
+        process = context.Process(target=read_and_answer, args=(shared.handle, results))
+        process.start()
+        handle = results.get(timeout=60)
+        process.join(60)
+    finally:
+        shared.close()
+        shared.unlink()
+
+    # The answer outlives the process that created it until it is unlinked here
+    answer = SharedArrays.attach(handle)
+    assert answer.array("total")[0] == arrays()["points"].sum()
+    assert bytes(answer.array("code")) == b"MoveL"
+    answer.close()
+    answer.unlink()
+
+    with pytest.raises(FileNotFoundError):
+        SharedArrays.attach(handle)
@@ -0,0 +1,121 @@
+"""
+Tests of the trace simplifications of the detector (detector.simplify).
+"""
+import numpy as np
+import pytest
+
+from RoboForger.detector.simplify import ArcMerger, TraceSimplifier
+from RoboForger.drawing.figures import Arc, Circle, PolyLine
+
+
+def segment_distances(points: np.ndarray, polyline: np.ndarray) -> np.ndarray:
+    # Distance of every point to the closest segment of polyline
+    starts, ends = polyline[:-1], polyline[1:]
+    directions = ends - starts
+    along = np.einsum("psk,sk->ps", points[:, None] - starts, directions) / np.maximum((directions ** 2).sum(axis=1), 1e-12)
+    closest = starts + np.clip(along, 0.0, 1.0)[..., None] * directions
+    return np.linalg.norm(points[:, None] - closest, axis=2).min(axis=1)
+
+
+def test_simplify_points_drops_collinear_points():
+    points = np.array([(0, 0, 0), (1, 0, 0), (2, 0, 0), (3, 0.05, 0), (4, 0, 0), (4, 1, 0), (4, 2, 0), (4, 3, 0)], dtype=float)
+
+    assert TraceSimplifier.simplify_points(points, 0.1).tolist() == [True, False, False, False, True, False, False, True]
+    # The bump is kept under a smaller tolerance
+    assert TraceSimplifier.simplify_points(points, 0.04).tolist() == [True, False, False, True, True, False, False, True]
+
+
+@pytest.mark.parametrize("tolerance", [0.01, 0.1, 1.0])
+def test_dropped_points_stay_within_the_tolerance(tolerance):
+    rng = np.random.default_rng(1)
+    # A wobbly walk along x, mostly within a few tolerances of a line
+    points = np.cumsum(np.array([1.0, 0.0, 0.0]) + rng.normal(0, 0.05, (500, 3)), axis=0)
+
+    keep = TraceSimplifier.simplify_points(points, tolerance)
+
+    assert keep[0] and keep[-1]
+    assert np.all(segment_distances(points[~keep], points[keep]) <= tolerance + 1e-9)
+    assert keep.sum() < len(points)
+
+
+def test_closed_run_keeps_its_shape():
+    square = np.array([(0, 0, 0), (5, 0, 0), (10, 0, 0), (10, 10, 0), (0, 10, 0), (0, 0, 0)], dtype=float)
+
+    assert TraceSimplifier.simplify_points(square, 0.1).tolist() == [True, False, True, True, True, True]
+
+
+def test_consecutive_polylines_are_merged():
+    trace = [PolyLine("L0", [(0, 0, 0), (5, 0, 0)], lifting=10, float_precision=4),
+             PolyLine("L1", [(5, 0, 0), (10, 0, 0), (10, 10, 0)], lifting=10, float_precision=4),
+             Arc("Arc0", (10.0, 15.0, 0.0), 5.0, 270.0, 90.0, lifting=10, float_precision=4),
+             PolyLine("L2", [(10, 20, 0), (10, 30, 0)], lifting=10, float_precision=4)]
+    simplifier = TraceSimplifier(0.01)
+
+    simplified = simplifier.simplify(trace)
+
+    assert [figure.name for figure in simplified] == ["L0_L1", "Arc0", "L2"]
+    assert simplified[0].get_points()[1:-1] == [(0, 0, 0), (10, 0, 0), (10, 10, 0)]
+    assert simplified[1] is trace[2] and simplified[2] is trace[3]
+    assert (simplifier.points_before, simplifier.points_after) == (6, 5)
+
+
+def quarter_arcs(first_angle: float = 0.0) -> list:
+    # A circle of radius 20 split at the quadrants, listed from first_angle on
+    return [{"center": (100.0, 100.0, 0.0), "radius": 20.0, "start_angle": (first_angle + 90.0 * i) % 360,
+             "end_angle": (first_angle + 90.0 * (i + 1)) % 360, "clockwise": False} for i in range(4)]
+
+
+def detected(load_forger, parameters, **figures) -> list:
+    return load_forger(parameters(arc_merge_tolerance=0.01, circle_velocity=300), **figures)._make_draw()._detected_figures()
+
+
+@pytest.mark.parametrize("first_angle", [0.0, 90.0, 270.0])
+def test_whole_turn_of_arcs_is_a_circle(load_forger, parameters, first_angle):
+    arcs = load_forger(parameters(), arcs=quarter_arcs(first_angle))._make_draw()._detected_figures()
+    figures = detected(load_forger, parameters, arcs=quarter_arcs(first_angle))
+
+    assert len(figures) == 1
+    circle = figures[0]
+    assert isinstance(circle, Circle)
+    assert circle.velocity == 300
+
+    # Starts and ends where the arcs trace does, through the same quadrant points
+    points = circle.get_points()
+    assert points[1] == points[-2] == arcs[0].get_points()[1]
+    assert set(points[1:-1]) == {arc.get_points()[1] for arc in arcs}
+
+    moves = [move for move in circle.moves() if not isinstance(move, str)]
+    assert sum(move.kind.name == "CIRCULAR" for move in moves) == 2
+
+
+def test_circle_follows_the_trace_direction():
+    # The trace draws the quarter arcs backwards (clockwise), from the 90 degrees point
+    arcs = [Arc(f"Arc{i}", center=(100.0, 100.0, 0.0), radius=20.0, start_angle=90.0 * i, end_angle=90.0 * (i + 1),
+                lifting=50, float_precision=4) for i in range(4)]
+    for arc in arcs:
+        arc.reverse_points()
+
+    merger = ArcMerger(0.01)
+    figures = merger.merge(arcs[::-1])
+
+    assert len(figures) == 1 and isinstance(figures[0], Circle)
+    assert merger.merged_arcs == 4
+    assert figures[0].get_points()[1:-1] == [arc.get_points()[1] for arc in arcs[::-1]] + [arcs[-1].get_points()[1]]
+
+
+def test_partial_turn_is_one_arc(load_forger, parameters):
+    figures = detected(load_forger, parameters, arcs=quarter_arcs(0.0)[:3])
+
+    assert len(figures) == 1
+    arc = figures[0]
+    assert isinstance(arc, Arc)
+    assert {arc.get_points()[1], arc.get_points()[-2]} == {(570.0, 100.0, 400.0), (550.0, 80.0, 400.0)}
+
+
+def test_arcs_of_other_circles_are_kept(load_forger, parameters):
+    arcs = quarter_arcs(0.0)[:2]
+    arcs[1] = {**arcs[1], "center": (100.0, 100.0, 0.0), "radius": 20.5}
+
+    figures = detected(load_forger, parameters, arcs=arcs)
+
+    assert [type(figure) for figure in figures] == [Arc, Arc]
@@ -0,0 +1,102 @@
+"""
+Tests of the trace planner (detector.tracer) and of the figures it leaves uncovered.
+"""
+from collections import Counter
+from typing import List
+
+import pytest
+
+from RoboForger.detector.detector import Detector
+from RoboForger.detector.enums import TraceMode
+from RoboForger.detector.tracer import Tracer
+from RoboForger.drawing.figures import Arc, Figure, PolyLine
+
+
+def line(name: str, start: tuple, end: tuple) -> PolyLine:
+    return PolyLine(name, [(*start, 0.0), (*end, 0.0)], lifting=10, float_precision=4)
+
+
+def grid(size: int, step: float = 10.0) -> List[Figure]:
+    figures = []
+    for i in range(size + 1):
+        for j in range(size):
+            figures.append(line(f"H{i}_{j}", (j * step, i * step), ((j + 1) * step, i * step)))
+            figures.append(line(f"V{i}_{j}", (i * step, j * step), (i * step, (j + 1) * step)))
+    return figures
+
+
+def shapes() -> dict:
+    return {
+        # Every inner border vertex is odd, plus an arc parallel to the first segment (two edges between two vertices)
+        "grid": grid(3) + [Arc("Arc0", (5.0, -5.0, 0.0), 50 ** 0.5, 135.0, 45.0, True, 10, 1000, 4)],
+        "loop": [line("L0", (0, 0), (10, 0)), line("L1", (10, 0), (10, 10)), line("L2", (10, 10), (0, 10)),
+                 line("L3", (0, 10), (0, 0))],
+        "star": [line(f"S{i}", (0, 0), (10 * (i + 1), 5 * i)) for i in range(5)],
+        "apart": [line("A0", (0, 0), (10, 0)), line("A1", (10, 0), (20, 0)), line("B0", (100, 100), (110, 100))],
+    }
+
+
+def odd_vertices(figures: List[Figure]) -> int:
+    degrees = Counter(point for figure in figures for point in (figure.start_point, figure.end_point))
+    return sum(degree % 2 for degree in degrees.values())
+
+
+@pytest.mark.parametrize("name", shapes())
+def test_eulerian_traces_cover_every_figure_once(name):
+    figures = shapes()[name]
+    tracer = Tracer(figures, TraceMode.EULERIAN)
+
+    assert tracer.uncovered_figures == []
+    assert sorted(figure.name for trace in tracer.figure_traces for figure in trace) == sorted(figure.name for figure in figures)
+
+    # One trace per pair of odd vertices (a closed component is one trace)
+    expected = {"grid": odd_vertices(figures) // 2, "loop": 1, "star": 3, "apart": 2}[name]
+    assert len(tracer.figure_traces) == expected
+
+    # The figures follow the trail, the tool never leaves the paper inside a trace
+    for trace in tracer.figure_traces:
+        for previous, figure in zip(trace, trace[1:]):
+            assert previous.end_point == figure.start_point
+
+
+def test_longest_path_reports_uncovered_figures():
+    figures = grid(3)
+    tracer = Tracer(figures, TraceMode.LONGEST_PATH)
+    covered = [figure for trace in tracer.figure_traces for figure in trace]
+
+    assert tracer.uncovered_figures
+    assert not set(covered) & set(tracer.uncovered_figures)
+    assert len(covered) + len(tracer.uncovered_figures) == len(figures)
+
+
+@pytest.mark.parametrize("mode", list(TraceMode))
+def test_detector_draws_every_figure(mode):
+    figures = grid(3)
+    detector = Detector(figures, trace_mode=mode, optimize_travel=False)
+
+    assert Counter(figure.name for trace in detector.traces for figure in trace) == Counter(figure.name for figure in figures)
+
+
+def test_snapping_joins_close_end_points():
+    # A square whose corners only meet within 0.004, and a segment 0.5 away from it
+    figures = [line("L0", (0, 0), (10, 0)), line("L1", (10.003, 0.002), (10, 10)), line("L2", (10, 10.004), (0, 10)),
+               line("L3", (0.001, 10), (0, -0.003)), line("Far", (10.5, 0), (20, 0))]
+
+    assert Tracer.snap_figures(figures, 0.01) == 4
+
+    # Snapped onto the first point seen, the figure points follow their end points
+    assert figures[1].start_point == figures[0].end_point
+    assert figures[3].end_point == figures[0].start_point
+    assert figures[1].get_points()[1] == (10.0, 0.0, 0.0)
+    assert figures[4].get_points()[1] == (10.5, 0.0, 0.0)
+
+    tracer = Tracer(figures, TraceMode.EULERIAN)
+    assert sorted(len(trace) for trace in tracer.figure_traces) == [1, 4]
+
+
+def test_snapping_is_off_without_tolerance():
+    figures = [line("L0", (0, 0), (10, 0)), line("L1", (10.003, 0.0), (20, 0))]
+
+    assert Tracer.snap_figures(figures, 0.0) == 0
+    assert len(Tracer(figures, TraceMode.EULERIAN).figure_traces) == 2
+    assert len(Tracer(figures, TraceMode.EULERIAN, snap_tolerance=0.01).figure_traces) == 1
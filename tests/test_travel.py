@@ -0,0 +1,65 @@
+"""
+Tests of the pen-up travel optimizer (detector.travel).
+"""
+from itertools import permutations, product
+from math import dist
+
+import pytest
+
+from RoboForger.detector.travel import TravelOptimizer
+from RoboForger.drawing.figures import PolyLine
+
+
+ORIGIN = (0.0, 0.0, 0.0)
+
+# Short strokes around the origin, the closest open path ends far from it
+STROKES = [((10.0, 0.0, 0.0), (10.0, 1.0, 0.0)), ((0.0, 10.0, 0.0), (1.0, 10.0, 0.0)), ((25.0, 0.0, 0.0), (25.0, 2.0, 0.0)),
+           ((-8.0, -8.0, 0.0), (-9.0, -8.0, 0.0))]
+
+
+def traces() -> list:
+    return [[PolyLine(f"Line{i}", [start, end], lifting=0.0, float_precision=4)] for i, (start, end) in enumerate(STROKES)]
+
+
+def best_travel(closed: bool) -> float:
+    """
+    Brute force over every order and direction of the strokes.
+    """
+    best = float("inf")
+
+    for order in permutations(range(len(STROKES))):
+        for flips in product((False, True), repeat=len(STROKES)):
+            position, travel = ORIGIN, 0.0
+            for stroke, flipped in zip(order, flips):
+                entry, exit_ = STROKES[stroke][::-1] if flipped else STROKES[stroke]
+                travel += dist(position, entry)
+                position = exit_
+            best = min(best, travel + (dist(position, ORIGIN) if closed else 0.0))
+
+    return best
+
+
+def drawn_travel(ordered: list, end_point) -> float:
+    position, travel = ORIGIN, 0.0
+    for trace in ordered:
+        travel += dist(position, trace[0].start_point)
+        position = trace[-1].end_point
+    return travel + (dist(position, end_point) if end_point is not None else 0.0)
+
+
+@pytest.mark.parametrize("end_point", [None, ORIGIN])
+def test_tour_is_the_best_one(end_point):
+    optimizer = TravelOptimizer(traces(), start_point=ORIGIN, end_point=end_point, time_budget=5.0)
+    ordered = optimizer.optimize()
+
+    assert sorted(trace[0].name for trace in ordered) == [f"Line{i}" for i in range(len(STROKES))]
+    assert optimizer.final_travel == pytest.approx(drawn_travel(ordered, end_point))
+    assert optimizer.final_travel == pytest.approx(best_travel(closed=end_point is not None))
+
+
+def test_return_leg_changes_the_tour():
+    open_tour = TravelOptimizer(traces(), start_point=ORIGIN, time_budget=5.0).optimize()
+    closed_tour = TravelOptimizer(traces(), start_point=ORIGIN, end_point=ORIGIN, time_budget=5.0).optimize()
+
+    assert best_travel(closed=True) < drawn_travel(open_tour, ORIGIN) - 1e-6
+    assert drawn_travel(closed_tour, ORIGIN) == pytest.approx(best_travel(closed=True))
@@ -0,0 +1,95 @@
+"""
+Tests of the warm processing worker (app.warm_worker).
+"""
+import threading
+
+import pytest
+
+from RoboForger.app.shared_arrays import SharedArrays
+from RoboForger.app.warm_worker import WarmWorker
+from RoboForger.forger import Forger
+
+from conftest import figure_arrays, raw_spline
+
+
+class Results:
+    """
+    Collects the results the worker monitor thread gives.
+    """
+    def __init__(self):
+        self.value = None
+        self.done = threading.Event()
+
+    def on_result(self, job_id, value):
+        self.value = value
+        self.done.set()
+
+    def wait(self) -> str:
+        assert self.done.wait(60), "The worker did not answer"
+        self.done.clear()
+        if isinstance(self.value, Exception):
+            raise self.value
+        return self.value["rapid_code"]
+
+
+@pytest.fixture
+def worker():
+    results = Results()
+    worker = WarmWorker(on_result=results.on_result)
+    worker.results = results
+    yield worker
+    worker.stop()
+
+
+def splines(count: int) -> list:
+    return [raw_spline([(40.0 * i, 0, 0), (40.0 * i + 10, 20, 0), (40.0 * i + 20, -20, 0), (40.0 * i + 30, 0, 0)])
+            for i in range(count)]
+
+
+def expected_code(arrays: dict, params) -> str:
+    forger = Forger(parameters=params)
+    forger.load_figure_arrays(arrays)
+    forger.generate_rapid_code()
+    return forger.get_rapid_code()
+
+
+def test_parallel_conversion_in_the_worker(worker, parameters):
+    # The conversion process pool is started inside the worker process
+    params = parameters(conversion_workers=2, spline_chord_error=0.05)
+    arrays = figure_arrays(splines=splines(4))
+    shared = SharedArrays.create(arrays)
+
+    try:
+        worker.submit("drawing", shared.handle, params)
+        assert worker.results.wait() == expected_code(arrays, params)
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+def test_failed_job_is_reported_and_the_worker_goes_on(worker, parameters):
+    params = parameters()
+    arrays = figure_arrays(splines=splines(2))
+    shared = SharedArrays.create(arrays)
+
+    try:
+        # Parameters the conversion rejects
+        worker.submit("drawing", shared.handle, parameters(pre_scale="wrong"))
+        with pytest.raises(Exception):
+            worker.results.wait()
+
+        worker.submit("drawing", shared.handle, params)
+        assert worker.results.wait() == expected_code(arrays, params)
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+def test_stop_ends_the_process(worker, parameters):
+    worker.start()
+    process = worker._process
+
+    worker.stop()
+
+    assert not process.is_alive()
+    assert worker._process is None
@@ -0,0 +1,72 @@
+"""
+Tests of the corner zone selection (drawing.moves.blend_zones).
+"""
+from math import radians, sin
+
+import numpy as np
+import pytest
+
+from RoboForger.drawing.moves import Move, MoveKind, ZONES, blend_zones, corner_zone, corner_zones
+
+RADII = dict(ZONES)
+
+
+@pytest.mark.parametrize("angle, incoming, outgoing, tolerance, zone", [
+    (0.0, 100.0, 100.0, 0.1, "z50"),   # straight on, only half of the shorter segment limits
+    (0.0, 30.0, 100.0, 0.1, "z15"),
+    (90.0, 100.0, 100.0, 0.1, "fine"),  # 0.28 mm would cut 0.1 mm, under z0
+    (90.0, 100.0, 100.0, 1.0, "z1"),
+    (90.0, 100.0, 100.0, 5.0, "z10"),
+    (30.0, 100.0, 100.0, 5.0, "z30"),
+])
+def test_corner_zone(angle, incoming, outgoing, tolerance, zone):
+    assert corner_zone(radians(angle), incoming, outgoing, tolerance) == zone
+
+
+def test_zones_stay_within_the_tolerance():
+    rng = np.random.default_rng(0)
+    angles = rng.uniform(0, np.pi / 2, 1000)
+    incoming, outgoing = rng.uniform(0.1, 200, 1000), rng.uniform(0.1, 200, 1000)
+    tolerances = rng.uniform(0.01, 5, 1000)
+    curvatures = np.where(rng.uniform(size=1000) < 0.3, rng.uniform(0, 0.5, 1000), 0.0)
+
+    zones = corner_zones(angles, incoming, outgoing, tolerances, curvatures, np.zeros(1000))
+    radii = np.array([RADII.get(zone, 0.0) for zone in zones])
+
+    deviation = radii * np.sin(angles / 2) / 2 + radii ** 2 * curvatures / 8
+    assert np.all(deviation <= tolerances + 1e-12)
+    assert np.all(radii <= np.minimum(incoming, outgoing) / 2)
+
+    # The next bigger zone would leave the tolerance or the segments (it is the biggest one)
+    order = [radius for _, radius in reversed(ZONES)]
+    for i in np.flatnonzero(radii < 50.0)[:200]:
+        bigger = next(radius for radius in order if radius > radii[i])
+        deviation = bigger * sin(angles[i] / 2) / 2 + bigger ** 2 * curvatures[i] / 8
+        assert deviation > tolerances[i] or bigger > min(incoming[i], outgoing[i]) / 2
+
+
+def line(target: tuple, pen_down: bool = True, tolerance: float | None = None) -> Move:
+    return Move(MoveKind.LINEAR, (*target, 0.0), 1000, pen_down, tolerance=tolerance)
+
+
+def test_blend_zones_at_the_corners():
+    moves = [
+        line((0, 0), pen_down=False),   # pen down at the start: fine
+        line((100, 0)),                 # 10 degrees turn: blended
+        line((200, 17.6)),              # 90 degrees turn: sharp, fine
+        line((200, 117.6)),             # 10 degrees turn, the next move has its own tolerance
+        line((182.4, 217.6), tolerance=0.1),
+        line((182.4, 217.6)),           # zero length move on the corner: zone of the corner
+        line((182.4, 317.6)),           # pen up after it: fine
+        line((182.4, 317.6 + 50), pen_down=False),
+    ]
+    items = list(blend_zones(["        ! comment\n"] + moves, (0.0, 0.0, 50.0), tolerance=1.0))
+
+    assert items[0] == "        ! comment\n"
+    assert [move.zone for move in items[1:]] == ["fine", "z20", "fine", "z1", "z1", "z1", "fine", "fine"]
+
+
+def test_no_tolerance_keeps_fine():
+    moves = [line((0, 0), pen_down=False), line((100, 0)), line((200, 0))]
+
+    assert [move.zone for move in blend_zones(moves, (0.0, 0.0, 50.0), tolerance=0.0)] == ["fine"] * 3